@@ -2,35 +2,203 @@
 AWS Bedrock Integration for AI-Generated Narratives
 """
 import json
+import time
+import asyncio
+import contextvars
 import logging
-import boto3
 import os
-from typing import List, Dict
-from dotenv import load_dotenv
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+import metrics
 
 logger = logging.getLogger(__name__)
-load_dotenv()
+
+# Maximum Bedrock invocations running at once; further calls queue for a slot
+BEDROCK_MAX_CONCURRENCY = int(os.environ.get('BEDROCK_MAX_CONCURRENCY', '4'))
+
+# Seconds a narrative may take, queueing included, before the fallback is used
+BEDROCK_TIMEOUT = float(os.environ.get('BEDROCK_TIMEOUT', '25'))
 
 
 class BedrockAI:
     """Handles AI narrative generation using AWS Bedrock and Claude."""
     
-    def __init__(self):
-        """Initialize Bedrock client with AWS credentials."""
-        self.client = boto3.client(
+    def __init__(self, max_concurrency: int = BEDROCK_MAX_CONCURRENCY, timeout: float = BEDROCK_TIMEOUT):
+        """Initialize Bedrock settings; the boto3 client is created on first use."""
+        self.max_concurrency = max(1, max_concurrency)
+        self.timeout = timeout
+        # Importing boto3 and building the client takes ~300ms, so it waits for the first call or prewarm()
+        self._client = None
+        self._client_lock = threading.Lock()
+        self.model_id = os.environ.get('BEDROCK_MODEL_ID', 'us.anthropic.claude-3-7-sonnet-20250219-v1:0')
+        
+        # Blocking boto3 calls run here, never on the event loop
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='bedrock')
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._waiting = 0
+        self._running = 0
+        self.metrics = {
+            'calls': 0,
+            'timeouts': 0,
+            'errors': 0,
+            'queue_seconds_total': 0.0,
+            'queue_seconds_max': 0.0,
+            'model_seconds_total': 0.0,
+            'model_seconds_max': 0.0
+        }
+    
+    @property
+    def client(self):
+        """boto3 bedrock-runtime client, created on first use (from any thread)."""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = self._create_client()
+        return self._client
+    
+    @client.setter
+    def client(self, client):
+        self._client = client
+    
+    def _create_client(self):
+        """Create the boto3 client with AWS credentials."""
+        import boto3
+        from botocore.config import Config
+        
+        return boto3.client(
             service_name='bedrock-runtime',
             region_name=os.environ.get('AWS_REGION', 'us-east-1'),
             aws_access_key_id=os.environ.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY')
+            aws_secret_access_key=os.environ.get('AWS_SECRET_ACCESS_KEY'),
+            # Abandoned calls must not hold a worker much longer than the deadline
+            config=Config(
+                connect_timeout=5,
+                read_timeout=self.timeout + 5,
+                max_pool_connections=self.max_concurrency
+            )
         )
-        self.model_id = os.environ.get('BEDROCK_MODEL_ID', 'us.anthropic.claude-3-7-sonnet-20250219-v1:0')
+    
+    @property
+    def configured(self) -> bool:
+        """Whether a model is configured; does not create the client."""
+        return bool(self.model_id)
+    
+    async def prewarm(self):
+        """Create the boto3 client off the event loop so the first narrative does not pay for it."""
+        await asyncio.to_thread(lambda: self.client)
+    
+    async def _acquire_slot(self, deadline: float):
+        """Wait for an invocation slot, recording the queueing time."""
+        queued_at = time.monotonic()
+        self._waiting += 1
+        acquire = asyncio.ensure_future(self._slots.acquire())
+        try:
+            await asyncio.wait_for(asyncio.shield(acquire), max(0.0, deadline - queued_at))
+        except BaseException:
+            # wait_for can time out (or we can be cancelled) just as the slot is granted;
+            # a slot acquired nonetheless is given back instead of leaking
+            if acquire.done() and not acquire.cancelled():
+                self._slots.release()
+            else:
+                acquire.cancel()
+            raise
+        finally:
+            self._waiting -= 1
+            waited = time.monotonic() - queued_at
+            self.metrics['queue_seconds_total'] += waited
+            self.metrics['queue_seconds_max'] = max(self.metrics['queue_seconds_max'], waited)
+        self._running += 1
+    
+    def _release_slot(self, started_at: float):
+        """Free an invocation slot once the worker thread has actually finished."""
+        elapsed = time.monotonic() - started_at
+        self.metrics['model_seconds_total'] += elapsed
+        self.metrics['model_seconds_max'] = max(self.metrics['model_seconds_max'], elapsed)
+        self._running -= 1
+        self._slots.release()
+    
+    async def agenerate_runic_narrative(
+        self,
+        summoner_name: str,
+        traits: List[Dict],
+        spirit_champion: Dict,
+        stats: Dict,
+        raise_errors: bool = False,
+        timeout: Optional[float] = None
+    ) -> str:
+        """
+        Generate the narrative without blocking the event loop.
+        
+        The boto3 call runs on a dedicated executor with at most
+        ``max_concurrency`` invocations at once. If the narrative is not ready
+        within the deadline (queueing included), the fallback narrative is
+        returned; the abandoned call keeps its slot until it finishes so the
+        concurrency bound holds.
+        
+        Args:
+            summoner_name: Player's summoner name
+            traits: List of personality traits with scores
+            spirit_champion: Spirit champion resonance data
+            stats: Player statistics
+            raise_errors: Raise errors and timeouts instead of returning the fallback narrative
+            timeout: Deadline in seconds; defaults to BEDROCK_TIMEOUT
+            
+        Returns:
+            AI-generated narrative string
+        """
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        self.metrics['calls'] += 1
+        
+        try:
+            await self._acquire_slot(deadline)
+            started_at = time.monotonic()
+            future = loop.run_in_executor(
+                self.executor,
+                partial(
+                    contextvars.copy_context().run,
+                    self.generate_runic_narrative, summoner_name, traits, spirit_champion, stats, raise_errors=True
+                )
+            )
+            future.add_done_callback(lambda _: self._release_slot(started_at))
+            return await asyncio.wait_for(asyncio.shield(future), max(0.0, deadline - time.monotonic()))
+        except asyncio.TimeoutError:
+            self.metrics['timeouts'] += 1
+            logger.warning(f"Bedrock narrative for {summoner_name} exceeded its deadline")
+            if raise_errors:
+                raise
+        except Exception:
+            self.metrics['errors'] += 1
+            if raise_errors:
+                raise
+        return self.fallback_narrative(summoner_name, traits, spirit_champion)
+    
+    def close(self):
+        """Stop the Bedrock executor, dropping calls that have not started."""
+        self.executor.shutdown(wait=False, cancel_futures=True)
+    
+    def stats(self) -> Dict:
+        """Concurrency state and queueing vs model time."""
+        calls = self.metrics['calls']
+        return {
+            'max_concurrency': self.max_concurrency,
+            'running': self._running,
+            'queued': self._waiting,
+            **self.metrics,
+            'queue_seconds_avg': round(self.metrics['queue_seconds_total'] / calls, 3) if calls else 0.0,
+            'model_seconds_avg': round(self.metrics['model_seconds_total'] / calls, 3) if calls else 0.0
+        }
     
     def generate_runic_narrative(
         self,
         summoner_name: str,
         traits: List[Dict],
         spirit_champion: Dict,
-        stats: Dict
+        stats: Dict,
+        raise_errors: bool = False
     ) -> str:
         """
         Generate a mystical, lore-rich narrative about the player's personality.
@@ -40,10 +208,154 @@ class BedrockAI:
             traits: List of personality traits with scores
             spirit_champion: Spirit champion resonance data
             stats: Player statistics
+            raise_errors: Raise Bedrock errors instead of returning the fallback narrative
             
         Returns:
             AI-generated narrative string
         """
+        request_body, top_traits = self._build_request(summoner_name, traits, spirit_champion, stats)
+        
+        try:
+            logger.info(f"Invoking Bedrock for {summoner_name}")
+            
+            with metrics.upstream('bedrock', 'invoke'):
+                # Invoke the model
+                response = self.client.invoke_model(
+                    modelId=self.model_id,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=request_body
+                )
+                
+                # Parse response
+                response_body = json.loads(response['body'].read())
+            narrative = response_body['content'][0]['text']
+            
+            logger.info(f"Successfully generated narrative for {summoner_name}")
+            return narrative
+            
+        except Exception as e:
+            logger.error(f"Error generating narrative with Bedrock: {e}")
+            if raise_errors:
+                raise
+            # Fallback narrative if AI fails
+            return self._generate_fallback_narrative(summoner_name, spirit_champion, top_traits)
+    
+    def stream_runic_narrative(
+        self,
+        summoner_name: str,
+        traits: List[Dict],
+        spirit_champion: Dict,
+        stats: Dict
+    ) -> Iterator[str]:
+        """
+        Generate the narrative with Bedrock's response stream, yielding text as it arrives.
+        
+        Unlike generate_runic_narrative, Bedrock errors are always raised, since
+        part of the narrative may already have been sent; use fallback_narrative
+        to recover.
+        
+        Args:
+            summoner_name: Player's summoner name
+            traits: List of personality traits with scores
+            spirit_champion: Spirit champion resonance data
+            stats: Player statistics
+            
+        Yields:
+            Narrative text chunks
+        """
+        request_body, _ = self._build_request(summoner_name, traits, spirit_champion, stats)
+        
+        try:
+            logger.info(f"Invoking Bedrock stream for {summoner_name}")
+            
+            with metrics.upstream('bedrock', 'invoke_stream'):
+                response = self.client.invoke_model_with_response_stream(
+                    modelId=self.model_id,
+                    contentType="application/json",
+                    accept="application/json",
+                    body=request_body
+                )
+            
+            for event in response['body']:
+                chunk = event.get('chunk')
+                if not chunk:
+                    continue
+                payload = json.loads(chunk['bytes'])
+                if payload.get('type') == 'content_block_delta' and payload['delta'].get('type') == 'text_delta':
+                    yield payload['delta']['text']
+            
+            logger.info(f"Successfully streamed narrative for {summoner_name}")
+            
+        except Exception as e:
+            logger.error(f"Error streaming narrative with Bedrock: {e}")
+            raise
+    
+    async def astream_runic_narrative(
+        self,
+        summoner_name: str,
+        traits: List[Dict],
+        spirit_champion: Dict,
+        stats: Dict,
+        timeout: Optional[float] = None
+    ) -> AsyncIterator[str]:
+        """
+        Async wrapper around stream_runic_narrative.
+        
+        The blocking boto3 event stream is consumed on the Bedrock executor,
+        under the same concurrency bound as agenerate_runic_narrative, and its
+        chunks are handed back to the event loop as they arrive.
+        
+        Raises:
+            asyncio.TimeoutError: If the whole stream is not done within the deadline
+        """
+        loop = asyncio.get_running_loop()
+        deadline = time.monotonic() + (self.timeout if timeout is None else timeout)
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+        self.metrics['calls'] += 1
+        
+        def produce():
+            try:
+                for chunk in self.stream_runic_narrative(summoner_name, traits, spirit_champion, stats):
+                    loop.call_soon_threadsafe(queue.put_nowait, chunk)
+                loop.call_soon_threadsafe(queue.put_nowait, done)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+        
+        try:
+            await self._acquire_slot(deadline)
+            started_at = time.monotonic()
+            producer = loop.run_in_executor(self.executor, contextvars.copy_context().run, produce)
+            producer.add_done_callback(lambda _: self._release_slot(started_at))
+            while True:
+                item = await asyncio.wait_for(queue.get(), max(0.0, deadline - time.monotonic()))
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        except asyncio.TimeoutError:
+            self.metrics['timeouts'] += 1
+            logger.warning(f"Bedrock narrative stream for {summoner_name} exceeded its deadline")
+            raise
+        except Exception:
+            self.metrics['errors'] += 1
+            raise
+    
+    def _build_request(
+        self,
+        summoner_name: str,
+        traits: List[Dict],
+        spirit_champion: Dict,
+        stats: Dict
+    ) -> Tuple[str, List[Dict]]:
+        """
+        Build the Bedrock request body for a narrative.
+        
+        Returns:
+            Tuple of (JSON request body, top 3 traits used for the fallback narrative)
+        """
         # Format traits for the prompt
         traits_description = self._format_traits(traits)
         
@@ -87,47 +399,31 @@ Create a mystical narrative (300-350 words) that:
 
 Make it feel EPIC, MYSTICAL, and PERSONAL. Use poetic language but stay grounded in actual League of Legends lore."""
 
-        try:
-            # Construct the request body for Claude 3.5
-            request_body = json.dumps({
-                "anthropic_version": "bedrock-2023-05-31",
-                "max_tokens": 1500,
-                "temperature": 0.9,
-                "top_p": 0.95,
-                "messages": [
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": f"{system_prompt}\n\n{user_message}"
-                            }
-                        ]
-                    }
-                ]
-            })
-            
-            logger.info(f"Invoking Bedrock for {summoner_name}")
-            
-            # Invoke the model
-            response = self.client.invoke_model(
-                modelId=self.model_id,
-                contentType="application/json",
-                accept="application/json",
-                body=request_body
-            )
-            
-            # Parse response
-            response_body = json.loads(response['body'].read())
-            narrative = response_body['content'][0]['text']
-            
-            logger.info(f"Successfully generated narrative for {summoner_name}")
-            return narrative
-            
-        except Exception as e:
-            logger.error(f"Error generating narrative with Bedrock: {e}")
-            # Fallback narrative if AI fails
-            return self._generate_fallback_narrative(summoner_name, spirit_champion, top_traits)
+        # Construct the request body for Claude 3.5
+        request_body = json.dumps({
+            "anthropic_version": "bedrock-2023-05-31",
+            "max_tokens": 1500,
+            "temperature": 0.9,
+            "top_p": 0.95,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": [
+                        {
+                            "type": "text",
+                            "text": f"{system_prompt}\n\n{user_message}"
+                        }
+                    ]
+                }
+            ]
+        })
+        
+        return request_body, top_traits
+    
+    def fallback_narrative(self, summoner_name: str, traits: List[Dict], spirit_champion: Dict) -> str:
+        """Narrative used when Bedrock is unavailable, built from the top 3 traits."""
+        top_traits = sorted(traits, key=lambda x: x['score'], reverse=True)[:3]
+        return self._generate_fallback_narrative(summoner_name, spirit_champion, top_traits)
     
     def _format_traits(self, traits: List[Dict]) -> str:
         """Format traits into readable description."""
@@ -148,6 +444,7 @@ Make it feel EPIC, MYSTICAL, and PERSONAL. Use poetic language but stay grounded
         top_traits: List[Dict]
     ) -> str:
         """Generate a fallback narrative if AI service fails."""
+        metrics.FALLBACKS.inc()
         champion = spirit_champion['champion']
         trait_names = [t['name'] for t in top_traits]
         
@@ -0,0 +1,143 @@
+"""
+Memory and parity check for deep-history analyses.
+
+Runs RiotAPI.get_player_stats for ``--concurrency`` players at once against
+the in-process Riot stub, for each of ``--counts`` match counts, and reports
+time, tracemalloc peak and max RSS. Counts above RIOT_WINDOW_MAX_MATCHES take
+the streaming path, whose memory should not grow with the count. Also checks
+that the streaming and windowed paths produce identical stats for the same
+games, and fails if they differ.
+
+Each count runs in its own subprocess so peak RSS is not shared between them.
+
+Usage (from backend/):
+    python -m benchmarks.bench_deep_history --counts 20,100,1000 --concurrency 3
+"""
+import argparse
+import asyncio
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+# The stub's limits apply; the client must not assume Riot's development key limits
+os.environ['RIOT_APP_RATE_LIMIT'] = '100000:1'
+os.environ.setdefault('RIOT_API_KEY', 'RGAPI-offline-benchmark')
+
+from benchmarks.offline import RiotStub
+from host_pools import HostPools
+from riot_api import RiotAPI
+
+
+# Distinct match bodies per player; synthesizing one per game would dominate the run
+TEMPLATES = 20
+
+
+class TemplateRiotStub(RiotStub):
+    """
+    RiotStub serving each player's games from a few pre-built bodies.
+
+    Histories do not overlap, so every game belongs to one player, and the
+    bodies are built before measuring so they are not counted as the
+    client's memory.
+    """
+
+    def __init__(self, players: int, **kwargs):
+        super().__init__(player_spacing=kwargs['matches_per_player'], **kwargs)
+        self.templates = {
+            (player, k): super(TemplateRiotStub, self)._match_body(f'NA1_{number}')
+            for player in range(players)
+            for k, number in enumerate(list(self._player_matches(player))[:TEMPLATES])
+        }
+
+    def _match_body(self, match_id: str) -> bytes:
+        number = int(match_id.split('_')[1])
+        return self.templates[(number // self.player_spacing, number % TEMPLATES)]
+
+
+def offline_api(latency_ms: float, history: int, players: int) -> RiotAPI:
+    """RiotAPI without a database, talking to a stub whose players have ``history`` games each."""
+    api = RiotAPI()
+    stub = TemplateRiotStub(
+        players,
+        latency_ms=latency_ms,
+        app_limits=((100000, 1),),
+        matches_per_player=max(history, TEMPLATES),
+        cache_bodies=False
+    )
+    api.pools = HostPools(api.headers, transport=stub)
+    return api
+
+
+async def analyze(api: RiotAPI, players: int, match_count: int) -> List[Dict]:
+    return await asyncio.gather(*(
+        api.get_player_stats(f'Bench{player}', 'BENCH', 'na', match_count) for player in range(players)
+    ))
+
+
+def run_count(match_count: int, concurrency: int, latency_ms: float) -> Dict:
+    api = offline_api(latency_ms, match_count, concurrency)
+    tracemalloc.start()
+    started = time.perf_counter()
+    results = asyncio.run(analyze(api, concurrency, match_count))
+    seconds = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'match_count': match_count,
+        'streamed': match_count > api.window_max_matches,
+        'games': [stats['total_games'] for stats in results],
+        'seconds': seconds,
+        'tracemalloc_peak': peak,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+
+def check_parity(match_count: int, latency_ms: float) -> bool:
+    """Same games through the windowed and the streaming path give the same stats."""
+    api = offline_api(latency_ms, match_count, 1)
+    windowed = asyncio.run(analyze(api, 1, match_count))[0]
+    api.window_max_matches = 0
+    streamed = asyncio.run(analyze(api, 1, match_count))[0]
+    return windowed == streamed
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--counts', default='20,100,1000', help='comma-separated match counts')
+    parser.add_argument('--concurrency', type=int, default=3, help='deep analyses running at once')
+    parser.add_argument('--riot-latency-ms', type=float, default=5)
+    parser.add_argument('--count', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.count:
+        print(json.dumps(run_count(args.count, max(1, args.concurrency), args.riot_latency_ms)))
+        return 0
+
+    results = []
+    for count in (int(c) for c in args.counts.split(',')):
+        child = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_deep_history', '--count', str(count),
+             '--concurrency', str(args.concurrency), '--riot-latency-ms', str(args.riot_latency_ms)],
+            capture_output=True, text=True, check=True
+        )
+        results.append(json.loads(child.stdout))
+
+    print(f"{args.concurrency} analyses at once")
+    for result in results:
+        path = 'streamed' if result['streamed'] else 'windowed'
+        print(
+            f"{result['match_count']:>5} games ({path}): {result['seconds']:.1f}s, "
+            f"peak {result['tracemalloc_peak'] / 1024 / 1024:.1f} MiB, max RSS {result['max_rss_kb'] / 1024:.1f} MiB"
+        )
+    parity = check_parity(100, args.riot_latency_ms)
+    print(f"windowed == streamed for 100 games: {parity}")
+    return 0 if parity else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,346 @@
+"""
+Offline end-to-end benchmark of POST /api/analyze.
+
+Drives the FastAPI app in-process at a configurable concurrency, with Riot
+and Bedrock replaced by local stubs (synthesized data or a recording) and
+MongoDB by mongomock_motor or a local server. Each scenario reports
+request latency percentiles, throughput, per-stage latency and RSS, and
+upstream call counts; ``--output`` saves the results as JSON and
+``--baseline`` compares them with an earlier run.
+
+Scenarios: ``cold`` starts from empty caches, ``warm`` repeats the same
+players so the match cache, aggregates and narrative cache are in play.
+
+Usage (from backend/):
+    python -m benchmarks.bench_e2e --players 20 --requests 100 --concurrency 10 --output run.json
+    python -m benchmarks.bench_e2e --baseline run.json
+    python -m benchmarks.bench_e2e --record fixtures/ --riot-ids ids.txt   # live Riot + Bedrock
+    python -m benchmarks.bench_e2e --fixtures fixtures/                     # replay that recording
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import resource
+import functools
+import subprocess
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional
+
+import httpx
+
+STAGES = ('riot_fetch', 'traits', 'spirit_champion', 'narrative', 'store')
+
+
+def percentile(values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile; None for no values."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered) + 0.5)) - 1))
+    return ordered[index]
+
+
+def summarize(values: List[float]) -> Dict:
+    """Latency summary in milliseconds."""
+    return {
+        'count': len(values),
+        'p50_ms': _ms(percentile(values, 50)),
+        'p95_ms': _ms(percentile(values, 95)),
+        'p99_ms': _ms(percentile(values, 99)),
+        'max_ms': _ms(max(values) if values else None)
+    }
+
+
+def _ms(seconds: Optional[float]) -> Optional[float]:
+    return None if seconds is None else round(seconds * 1000, 1)
+
+
+def current_rss_mb() -> float:
+    """Resident set size now (Linux), falling back to the peak so far."""
+    try:
+        with open('/proc/self/statm') as statm:
+            pages = int(statm.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2 ** 20
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class StageRecorder:
+    """Durations and end-of-stage RSS for each pipeline stage."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.durations = defaultdict(list)
+        self.rss = defaultdict(float)
+
+    def record(self, stage: str, seconds: float):
+        self.durations[stage].append(seconds)
+        self.rss[stage] = max(self.rss[stage], current_rss_mb())
+
+    def report(self) -> Dict:
+        return {
+            stage: {**summarize(self.durations[stage]), 'max_rss_mb': round(self.rss[stage], 1)}
+            for stage in STAGES if self.durations[stage]
+        }
+
+
+def instrument(server, recorder: StageRecorder):
+    """Wrap the pipeline steps _run_analysis calls so each one is timed."""
+    def timed_async(stage, fn):
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                recorder.record(stage, time.perf_counter() - started)
+        return wrapper
+
+    def timed(stage, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                recorder.record(stage, time.perf_counter() - started)
+        return wrapper
+
+    server._fetch_stats = timed_async('riot_fetch', server._fetch_stats)
+    server._generate_narrative = timed_async('narrative', server._generate_narrative)
+    server._store_analysis = timed_async('store', server._store_analysis)
+    engine = server.personality_engine
+    engine.calculate_traits = timed('traits', engine.calculate_traits)
+    engine.determine_spirit_champion = timed('spirit_champion', engine.determine_spirit_champion)
+
+
+async def sample_rss(peak: List[float], interval: float = 0.02):
+    """Keep ``peak[0]`` at the highest RSS seen until cancelled."""
+    while True:
+        peak[0] = max(peak[0], current_rss_mb())
+        await asyncio.sleep(interval)
+
+
+async def run_scenario(client: httpx.AsyncClient, riot_ids: List[str], args, recorder, riot_counter, bedrock) -> Dict:
+    """Send ``args.requests`` analyses, ``args.concurrency`` at a time, cycling through ``riot_ids``."""
+    recorder.reset()
+    riot_before = Counter(riot_counter.calls)
+    rate_limited_before = riot_counter.rate_limited
+    bedrock_before = bedrock.calls
+    misses_before = getattr(riot_counter.inner, 'fixture_misses', 0)
+
+    latencies = []
+    statuses = Counter()
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def one(n: int):
+        body = {'riot_id': riot_ids[n % len(riot_ids)], 'region': args.region, 'match_count': args.match_count}
+        async with semaphore:
+            started = time.perf_counter()
+            response = await client.post('/api/analyze', json=body)
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] += 1
+
+    peak = [current_rss_mb()]
+    sampler = asyncio.create_task(sample_rss(peak))
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(one(n) for n in range(args.requests)))
+    finally:
+        sampler.cancel()
+    wall = time.perf_counter() - started
+
+    return {
+        'requests': args.requests,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'wall_seconds': round(wall, 3),
+        'throughput_rps': round(args.requests / wall, 2),
+        'latency': summarize(latencies),
+        'stages': recorder.report(),
+        'upstream': {
+            'riot': dict(Counter(riot_counter.calls) - riot_before),
+            'riot_429': riot_counter.rate_limited - rate_limited_before,
+            'riot_fixture_misses': getattr(riot_counter.inner, 'fixture_misses', 0) - misses_before,
+            'bedrock': bedrock.calls - bedrock_before
+        },
+        'peak_rss_mb': round(peak[0], 1)
+    }
+
+
+class CountingBedrock:
+    """Counts invocations of a boto3-shaped Bedrock client."""
+
+    def __init__(self, client):
+        self.client = client
+        self.calls = 0
+
+    def invoke_model(self, **kwargs):
+        self.calls += 1
+        return self.client.invoke_model(**kwargs)
+
+    def invoke_model_with_response_stream(self, **kwargs):
+        self.calls += 1
+        return self.client.invoke_model_with_response_stream(**kwargs)
+
+
+def parse_limits(value: str):
+    return [tuple(int(part) for part in window.split(':')) for window in value.split(',')]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(baseline: Dict, results: Dict):
+    """Print the change of the headline numbers against a baseline run."""
+    def delta(old, new):
+        if old is None or new is None:
+            return 'n/a'
+        change = (new - old) / old * 100 if old else 0.0
+        return f"{old} -> {new} ({change:+.1f}%)"
+
+    print(f"\nvs baseline {baseline.get('config', {}).get('revision')}:")
+    for name, scenario in results['scenarios'].items():
+        old = baseline.get('scenarios', {}).get(name)
+        if not old:
+            continue
+        print(f"  {name}:")
+        print(f"    throughput_rps  {delta(old['throughput_rps'], scenario['throughput_rps'])}")
+        for key in ('p50_ms', 'p95_ms', 'p99_ms'):
+            print(f"    latency {key:<7} {delta(old['latency'][key], scenario['latency'][key])}")
+        for stage, summary in scenario['stages'].items():
+            if stage in old['stages']:
+                print(f"    {stage:<15} p95 {delta(old['stages'][stage]['p95_ms'], summary['p95_ms'])}")
+        print(f"    riot calls      {delta(sum(old['upstream']['riot'].values()), sum(scenario['upstream']['riot'].values()))}")
+        print(f"    peak_rss_mb     {delta(old['peak_rss_mb'], scenario['peak_rss_mb'])}")
+
+
+def print_scenario(name: str, scenario: Dict):
+    latency = scenario['latency']
+    print(f"{name}: {scenario['requests']} requests in {scenario['wall_seconds']}s "
+          f"({scenario['throughput_rps']} req/s), statuses {scenario['statuses']}")
+    print(f"  latency          p50 {latency['p50_ms']}ms  p95 {latency['p95_ms']}ms  p99 {latency['p99_ms']}ms")
+    for stage, summary in scenario['stages'].items():
+        print(f"  {stage:<16} p50 {summary['p50_ms']}ms  p95 {summary['p95_ms']}ms  "
+              f"p99 {summary['p99_ms']}ms  rss {summary['max_rss_mb']}MiB")
+    upstream = scenario['upstream']
+    print(f"  upstream         riot {upstream['riot']}  429s {upstream['riot_429']}  bedrock {upstream['bedrock']}")
+    if upstream['riot_fixture_misses']:
+        print(f"  fixture misses   {upstream['riot_fixture_misses']} (replay with the --match-count and --scenarios used to record)")
+    print(f"  peak rss         {scenario['peak_rss_mb']}MiB")
+
+
+async def run(args) -> Dict:
+    # Configure the app before importing it: no job workers, no startup warm-up
+    # requests, and the client assumes the stub's rate limit until the first
+    # response teaches it
+    os.environ.setdefault('MONGO_URL', 'mongodb://localhost:27017')
+    os.environ.setdefault('DB_NAME', 'bench')
+    os.environ.setdefault('RIOT_API_KEY', 'RGAPI-offline-benchmark')
+    os.environ['JOB_WORKERS'] = '0'
+    os.environ['SERVICE_PREWARM'] = '0'
+    if not args.record:
+        os.environ['RIOT_APP_RATE_LIMIT'] = args.riot_app_limit
+
+    import logging
+    import server
+    from benchmarks.offline import (
+        BedrockStub, CountingTransport, FixtureStore, RecordingBedrock, RecordingTransport,
+        RiotStub, install_offline_services
+    )
+    logging.getLogger().setLevel(args.log_level)
+    logging.getLogger('httpx').setLevel(logging.WARNING)
+
+    if args.record:
+        fixtures = FixtureStore(args.record)
+        with open(args.riot_ids) as ids_file:
+            riot_ids = [line.strip() for line in ids_file if line.strip()]
+        riot_transport = CountingTransport(RecordingTransport(fixtures))
+        bedrock = CountingBedrock(RecordingBedrock(server.bedrock_ai.client, fixtures))
+        fixtures.save_manifest(riot_ids, args.region)
+    else:
+        fixtures = FixtureStore(args.fixtures) if args.fixtures else None
+        manifest = fixtures.manifest() if fixtures else None
+        if manifest:
+            riot_ids, args.region = manifest['riot_ids'], manifest['region']
+        else:
+            riot_ids = [f"Bench{n}#BENCH" for n in range(args.players)]
+        riot_transport = CountingTransport(RiotStub(
+            fixtures=fixtures,
+            latency_ms=args.riot_latency_ms,
+            app_limits=parse_limits(args.riot_app_limit),
+            error_rate=args.riot_429_rate,
+            matches_per_player=max(100, args.match_count * 2)
+        ))
+        bedrock = CountingBedrock(BedrockStub(fixtures=fixtures, latency_ms=args.bedrock_latency_ms))
+
+    install_offline_services(server, riot_transport, bedrock, mongo_url=args.mongo_url)
+    recorder = StageRecorder()
+    instrument(server, recorder)
+
+    results = {
+        'config': {**vars(args), 'players': len(riot_ids), 'revision': git_revision(),
+                   'python': sys.version.split()[0], 'started_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime())},
+        'scenarios': {}
+    }
+    async with server.lifespan(server.app):
+        transport = httpx.ASGITransport(app=server.app)
+        async with httpx.AsyncClient(transport=transport, base_url='http://bench', timeout=None) as client:
+            for name in args.scenarios.split(','):
+                scenario = await run_scenario(client, riot_ids, args, recorder, riot_transport, bedrock)
+                results['scenarios'][name] = scenario
+                print_scenario(name, scenario)
+
+    if args.mongo_url:
+        await server.db.client.drop_database(server.db.name)
+    return results
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--players', type=int, default=20, help='synthesized players (ignored when replaying)')
+    parser.add_argument('--requests', type=int, default=100, help='analyses per scenario')
+    parser.add_argument('--concurrency', type=int, default=10)
+    parser.add_argument('--match-count', type=int, default=20)
+    parser.add_argument('--region', default='na')
+    parser.add_argument('--scenarios', default='cold,warm')
+    parser.add_argument('--riot-latency-ms', type=float, default=80)
+    parser.add_argument('--riot-app-limit', default='500:10,30000:600', help='stub app rate limit (production key default)')
+    parser.add_argument('--riot-429-rate', type=float, default=0.0, help='fraction of extra service 429s')
+    parser.add_argument('--bedrock-latency-ms', type=float, default=3000)
+    parser.add_argument('--mongo-url', help='local MongoDB to use instead of mongomock_motor (a throwaway database is created)')
+    parser.add_argument('--fixtures', help='replay Riot and Bedrock responses recorded with --record')
+    parser.add_argument('--record', help='record live Riot and Bedrock responses into this directory')
+    parser.add_argument('--riot-ids', help='file with one Riot ID per line (required with --record)')
+    parser.add_argument('--output', help='write results as JSON')
+    parser.add_argument('--baseline', help='compare with results saved by an earlier --output')
+    parser.add_argument('--log-level', default='WARNING')
+    args = parser.parse_args(argv)
+
+    if args.record and not args.riot_ids:
+        parser.error('--record needs --riot-ids')
+
+    results = asyncio.run(run(args))
+
+    if args.output:
+        with open(args.output, 'w') as output:
+            json.dump(results, output, indent=2)
+        print(f"\nResults written to {args.output}")
+    if args.baseline:
+        with open(args.baseline) as baseline:
+            compare(json.load(baseline), results)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,166 @@
+"""
+Parity check and cost comparison for the streaming match-v5 parser.
+
+Builds a synthetic match-v5 body the size of a real one (10 participants
+with ~150 fields each plus nested challenges and perks), then compares
+decoding it with json.loads + compact_match against feeding it chunk by
+chunk to match_parser.MatchStreamParser, with ``--concurrency`` matches in
+flight at once. Fails if the two records differ.
+
+Each mode runs in its own subprocess so peak RSS is not shared between them.
+
+Usage (from backend/):
+    python -m benchmarks.bench_match_parse --matches 200
+"""
+import argparse
+import hashlib
+import json
+import random
+import resource
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Dict, List
+
+from match_cache import PARTICIPANT_FIELDS, compact_match
+from match_parser import MatchStreamParser
+
+CHUNK_SIZE = 16384
+CHAMPIONS = ['Braum', 'Yasuo', 'Jhin', 'Soraka', 'Shen', 'Garen', 'Ezreal', 'Lux', 'Sona', 'Darius']
+
+
+def synthetic_match(rng: random.Random, match_id: str) -> Dict:
+    """Match-v5 payload with roughly the field count of a real ranked game."""
+    participants = []
+    for i in range(10):
+        participant = {f'stat{k}': rng.randint(0, 50000) for k in range(130)}
+        participant.update({f'flag{k}': rng.random() < 0.5 for k in range(10)})
+        participant.update({
+            'puuid': f'puuid-{match_id}-{i}',
+            'championName': rng.choice(CHAMPIONS),
+            'riotIdGameName': f'Player{i}',
+            'challenges': {f'challenge{k}': rng.random() * 100 for k in range(120)},
+            'perks': {
+                'statPerks': {'defense': 5001, 'flex': 5008, 'offense': 5005},
+                'styles': [
+                    {'description': 'primaryStyle', 'style': 8000,
+                     'selections': [{'perk': 8000 + k, 'var1': k, 'var2': 0, 'var3': 0} for k in range(4)]},
+                    {'description': 'subStyle', 'style': 8100,
+                     'selections': [{'perk': 8100 + k, 'var1': k, 'var2': 0, 'var3': 0} for k in range(2)]}
+                ]
+            },
+            'missions': {f'playerScore{k}': rng.random() for k in range(12)}
+        })
+        for field in PARTICIPANT_FIELDS[2:]:
+            participant[field] = rng.random() < 0.5 if field in ('win', 'firstBloodKill') else rng.randint(0, 300)
+        participants.append(participant)
+
+    return {
+        'metadata': {'matchId': match_id, 'participants': [p['puuid'] for p in participants]},
+        'info': {
+            'gameCreation': 1700000000000,
+            'gameDuration': rng.randint(1200, 2400),
+            'gameStartTimestamp': 1700000000000 + rng.randint(0, 10 ** 9),
+            'gameMode': 'CLASSIC',
+            'participants': participants,
+            'teams': [{'teamId': 100 * (t + 1), 'win': t == 0,
+                       'objectives': {o: {'first': False, 'kills': 3} for o in ('baron', 'dragon', 'tower')}}
+                      for t in range(2)]
+        }
+    }
+
+
+def bodies(count: int, seed: int) -> List[bytes]:
+    rng = random.Random(seed)
+    return [json.dumps(synthetic_match(rng, f'NA1_{i}')).encode() for i in range(count)]
+
+
+def digest(record: Dict) -> str:
+    return hashlib.sha256(json.dumps(record, sort_keys=True).encode()).hexdigest()
+
+
+def parse_group(mode: str, group: List[bytes], offset: int) -> List[Dict]:
+    """Parse ``group`` as if all of its downloads were in flight at once."""
+    match_ids = [f'NA1_{offset + i}' for i in range(len(group))]
+    if mode == 'full':
+        # response.json() holds every in-flight body fully decoded
+        decoded = [json.loads(body) for body in group]
+        return [compact_match(match_id, data) for match_id, data in zip(match_ids, decoded)]
+
+    # Interleave chunks across the in-flight parsers the way concurrent streams arrive
+    parsers = [MatchStreamParser(match_id) for match_id in match_ids]
+    for start in range(0, max(len(body) for body in group), CHUNK_SIZE):
+        for parser, body in zip(parsers, group):
+            if start < len(body):
+                parser.feed(body[start:start + CHUNK_SIZE])
+    return [parser.close() for parser in parsers]
+
+
+def run_mode(mode: str, payloads: List[bytes], concurrency: int) -> Dict:
+    """Parse every payload with one mode and report time, Python peak and RSS."""
+    # Timed without tracemalloc, which slows every allocation and so favours the mode allocating least
+    started = time.perf_counter()
+    for offset in range(0, len(payloads), concurrency):
+        parse_group(mode, payloads[offset:offset + concurrency], offset)
+    seconds = time.perf_counter() - started
+
+    digests = []
+    tracemalloc.start()
+    for offset in range(0, len(payloads), concurrency):
+        records = parse_group(mode, payloads[offset:offset + concurrency], offset)
+        digests.extend(digest(record) for record in records)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'seconds': seconds,
+        'tracemalloc_peak': peak,
+        'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        'digests': digests
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--matches', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=50,
+                        help='matches parsed at once, e.g. 5 analyses x RIOT_MATCH_CONCURRENCY')
+    parser.add_argument('--seed', type=int, default=7)
+    parser.add_argument('--mode', choices=['full', 'stream'], help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    payloads = bodies(args.matches, args.seed)
+
+    if args.mode:
+        result = run_mode(args.mode, payloads, max(1, args.concurrency))
+        print(json.dumps(result))
+        return 0
+
+    results = {}
+    for mode in ('full', 'stream'):
+        child = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_match_parse',
+             '--matches', str(args.matches), '--concurrency', str(args.concurrency),
+             '--seed', str(args.seed), '--mode', mode],
+            capture_output=True, text=True, check=True
+        )
+        results[mode] = json.loads(child.stdout)
+
+    mismatches = [
+        i for i, (full, streamed) in enumerate(zip(results['full']['digests'], results['stream']['digests']))
+        if full != streamed
+    ]
+    average_size = sum(len(body) for body in payloads) / len(payloads)
+    print(f"matches:        {args.matches} (avg body {average_size / 1024:.0f} KiB, {args.concurrency} in flight)")
+    for mode in ('full', 'stream'):
+        result = results[mode]
+        print(
+            f"{mode + ':':<16}{result['seconds'] * 1000 / args.matches:.2f} ms/match, "
+            f"peak {result['tracemalloc_peak'] / 1024:.0f} KiB, max RSS {result['max_rss_kb'] / 1024:.1f} MiB"
+        )
+    print(f"mismatches:     {len(mismatches)}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
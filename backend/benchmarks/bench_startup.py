@@ -0,0 +1,130 @@
+"""
+Cold-start benchmark: time from process start to the first healthy /api/health.
+
+Starts ``uvicorn server:app`` in a fresh interpreter ``--runs`` times and
+polls /api/health until it answers 200, the way the first visitor after an
+idle scale-down waits for the machine. A separate interpreter measures the
+``import server`` time alone and whether boto3 was imported by it. Fails if
+the median exceeds ``--max-seconds``, so a slow import or eager client
+creation shows up as a regression.
+
+Without a MongoDB at ``--mongo-url`` the health check reports the database
+as unhealthy after the URL's serverSelectionTimeoutMS, which is included in
+the measured time; keep it short or run a local mongod.
+
+Usage (from backend/):
+    python -m benchmarks.bench_startup --runs 5 --max-seconds 3
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+import httpx
+
+IMPORT_PROBE = (
+    "import sys, time\n"
+    "started = time.perf_counter()\n"
+    "import server\n"
+    "print(time.perf_counter() - started, 'boto3' in sys.modules)\n"
+)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def bench_env(args) -> Dict[str, str]:
+    """Environment for the server under test; real settings in the environment win."""
+    env = dict(os.environ)
+    env['MONGO_URL'] = args.mongo_url
+    env.setdefault('DB_NAME', 'bench_startup')
+    env.setdefault('RIOT_API_KEY', 'RGAPI-bench')
+    env['SERVICE_PREWARM'] = '0' if args.no_prewarm else '1'
+    return env
+
+
+def measure_import(env: Dict[str, str]) -> Dict:
+    child = subprocess.run(
+        [sys.executable, '-c', IMPORT_PROBE], env=env, capture_output=True, text=True, check=True
+    )
+    seconds, boto3_loaded = child.stdout.split()[-2:]
+    return {'seconds': float(seconds), 'boto3_loaded': boto3_loaded == 'True'}
+
+
+def measure_startup(env: Dict[str, str], require_database: bool, timeout: float) -> Dict:
+    """Seconds from spawning uvicorn to the first 200 from /api/health."""
+    port = free_port()
+    url = f'http://127.0.0.1:{port}/api/health'
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'uvicorn', 'server:app', '--port', str(port), '--log-level', 'warning'],
+        env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE
+    )
+    try:
+        with httpx.Client(timeout=timeout) as client:
+            while time.perf_counter() - started < timeout:
+                if process.poll() is not None:
+                    raise RuntimeError(f"server exited: {process.stderr.read().decode()[-2000:]}")
+                try:
+                    response = client.get(url)
+                except httpx.TransportError:
+                    time.sleep(0.01)
+                    continue
+                health = response.json() if response.status_code == 200 else {}
+                if health and (not require_database or health.get('database') == 'healthy'):
+                    return {'seconds': time.perf_counter() - started, 'health': health}
+                time.sleep(0.01)
+        raise RuntimeError(f"/api/health not healthy within {timeout}s")
+    finally:
+        process.terminate()
+        try:
+            process.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-seconds', type=float, default=3.0,
+                        help='fail if the median time to healthy exceeds this')
+    parser.add_argument('--mongo-url', default='mongodb://localhost:27017/?serverSelectionTimeoutMS=250')
+    parser.add_argument('--require-database', action='store_true',
+                        help='only count /api/health as healthy once the database ping succeeds')
+    parser.add_argument('--no-prewarm', action='store_true', help='run with SERVICE_PREWARM=0')
+    parser.add_argument('--timeout', type=float, default=60.0)
+    parser.add_argument('--output', help='write the results as JSON')
+    args = parser.parse_args(argv)
+
+    env = bench_env(args)
+    imported = measure_import(env)
+    runs = [measure_startup(env, args.require_database, args.timeout) for _ in range(max(1, args.runs))]
+    seconds = [run['seconds'] for run in runs]
+    median = statistics.median(seconds)
+
+    print(f"import server:    {imported['seconds'] * 1000:.0f} ms (boto3 imported: {imported['boto3_loaded']})")
+    print(
+        f"time to healthy:  median {median * 1000:.0f} ms, min {min(seconds) * 1000:.0f} ms, "
+        f"max {max(seconds) * 1000:.0f} ms over {len(runs)} runs"
+    )
+    print(f"health:           {json.dumps(runs[-1]['health'])}")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'import': imported, 'runs': seconds, 'median': median}, f, indent=2)
+
+    if median > args.max_seconds:
+        print(f"FAIL: median {median:.2f}s exceeds --max-seconds {args.max_seconds:.2f}s")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Parity check and timing for PersonalityEngine.calculate_traits_batch.
+
+Scores a population of synthetic players with both the scalar path
+(calculate_traits) and the vectorized batch path, fails if any score
+differs, and reports the throughput of each.
+
+Usage (from backend/):
+    python -m benchmarks.bench_traits_batch --players 200000
+"""
+import argparse
+import random
+import sys
+import time
+from typing import Dict, List
+
+from personality_engine import PersonalityEngine
+
+
+def synthetic_stats(rng: random.Random) -> Dict:
+    """Aggregated stats shaped like RiotAPI.get_player_stats output."""
+    games = rng.choice([0, 1, 5, 20, 50])
+    stats = {
+        'total_games': games,
+        'kills': rng.randint(0, 15) * games,
+        'assists': rng.randint(0, 20) * games,
+        'first_bloods': rng.randint(0, games),
+        'solo_kills': rng.randint(0, games),
+        'multikills': rng.randint(0, games)
+    }
+    if games:
+        stats.update({
+            'avg_kills': round(rng.uniform(0, 15), 2),
+            'avg_deaths': round(rng.uniform(0, 12), 2),
+            'avg_assists': round(rng.uniform(0, 25), 2),
+            'avg_cs': round(rng.uniform(0, 300), 1),
+            'avg_gold': float(rng.randint(4000, 18000)),
+            'avg_vision_score': round(rng.uniform(0, 90), 1),
+            'avg_wards_placed': round(rng.uniform(0, 30), 1),
+            'avg_damage_taken': float(rng.randint(5000, 45000)),
+            'win_rate': round(rng.uniform(0, 100), 1),
+            'kda': round(rng.uniform(0, 12), 2),
+            'champion_pool_size': rng.randint(1, 15)
+        })
+    # Drop the occasional key to exercise the .get defaults
+    if rng.random() < 0.05:
+        stats.pop(rng.choice(list(stats)))
+    return stats
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--players', type=int, default=100000)
+    parser.add_argument('--seed', type=int, default=7)
+    args = parser.parse_args(argv)
+
+    engine = PersonalityEngine()
+    rng = random.Random(args.seed)
+    population = [synthetic_stats(rng) for _ in range(args.players)]
+
+    started = time.perf_counter()
+    scalar = [[trait['score'] for trait in engine.calculate_traits(stats)] for stats in population]
+    scalar_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    matrix = engine.stats_matrix(population)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    batch = engine.calculate_traits_batch(matrix)
+    batch_seconds = time.perf_counter() - started
+
+    mismatches = [i for i, row in enumerate(scalar) if list(batch[i]) != row]
+    print(f"players:        {args.players}")
+    print(f"scalar:         {scalar_seconds:.3f}s ({args.players / scalar_seconds:,.0f}/s)")
+    print(f"stats_matrix:   {build_seconds:.3f}s")
+    print(f"batch:          {batch_seconds:.3f}s ({args.players / max(batch_seconds, 1e-9):,.0f}/s)")
+    print(f"mismatches:     {len(mismatches)}")
+
+    for i in mismatches[:5]:
+        print(f"  {population[i]}\n    scalar={scalar[i]} batch={list(batch[i])}")
+    return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
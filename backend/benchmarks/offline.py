@@ -0,0 +1,386 @@
+"""
+Offline stand-ins for Riot, Bedrock and MongoDB used by the end-to-end benchmark.
+
+- FixtureStore: recorded Riot responses and Bedrock narratives on disk
+- RecordingTransport / RecordingBedrock: wrap the live services and save what they return
+- RiotStub: httpx transport replaying fixtures (or synthesizing players and
+  matches) with configurable latency and Riot-style 429 rate limiting
+- BedrockStub: boto3-shaped client returning recorded or canned narratives after a delay
+- install_offline_services: points server.py at the stubs and an offline database
+"""
+import io
+import json
+import time
+import random
+import asyncio
+import hashlib
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.bench_match_parse import synthetic_match
+from host_pools import HostPools
+
+# Riot endpoint names, matching the method names RiotAPI uses for rate limiting
+ENDPOINTS = (
+    ('/riot/account/v1/accounts/by-riot-id/', 'account'),
+    ('/lol/summoner/v4/summoners/by-puuid/', 'summoner'),
+    ('/lol/match/v5/matches/', 'match')
+)
+
+
+def endpoint_name(path: str) -> str:
+    """Riot endpoint a request path belongs to."""
+    if path.endswith('/ids'):
+        return 'match-ids'
+    for marker, name in ENDPOINTS:
+        if marker in path:
+            return name
+    return 'other'
+
+
+def fixture_key(request: httpx.Request) -> str:
+    """Stable key for a Riot request: host, path and sorted query, without the API key."""
+    query = '&'.join(f"{k}={v}" for k, v in sorted(request.url.params.multi_items()))
+    return f"{request.url.host}{request.url.path}?{query}"
+
+
+class FixtureStore:
+    """
+    Recorded upstream responses kept in one directory.
+
+    ``riot/<sha1>.json`` holds one Riot response each, ``bedrock.json`` the
+    recorded narratives and ``manifest.json`` the Riot IDs and region the
+    recording was made for.
+    """
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        self.riot_dir = self.root / 'riot'
+        self._narratives: Optional[List[str]] = None
+
+    def _riot_path(self, key: str) -> Path:
+        return self.riot_dir / f"{hashlib.sha1(key.encode()).hexdigest()}.json"
+
+    def save_riot(self, key: str, status_code: int, content: bytes):
+        self.riot_dir.mkdir(parents=True, exist_ok=True)
+        self._riot_path(key).write_text(json.dumps({
+            'key': key,
+            'status_code': status_code,
+            'body': content.decode('utf-8')
+        }))
+
+    def load_riot(self, key: str) -> Optional[Tuple[int, bytes]]:
+        path = self._riot_path(key)
+        if not path.exists():
+            return None
+        fixture = json.loads(path.read_text())
+        return fixture['status_code'], fixture['body'].encode('utf-8')
+
+    def narratives(self) -> List[str]:
+        if self._narratives is None:
+            path = self.root / 'bedrock.json'
+            self._narratives = json.loads(path.read_text()) if path.exists() else []
+        return self._narratives
+
+    def save_narrative(self, text: str):
+        self.narratives().append(text)
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / 'bedrock.json').write_text(json.dumps(self._narratives))
+
+    def manifest(self) -> Optional[Dict]:
+        path = self.root / 'manifest.json'
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def save_manifest(self, riot_ids: List[str], region: str):
+        self.root.mkdir(parents=True, exist_ok=True)
+        (self.root / 'manifest.json').write_text(json.dumps({'riot_ids': riot_ids, 'region': region}))
+
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Counts Riot requests per endpoint and 429s before delegating to ``inner``."""
+
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self.inner = inner
+        self.calls = Counter()
+        self.rate_limited = 0
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        self.calls[endpoint_name(request.url.path)] += 1
+        response = await self.inner.handle_async_request(request)
+        if response.status_code == 429:
+            self.rate_limited += 1
+        return response
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class RecordingTransport(httpx.AsyncBaseTransport):
+    """Forwards to the live Riot API and saves every 200/404 response to a FixtureStore."""
+
+    def __init__(self, fixtures: FixtureStore, inner: Optional[httpx.AsyncBaseTransport] = None):
+        self.fixtures = fixtures
+        self.inner = inner or httpx.AsyncHTTPTransport()
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        response = await self.inner.handle_async_request(request)
+        content = await response.aread()
+        if response.status_code in (200, 404):
+            self.fixtures.save_riot(fixture_key(request), response.status_code, content)
+        return httpx.Response(response.status_code, headers=response.headers, content=content)
+
+    async def aclose(self):
+        await self.inner.aclose()
+
+
+class FixedWindowLimiter:
+    """Riot-style fixed windows, e.g. ``[(500, 10), (30000, 600)]``."""
+
+    def __init__(self, limits: List[Tuple[int, int]]):
+        self.limits = limits
+        self.windows = {seconds: [0.0, 0] for _, seconds in limits}
+
+    def header(self) -> str:
+        return ','.join(f"{amount}:{seconds}" for amount, seconds in self.limits)
+
+    def hit(self) -> Tuple[Optional[float], str]:
+        """Count a request; returns (Retry-After if over the limit, count header)."""
+        now = time.monotonic()
+        retry_after = None
+        for amount, seconds in self.limits:
+            window = self.windows[seconds]
+            if now - window[0] >= seconds:
+                window[0], window[1] = now, 0
+            if window[1] >= amount:
+                retry_after = max(retry_after or 0, seconds - (now - window[0]))
+        if retry_after is None:
+            for window in self.windows.values():
+                window[1] += 1
+        counts = ','.join(f"{self.windows[seconds][1]}:{seconds}" for _, seconds in self.limits)
+        return retry_after, counts
+
+
+class RiotStub(httpx.AsyncBaseTransport):
+    """
+    In-process Riot API with realistic latency and rate limiting.
+
+    Responses come from a FixtureStore when one is given, otherwise players
+    ``Bench<n>#BENCH`` and their matches are synthesized: each player's
+    history starts ``player_spacing`` games after the previous player's, so
+    nearby players share recent games like teammates do, and match bodies
+    have the size and shape of real match-v5 payloads.
+
+    Args:
+        fixtures: Recorded responses to replay, or None to synthesize
+        latency_ms: Median response latency
+        jitter: Log-normal sigma applied to the latency
+        app_limits: Application rate limit windows enforced per routing host
+        error_rate: Fraction of requests answered with a spurious 429 (service limit)
+        matches_per_player: Length of each synthesized match history
+        player_spacing: Offset between consecutive players' histories
+        seed: Random seed for latency and errors
+        cache_bodies: Keep synthesized match bodies for reuse (off when measuring memory)
+    """
+
+    def __init__(
+        self,
+        fixtures: Optional[FixtureStore] = None,
+        latency_ms: float = 80,
+        jitter: float = 0.3,
+        app_limits: List[Tuple[int, int]] = ((500, 10), (30000, 600)),
+        error_rate: float = 0.0,
+        matches_per_player: int = 100,
+        player_spacing: int = 10,
+        seed: int = 7,
+        cache_bodies: bool = True
+    ):
+        self.fixtures = fixtures
+        self.latency = latency_ms / 1000
+        self.jitter = jitter
+        self.app_limits = list(app_limits)
+        self.limiters: Dict[str, FixedWindowLimiter] = {}
+        self.error_rate = error_rate
+        self.matches_per_player = matches_per_player
+        self.player_spacing = max(1, player_spacing)
+        self.rng = random.Random(seed)
+        self.fixture_misses = 0
+        self.cache_bodies = cache_bodies
+        self._bodies: Dict[str, bytes] = {}
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        host = request.url.host
+        limiter = self.limiters.setdefault(host, FixedWindowLimiter(self.app_limits))
+        retry_after, counts = limiter.hit()
+        headers = {'X-App-Rate-Limit': limiter.header(), 'X-App-Rate-Limit-Count': counts}
+
+        await asyncio.sleep(self.latency * self.rng.lognormvariate(0, self.jitter))
+
+        if retry_after is not None:
+            return httpx.Response(429, headers={
+                **headers, 'Retry-After': str(max(1, round(retry_after))), 'X-Rate-Limit-Type': 'application'
+            })
+        if self.error_rate and self.rng.random() < self.error_rate:
+            return httpx.Response(429, headers={**headers, 'Retry-After': '1', 'X-Rate-Limit-Type': 'service'})
+
+        if self.fixtures:
+            fixture = self.fixtures.load_riot(fixture_key(request))
+            if fixture is None:
+                self.fixture_misses += 1
+                return httpx.Response(404, headers=headers, json={'status': {'message': 'No fixture'}})
+            status_code, content = fixture
+            return httpx.Response(status_code, headers={**headers, 'Content-Type': 'application/json'}, content=content)
+
+        status_code, content = self._synthesize(request)
+        return httpx.Response(status_code, headers={**headers, 'Content-Type': 'application/json'}, content=content)
+
+    def _player_matches(self, player: int) -> range:
+        start = player * self.player_spacing
+        return range(start, start + self.matches_per_player)
+
+    def _synthesize(self, request: httpx.Request) -> Tuple[int, bytes]:
+        path = request.url.path
+        endpoint = endpoint_name(path)
+
+        if endpoint == 'account':
+            game_name = path.split('/by-riot-id/')[1].split('/')[0]
+            if not game_name.startswith('Bench') or not game_name[5:].isdigit():
+                return 404, b'{"status": {"message": "Data not found"}}'
+            return 200, json.dumps({'puuid': f'puuid-{game_name}', 'gameName': game_name, 'tagLine': 'BENCH'}).encode()
+
+        if endpoint == 'summoner':
+            return 200, json.dumps({'summonerLevel': 250}).encode()
+
+        if endpoint == 'match-ids':
+            player = int(path.split('/by-puuid/puuid-Bench')[1].split('/')[0])
+            start = int(request.url.params.get('start', 0))
+            count = int(request.url.params.get('count', 20))
+            # Newest first: higher match numbers are more recent
+            history = [f'NA1_{k}' for k in reversed(self._player_matches(player))]
+            start_time = request.url.params.get('startTime')
+            if start_time:
+                history = [match_id for match_id in history if self._game_start(match_id) // 1000 >= int(start_time)]
+            return 200, json.dumps(history[start:start + count]).encode()
+
+        if endpoint == 'match':
+            match_id = path.rsplit('/', 1)[1]
+            body = self._bodies.get(match_id)
+            if body is None:
+                body = self._match_body(match_id)
+                if self.cache_bodies:
+                    self._bodies[match_id] = body
+            return 200, body
+
+        return 404, b'{}'
+
+    @staticmethod
+    def _game_start(match_id: str) -> int:
+        return 1700000000000 + int(match_id.split('_')[1]) * 3600000
+
+    def _match_body(self, match_id: str) -> bytes:
+        number = int(match_id.split('_')[1])
+        match = synthetic_match(random.Random(number), match_id)
+        match['info']['gameStartTimestamp'] = self._game_start(match_id)
+        # Players whose history contains this match take the participant slots
+        last = number // self.player_spacing
+        players = [p for p in range(last, -1, -1) if number in self._player_matches(p)]
+        for slot, player in enumerate(players[:10]):
+            match['info']['participants'][slot]['puuid'] = f'puuid-Bench{player}'
+        return json.dumps(match).encode()
+
+    async def aclose(self):
+        pass
+
+
+class _Body:
+    def __init__(self, data: bytes):
+        self._stream = io.BytesIO(data)
+
+    def read(self) -> bytes:
+        return self._stream.read()
+
+
+class BedrockStub:
+    """
+    boto3 bedrock-runtime stand-in.
+
+    Blocks for the configured latency like the real (synchronous) client,
+    so it exercises BedrockAI's executor, slots and deadlines.
+    """
+
+    def __init__(self, fixtures: Optional[FixtureStore] = None, latency_ms: float = 3000, seed: int = 7):
+        self.narratives = (fixtures.narratives() if fixtures else []) or [
+            'The Runes stir as {name} steps forward. Steady hands, patient eyes: '
+            'a summoner who wins the long game and shares every victory.'
+        ]
+        self.latency = latency_ms / 1000
+        self.rng = random.Random(seed)
+
+    def _narrative(self, body: str) -> str:
+        prompt = json.loads(body)['messages'][0]['content'][0]['text']
+        name = prompt.split('"')[1] if prompt.count('"') >= 2 else 'the summoner'
+        return self.rng.choice(self.narratives).replace('{name}', name)
+
+    def invoke_model(self, body: str, **kwargs) -> Dict:
+        text = self._narrative(body)
+        time.sleep(self.latency * self.rng.lognormvariate(0, 0.2))
+        return {'body': _Body(json.dumps({'content': [{'type': 'text', 'text': text}]}).encode())}
+
+    def invoke_model_with_response_stream(self, body: str, **kwargs) -> Dict:
+        words = self._narrative(body).split(' ')
+        delay = self.latency / max(len(words), 1)
+
+        def events():
+            for i, word in enumerate(words):
+                time.sleep(delay)
+                text = word if i == 0 else f' {word}'
+                yield {'chunk': {'bytes': json.dumps({
+                    'type': 'content_block_delta', 'delta': {'type': 'text_delta', 'text': text}
+                }).encode()}}
+
+        return {'body': events()}
+
+
+class RecordingBedrock:
+    """Forwards to the live Bedrock client and saves every generated narrative."""
+
+    def __init__(self, client, fixtures: FixtureStore):
+        self.client = client
+        self.fixtures = fixtures
+
+    def invoke_model(self, **kwargs) -> Dict:
+        response = self.client.invoke_model(**kwargs)
+        data = response['body'].read()
+        self.fixtures.save_narrative(json.loads(data)['content'][0]['text'])
+        return {**response, 'body': _Body(data)}
+
+    def invoke_model_with_response_stream(self, **kwargs) -> Dict:
+        return self.client.invoke_model_with_response_stream(**kwargs)
+
+
+def install_offline_services(server, riot_transport: httpx.AsyncBaseTransport, bedrock_client, mongo_url: Optional[str] = None):
+    """
+    Point server.py at offline upstreams and a throwaway database.
+
+    Args:
+        server: The imported server module
+        riot_transport: Transport the Riot client sends through
+        bedrock_client: boto3-shaped client used by BedrockAI
+        mongo_url: Local MongoDB to use; mongomock_motor when None
+    """
+    if mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        database = AsyncIOMotorClient(mongo_url)[f'bench_{int(time.time())}']
+    else:
+        from mongomock_motor import AsyncMongoMockClient
+        database = AsyncMongoMockClient()['bench']
+
+    server._attach_database(database)
+    server.narrative_cache.memory.clear()
+    server.analysis_responses.clear()
+
+    server.riot_api.pools = HostPools(server.riot_api.headers, transport=riot_transport)
+    server.bedrock_ai.client = bedrock_client
+    return database
@@ -0,0 +1,80 @@
+"""
+In-Process Caching - Bounded LRU cache with per-entry expiry
+"""
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# Returned by TTLCache.get when a key is absent, so cached None values stay distinguishable
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Bounded in-memory cache with LRU eviction and time-to-live expiry.
+
+    Values may be None, which makes negative caching possible; use the
+    ``MISSING`` sentinel to tell a miss apart from a cached None.
+    """
+
+    def __init__(self, maxsize: int, ttl: Optional[float] = None):
+        """
+        Args:
+            maxsize: Maximum number of entries before the least recently used is evicted
+            ttl: Default lifetime of an entry in seconds (None to never expire)
+        """
+        self.maxsize = max(1, maxsize)
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = MISSING) -> Any:
+        """Return the cached value for ``key``, or ``default`` if absent or expired."""
+        entry = self._entries.get(key)
+        if entry is not None:
+            value, expires_at = entry
+            if expires_at is None or expires_at > time.monotonic():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._entries[key]
+        self.misses += 1
+        return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Store ``value`` under ``key``.
+
+        Args:
+            key: Cache key
+            value: Value to store (None is allowed)
+            ttl: Lifetime override in seconds; defaults to the cache's ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        """Remove every entry."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict:
+        """Size and hit/miss counters."""
+        lookups = self.hits + self.misses
+        return {
+            'size': len(self._entries),
+            'maxsize': self.maxsize,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+        }
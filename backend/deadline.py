@@ -0,0 +1,122 @@
+"""
+Request Deadlines - One time budget shared by every stage of an analysis
+"""
+import time
+import asyncio
+from contextvars import ContextVar
+from typing import Awaitable, Dict, List, Optional, TypeVar
+
+import metrics
+
+T = TypeVar('T')
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """A stage ran out of its share of the request's time budget."""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline reached during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Time budget of one request, and the stages that had to cut corners to meet it.
+
+    Each stage may keep a reserve for the stages after it: with a 20 second
+    budget and a 6 second ``riot_fetch`` reserve, Riot calls stop 14 seconds
+    in so the narrative still gets its turn. A Deadline without a budget never
+    expires but still records degraded stages.
+    """
+
+    def __init__(self, seconds: Optional[float] = None, reserves: Optional[Dict[str, float]] = None):
+        """
+        Args:
+            seconds: Budget from now; None or 0 for no deadline
+            reserves: Seconds each stage must leave for the stages after it
+        """
+        self.seconds = seconds or None
+        self.expires_at = time.monotonic() + seconds if self.seconds else None
+        self.reserves = reserves or {}
+        self.degraded: List[str] = []
+
+    def remaining(self, stage: Optional[str] = None) -> Optional[float]:
+        """Seconds left for ``stage`` (after its reserve), or None without a deadline."""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - self.reserves.get(stage, 0.0) - time.monotonic())
+
+    def degrade(self, stage: str):
+        """Record that ``stage`` returned a partial or fallback result."""
+        if stage not in self.degraded:
+            self.degraded.append(stage)
+            metrics.DEGRADED.labels(stage).inc()
+
+    async def run(self, stage: str, awaitable: Awaitable[T]) -> T:
+        """
+        Await ``awaitable`` within the time left for ``stage``.
+
+        Raises:
+            DeadlineExceeded: If the time runs out first (``stage`` is marked degraded)
+        """
+        remaining = self.remaining(stage)
+        if remaining is None:
+            return await awaitable
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            self.degrade(stage)
+            raise DeadlineExceeded(stage)
+        try:
+            return await asyncio.wait_for(awaitable, remaining)
+        except asyncio.TimeoutError as e:
+            # Inner deadlines and the awaitable's own timeouts pass through unchanged
+            if isinstance(e, DeadlineExceeded) or self.remaining(stage) > 0:
+                raise
+            self.degrade(stage)
+            raise DeadlineExceeded(stage) from None
+
+
+# Deadline of the analysis running in this context; tasks created from it inherit it
+_current: ContextVar[Optional[Deadline]] = ContextVar('deadline', default=None)
+
+
+def start(deadline: Deadline):
+    """Make ``deadline`` the current one; returns a token for ``reset``."""
+    return _current.set(deadline)
+
+
+def reset(token):
+    _current.reset(token)
+
+
+def current() -> Optional[Deadline]:
+    """The current request's deadline, if any."""
+    return _current.get()
+
+
+async def bounded(stage: str, awaitable: Awaitable[T]) -> T:
+    """Await ``awaitable`` within the current deadline's time for ``stage`` (unbounded without one)."""
+    deadline = _current.get()
+    if deadline is None:
+        return await awaitable
+    return await deadline.run(stage, awaitable)
+
+
+def remaining(stage: Optional[str] = None) -> Optional[float]:
+    """Seconds the current deadline leaves for ``stage``, or None without one."""
+    deadline = _current.get()
+    return deadline.remaining(stage) if deadline else None
+
+
+def degrade(stage: str):
+    """Mark ``stage`` degraded on the current deadline, if any."""
+    deadline = _current.get()
+    if deadline:
+        deadline.degrade(stage)
+
+
+def degraded(stage: str) -> bool:
+    """Whether ``stage`` was degraded under the current deadline."""
+    deadline = _current.get()
+    return bool(deadline) and stage in deadline.degraded
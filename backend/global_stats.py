@@ -0,0 +1,242 @@
+"""
+Global Statistics - Community-wide counters kept up to date as analyses are stored
+"""
+import os
+import random
+import logging
+from datetime import datetime, timezone
+from typing import AsyncIterable, Dict
+
+from cache import TTLCache, MISSING
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Counter documents incremented at random, so concurrent stores rarely contend for one document
+GLOBAL_STATS_SHARDS = int(os.environ.get('GLOBAL_STATS_SHARDS', '8'))
+
+# Seconds a summary is served from memory before the counter documents are read again
+GLOBAL_STATS_CACHE_SECONDS = float(os.environ.get('GLOBAL_STATS_CACHE_SECONDS', '10'))
+
+# Trait scores are whole numbers in this range (PersonalityEngine); each score is a histogram bucket
+TRAIT_SCORE_MIN = 1
+TRAIT_SCORE_MAX = 10
+
+# Fields of a stored analysis the counters are built from
+ANALYSIS_FIELDS = {
+    '_id': 0,
+    'games_analyzed': 1,
+    'win_rate': 1,
+    'kda': 1,
+    'traits.name': 1,
+    'traits.score': 1,
+    'spirit_champion.primary.champion': 1
+}
+
+
+def _field(name: str) -> str:
+    """Champion or trait name as a Mongo field name ('.' and '$' are not allowed there)."""
+    return name.replace('.', '．').replace('$', '＄')
+
+
+def _name(field: str) -> str:
+    """Inverse of ``_field``."""
+    return field.replace('．', '.').replace('＄', '$')
+
+
+def analysis_increments(analysis: Dict) -> Dict[str, int]:
+    """
+    Counter increments for one stored analysis.
+
+    Args:
+        analysis: Stored analysis document (at least the ANALYSIS_FIELDS)
+
+    Returns:
+        Dotted counter path to increment, as used by ``$inc``
+    """
+    increments = {
+        'analyses': 1,
+        'games_analyzed': analysis.get('games_analyzed', 0),
+        # Win rate and KDA are stored rounded to 0.1 and 0.01; integer sums stay exact in any order
+        'win_rate_tenths': round(analysis.get('win_rate', 0.0) * 10),
+        'kda_hundredths': round(analysis.get('kda', 0.0) * 100),
+        f"spirit_champions.{_field(analysis['spirit_champion']['primary']['champion'])}": 1
+    }
+    for trait in analysis.get('traits', []):
+        score = min(max(int(trait['score']), TRAIT_SCORE_MIN), TRAIT_SCORE_MAX)
+        increments[f"trait_scores.{_field(trait['name'])}.{score}"] = 1
+    return increments
+
+
+def _add_nested(totals: Dict, counters: Dict):
+    """Add a (nested) counter document into ``totals``."""
+    for key, value in counters.items():
+        if isinstance(value, dict):
+            _add_nested(totals.setdefault(key, {}), value)
+        elif isinstance(value, (int, float)):
+            totals[key] = totals.get(key, 0) + value
+
+
+def add_increments(totals: Dict[str, int], increments: Dict[str, int], sign: int = 1):
+    """Add (or with ``sign=-1`` subtract) ``$inc`` increments into a flat increments dict."""
+    for path, value in increments.items():
+        totals[path] = totals.get(path, 0) + sign * value
+
+
+def _apply_increments(totals: Dict, increments: Dict[str, int]):
+    """Apply dotted ``$inc`` paths to a nested counter document in memory."""
+    for path, value in increments.items():
+        *parents, leaf = path.split('.')
+        target = totals
+        for parent in parents:
+            target = target.setdefault(parent, {})
+        target[leaf] = target.get(leaf, 0) + value
+
+
+def summarize(totals: Dict) -> Dict:
+    """
+    Public view of the summed counters.
+
+    Args:
+        totals: Counter documents added together
+
+    Returns:
+        Analysis and game counts, average win rate and KDA, the spirit
+        champion distribution (most common first) and, per trait, the
+        number of analyses with each score
+    """
+    analyses = totals.get('analyses', 0)
+    champions = sorted(
+        ((_name(field), count) for field, count in totals.get('spirit_champions', {}).items() if count > 0),
+        key=lambda item: (-item[1], item[0])
+    )
+    histograms = {}
+    for field, buckets in totals.get('trait_scores', {}).items():
+        histograms[_name(field)] = {
+            str(score): buckets.get(str(score), 0) for score in range(TRAIT_SCORE_MIN, TRAIT_SCORE_MAX + 1)
+        }
+
+    return {
+        'analyses': analyses,
+        'games_analyzed': totals.get('games_analyzed', 0),
+        'average_win_rate': round(totals.get('win_rate_tenths', 0) / 10 / analyses, 1) if analyses else 0.0,
+        'average_kda': round(totals.get('kda_hundredths', 0) / 100 / analyses, 2) if analyses else 0.0,
+        'spirit_champions': [
+            {'champion': champion, 'count': count, 'share': round(count / analyses * 100, 1)}
+            for champion, count in champions
+        ],
+        'trait_histograms': histograms
+    }
+
+
+async def build_totals(analyses: AsyncIterable[Dict]) -> Dict:
+    """Counter document for a stream of stored analyses, as ``record`` would have built it."""
+    totals: Dict = {}
+    async for analysis in analyses:
+        try:
+            _apply_increments(totals, analysis_increments(analysis))
+        except (KeyError, TypeError) as e:
+            logger.warning(f"Skipping malformed analysis in global stats: {e}")
+    return totals
+
+
+class GlobalStats:
+    """
+    Community-wide analysis counters, kept in a few sharded documents.
+
+    Every stored analysis adds to the counters of one shard with a single
+    atomic ``$inc``, so reading the statistics means reading ``shards``
+    small documents, however many analyses exist. Counters only ever grow:
+    analyses removed by the retention TTL stay counted until ``rebuild``.
+    """
+
+    def __init__(
+        self,
+        collection,
+        shards: int = GLOBAL_STATS_SHARDS,
+        cache_seconds: float = GLOBAL_STATS_CACHE_SECONDS
+    ):
+        """
+        Args:
+            collection: Motor collection holding the counter documents
+            shards: Number of counter documents
+            cache_seconds: Seconds a summary is served from memory
+        """
+        self.collection = collection
+        self.shards = max(1, shards)
+        self.cache_seconds = cache_seconds
+        self._summary = TTLCache(1, ttl=cache_seconds)
+
+    async def record(self, analysis: Dict):
+        """
+        Count a stored analysis; failures are logged and leave the counters to ``rebuild``.
+
+        Args:
+            analysis: The stored analysis document
+        """
+        await self.increment(analysis_increments(analysis))
+
+    async def increment(self, increments: Dict[str, int]):
+        """
+        Add to the counters of one shard in a single atomic update.
+
+        Args:
+            increments: Dotted counter path to amount (negative to subtract)
+        """
+        increments = {path: value for path, value in increments.items() if value}
+        if not increments:
+            return
+        try:
+            with metrics.upstream('mongo', 'global_stats.inc'):
+                await self.collection.update_one(
+                    {'_id': f'shard-{random.randrange(self.shards)}'},
+                    {'$inc': increments, '$set': {'updated_at': datetime.now(timezone.utc)}},
+                    upsert=True
+                )
+        except Exception as e:
+            logger.error(f"Error updating global stats: {e}")
+
+    async def totals(self) -> Dict:
+        """Counter documents added together."""
+        totals: Dict = {}
+        with metrics.upstream('mongo', 'global_stats.find'):
+            async for shard in self.collection.find({}, {'_id': 0, 'updated_at': 0}):
+                _add_nested(totals, shard)
+        return totals
+
+    async def summary(self) -> Dict:
+        """Public statistics, served from memory for ``cache_seconds``."""
+        cached = self._summary.get('summary')
+        metrics.cache_result('global_stats', hits=cached is not MISSING, misses=cached is MISSING)
+        if cached is MISSING:
+            cached = summarize(await self.totals())
+            self._summary.set('summary', cached)
+        return cached
+
+    async def rebuild(self, analyses, dry_run: bool = False) -> Dict:
+        """
+        Recompute the counters from every stored analysis.
+
+        Reads the analyses collection once and replaces all shards with a
+        single document. Analyses stored while it runs may be counted twice
+        or not at all, so run it when few analyses are being stored.
+
+        Args:
+            analyses: Motor collection of stored analyses
+            dry_run: Compute the counters without writing them
+
+        Returns:
+            The recomputed counter document
+        """
+        totals = await build_totals(analyses.find({}, ANALYSIS_FIELDS))
+        if not dry_run:
+            await self.collection.replace_one(
+                {'_id': 'shard-0'},
+                {**totals, 'updated_at': datetime.now(timezone.utc)},
+                upsert=True
+            )
+            await self.collection.delete_many({'_id': {'$ne': 'shard-0'}})
+            self._summary.clear()
+            logger.info(f"Rebuilt global stats from {totals.get('analyses', 0)} analyses")
+        return totals
+
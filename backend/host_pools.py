@@ -0,0 +1,160 @@
+"""
+Host Connection Pools - Keep-alive HTTP clients, one pool per upstream host
+"""
+import asyncio
+import logging
+import threading
+from typing import Dict, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+
+class HostPools:
+    """
+    Persistent keep-alive httpx clients keyed by host.
+
+    Each Riot routing host (americas, europe, ...) and platform host (na1,
+    euw1, ...) gets its own connection pool, so TCP and TLS handshakes are
+    paid once per connection rather than per call, and a burst of match
+    downloads on the routing host cannot take every connection from the
+    platform host. Clients are created on first use and share one SSL
+    context.
+
+    Connection reuse is measured with httpcore's trace hook: every request
+    counts, and every TCP connect counts as a new connection.
+    """
+
+    def __init__(
+        self,
+        headers: Dict[str, str],
+        max_connections: int = 50,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        timeout: float = 10.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        """
+        Args:
+            headers: Headers sent with every request
+            max_connections: Connections open at once per host
+            max_keepalive: Idle connections kept per host
+            keepalive_expiry: Seconds an idle connection is kept
+            http2: Multiplex requests over HTTP/2 connections (needs the ``h2`` package)
+            timeout: Request timeout in seconds
+            transport: Transport shared by every host, replacing the network (benchmarks)
+        """
+        if http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                logger.warning("HTTP/2 requested but the h2 package is not installed; using HTTP/1.1")
+                http2 = False
+        self.headers = headers
+        self.limits = httpx.Limits(
+            max_connections=max(1, max_connections),
+            max_keepalive_connections=max(0, max_keepalive),
+            keepalive_expiry=keepalive_expiry
+        )
+        self.http2 = http2
+        self.timeout = timeout
+        self.transport = transport
+        self._ssl_context = None
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._counters: Dict[str, Dict[str, int]] = {}
+        self._lock = threading.Lock()
+
+    def client(self, host: str) -> httpx.AsyncClient:
+        """Client for ``host``, created on first use (from any thread)."""
+        client = self._clients.get(host)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(host)
+                if client is None:
+                    if self._ssl_context is None and self.transport is None:
+                        # Loading the CA bundle takes ~150ms; every host shares the result
+                        self._ssl_context = httpx.create_ssl_context()
+                    client = httpx.AsyncClient(
+                        headers=self.headers,
+                        timeout=self.timeout,
+                        limits=self.limits,
+                        http2=self.http2,
+                        verify=self._ssl_context or True,
+                        transport=self.transport
+                    )
+                    self._counters[host] = {'requests': 0, 'in_flight': 0, 'connections_opened': 0}
+                    self._clients[host] = client
+        return client
+
+    async def send(self, host: str, url: str, params: Optional[Dict] = None, stream: bool = False) -> httpx.Response:
+        """
+        Send a GET over ``host``'s pool.
+
+        Args:
+            host: Pool key, e.g. the routing value or platform
+            url: Absolute URL on that host
+            params: Optional query parameters
+            stream: Return before reading the body; the caller must ``aclose()`` the response
+
+        Returns:
+            The response, whatever its status
+        """
+        client = self.client(host)
+        counters = self._counters[host]
+
+        async def trace(event: str, info: Dict):
+            if event == 'connection.connect_tcp.complete':
+                counters['connections_opened'] += 1
+
+        request = client.build_request('GET', url, params=params, extensions={'trace': trace})
+        counters['requests'] += 1
+        counters['in_flight'] += 1
+        try:
+            return await client.send(request, stream=stream)
+        finally:
+            counters['in_flight'] -= 1
+
+    async def warm(self, urls: Dict[str, str]):
+        """
+        Open a connection to each host ahead of the first real request.
+
+        Sends ``GET /`` and ignores the status, so the handshake is done and
+        the connection is parked in the keep-alive pool.
+
+        Args:
+            urls: Host key to base URL
+        """
+        async def warm_one(host: str, url: str):
+            try:
+                response = await self.send(host, url)
+                logger.info(f"Warmed connection to {host} ({response.http_version}, status {response.status_code})")
+            except Exception as e:
+                logger.warning(f"Could not warm connection to {host}: {e}")
+
+        await asyncio.gather(*(warm_one(host, url) for host, url in urls.items()))
+
+    async def aclose(self):
+        """Close every pool."""
+        clients, self._clients = list(self._clients.values()), {}
+        for client in clients:
+            await client.aclose()
+
+    def stats(self) -> Dict[str, Dict]:
+        """Per host: requests, connections opened and reused, requests awaiting headers, open and idle connections."""
+        stats = {}
+        for host, client in list(self._clients.items()):
+            counters = self._counters[host]
+            # httpx keeps its httpcore pool private; report what is reachable
+            pool = getattr(getattr(client, '_transport', None), '_pool', None)
+            connections = list(getattr(pool, 'connections', []))
+            stats[host] = {
+                **counters,
+                'reused': max(0, counters['requests'] - counters['connections_opened']),
+                'open_connections': len(connections),
+                'idle_connections': sum(1 for connection in connections if connection.is_idle()),
+                'max_connections': self.limits.max_connections,
+                'http2': self.http2
+            }
+        return stats
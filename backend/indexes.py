@@ -0,0 +1,131 @@
+"""
+Index Management - Declares, creates and audits the MongoDB indexes the app relies on
+"""
+import os
+import logging
+from typing import Dict, List
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+# Days analyses are kept; 0 keeps them forever
+ANALYSIS_RETENTION_DAYS = int(os.environ.get('ANALYSIS_RETENTION_DAYS', '0'))
+
+# Server error codes for an index that exists with other options
+_INDEX_CONFLICT_CODES = (85, 86)
+
+
+def analysis_indexes(retention_days: int = ANALYSIS_RETENTION_DAYS) -> List[IndexModel]:
+    """
+    Indexes of the analyses collection.
+
+    Args:
+        retention_days: Expire analyses this many days after ``created_at``; 0 disables expiry
+
+    Returns:
+        Index declarations for ``db.analyses``
+    """
+    indexes = [
+        # GET /api/analysis/{analysis_id}
+        IndexModel([('analysis_id', ASCENDING)], unique=True),
+        # A player's analyses, newest first
+        IndexModel([('summoner_name', ASCENDING), ('region', ASCENDING), ('timestamp', DESCENDING)])
+    ]
+    if retention_days > 0:
+        indexes.append(IndexModel([('created_at', ASCENDING)], expireAfterSeconds=retention_days * 86400))
+    return indexes
+
+
+async def _update_ttl(collection, index: IndexModel) -> bool:
+    """Change the expiry of an existing TTL index in place; False if it is not a TTL index."""
+    document = index.document
+    existing = (await collection.index_information()).get(document['name'])
+    if 'expireAfterSeconds' not in document or not existing or 'expireAfterSeconds' not in existing:
+        return False
+    await collection.database.command(
+        'collMod', collection.name,
+        index={'keyPattern': dict(document['key']), 'expireAfterSeconds': document['expireAfterSeconds']}
+    )
+    logger.info(
+        f"Changed expiry of {collection.name}.{document['name']} "
+        f"from {existing['expireAfterSeconds']}s to {document['expireAfterSeconds']}s"
+    )
+    return True
+
+
+async def sync_indexes(declared: Dict) -> None:
+    """
+    Create every declared index that does not exist yet.
+
+    A TTL index whose retention setting changed is updated with ``collMod``.
+    Any other conflict (an index with the same keys but other options) is
+    logged and left for an operator, since dropping it could lock a large
+    collection.
+
+    Args:
+        declared: Motor collection to list of IndexModel
+    """
+    for collection, indexes in declared.items():
+        for index in indexes:
+            try:
+                await collection.create_indexes([index])
+            except OperationFailure as e:
+                if e.code in _INDEX_CONFLICT_CODES and await _update_ttl(collection, index):
+                    continue
+                logger.error(f"Error creating index {collection.name}.{index.document['name']}: {e}")
+            except Exception as e:
+                logger.error(f"Error creating index {collection.name}.{index.document['name']}: {e}")
+
+
+async def index_report(declared: Dict) -> Dict[str, Dict]:
+    """
+    Compare declared indexes with the ones on the server and their usage.
+
+    Usage comes from ``$indexStats`` and counts operations since the index
+    was created or the server last restarted, so a recently restarted server
+    reports every index as unused.
+
+    Args:
+        declared: Motor collection to list of IndexModel
+
+    Returns:
+        Per collection: ``missing`` declared indexes, ``undeclared`` indexes
+        nobody declared, ``unused`` indexes with no recorded operations, and
+        ``usage`` (index name to operation count, None if unavailable)
+    """
+    report = {}
+    for collection, indexes in declared.items():
+        declared_names = {index.document['name'] for index in indexes}
+        try:
+            existing = set(await collection.index_information())
+        except Exception as e:
+            logger.error(f"Error listing indexes of {collection.name}: {e}")
+            continue
+
+        usage = None
+        try:
+            cursor = collection.aggregate([{'$indexStats': {}}])
+            usage = {stat['name']: stat['accesses']['ops'] async for stat in cursor}
+        except Exception as e:
+            logger.info(f"Index usage unavailable for {collection.name}: {e}")
+
+        report[collection.name] = {
+            'missing': sorted(declared_names - existing),
+            'undeclared': sorted(existing - declared_names - {'_id_'}),
+            'unused': sorted(name for name, ops in usage.items() if ops == 0 and name != '_id_') if usage else [],
+            'usage': usage
+        }
+    return report
+
+
+def log_index_report(report: Dict[str, Dict]):
+    """Log one line per collection with missing, undeclared or unused indexes."""
+    for name, entry in report.items():
+        if entry['missing']:
+            logger.warning(f"Missing indexes on {name}: {', '.join(entry['missing'])}")
+        if entry['undeclared']:
+            logger.warning(f"Undeclared indexes on {name} (drop if no longer needed): {', '.join(entry['undeclared'])}")
+        if entry['unused']:
+            logger.info(f"Indexes on {name} unused since the last restart: {', '.join(entry['unused'])}")
@@ -0,0 +1,401 @@
+"""
+Durable Job Queue - Runs analyses in background workers backed by MongoDB
+"""
+import os
+import uuid
+import socket
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+
+logger = logging.getLogger(__name__)
+
+# Workers per process, and how long a claimed job stays leased without a heartbeat (seconds)
+JOB_WORKERS = int(os.environ.get('JOB_WORKERS', '2'))
+JOB_LEASE_SECONDS = float(os.environ.get('JOB_LEASE_SECONDS', '60'))
+
+# Attempts before a job is marked failed, and the first retry delay (doubled per attempt)
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', '3'))
+JOB_RETRY_BACKOFF = float(os.environ.get('JOB_RETRY_BACKOFF', '5'))
+
+# How often idle workers and status watchers look at the collection (seconds)
+JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', '1'))
+
+# Days finished jobs are kept
+JOB_RETENTION_DAYS = int(os.environ.get('JOB_RETENTION_DAYS', '7'))
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+FINISHED = (SUCCEEDED, FAILED)
+
+# Fields of a job document that are returned to clients
+PUBLIC_FIELDS = (
+    'job_id', 'status', 'payload', 'attempts', 'progress', 'result', 'error',
+    'created_at', 'updated_at', 'started_at', 'finished_at'
+)
+
+
+class JobError(Exception):
+    """
+    Failure reported by a job handler.
+
+    Args:
+        detail: Message shown to the client
+        status_code: HTTP status matching the failure
+        retryable: False for failures that would happen again, e.g. an unknown Riot ID
+    """
+
+    def __init__(self, detail: str, status_code: int = 500, retryable: bool = True):
+        super().__init__(detail)
+        self.detail = detail
+        self.status_code = status_code
+        self.retryable = retryable
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class JobQueue:
+    """
+    MongoDB-backed job queue with leased, retried, crash-safe execution.
+
+    A worker claims the oldest runnable job with an atomic
+    ``find_one_and_update`` that sets a lease, and renews the lease while the
+    handler runs. Jobs whose lease runs out (the worker or its machine died)
+    become claimable again, so any process sharing the collection picks them
+    up. Failed attempts are retried with exponential backoff until
+    ``max_attempts`` is reached.
+    """
+
+    def __init__(
+        self,
+        collection,
+        handler: Callable[[Dict, 'JobContext'], Awaitable[Any]],
+        workers: int = JOB_WORKERS,
+        lease_seconds: float = JOB_LEASE_SECONDS,
+        max_attempts: int = JOB_MAX_ATTEMPTS,
+        retry_backoff: float = JOB_RETRY_BACKOFF,
+        poll_interval: float = JOB_POLL_INTERVAL
+    ):
+        """
+        Args:
+            collection: Motor collection holding the jobs
+            handler: Coroutine function run for each job with its payload and a
+                JobContext; its return value is stored as the job result
+            workers: Number of concurrent workers in this process
+            lease_seconds: Lease length; renewed every third of it while running
+            max_attempts: Attempts before a job is marked failed
+            retry_backoff: Delay before the first retry, doubled on each further retry
+            poll_interval: Seconds between checks for new jobs when idle
+        """
+        self.collection = collection
+        self.handler = handler
+        self.workers = max(0, workers)
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max(1, max_attempts)
+        self.retry_backoff = retry_backoff
+        self.poll_interval = poll_interval
+
+        self.worker_prefix = f"{socket.gethostname()}-{os.getpid()}"
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup = asyncio.Event()
+        self._running: Dict[str, str] = {}
+        self.metrics = {'claimed': 0, 'succeeded': 0, 'failed': 0, 'retried': 0, 'reclaimed': 0, 'lost_leases': 0}
+
+    def indexes(self) -> List[IndexModel]:
+        """Job id, claim order and retention indexes."""
+        return [
+            IndexModel([('job_id', ASCENDING)], unique=True),
+            IndexModel([('status', ASCENDING), ('run_at', ASCENDING)]),
+            IndexModel([('finished_at', ASCENDING)], expireAfterSeconds=JOB_RETENTION_DAYS * 86400)
+        ]
+
+    async def enqueue(self, payload: Dict) -> Dict:
+        """
+        Add a job to the queue.
+
+        Args:
+            payload: Handler input; must be storable in MongoDB
+
+        Returns:
+            Public view of the new job
+        """
+        now = _now()
+        job = {
+            'job_id': str(uuid.uuid4()),
+            'status': QUEUED,
+            'payload': payload,
+            'attempts': 0,
+            'progress': None,
+            'result': None,
+            'error': None,
+            'run_at': now,
+            'lease_expires_at': None,
+            'worker_id': None,
+            'created_at': now,
+            'updated_at': now,
+            'started_at': None,
+            'finished_at': None
+        }
+        await self.collection.insert_one(job)
+        self._wakeup.set()
+        logger.info(f"Enqueued job {job['job_id']}")
+        return self.public_view(job)
+
+    async def get(self, job_id: str) -> Optional[Dict]:
+        """Public view of a job, or None if it does not exist (or has expired)."""
+        job = await self.collection.find_one({'job_id': job_id}, {'_id': 0})
+        return self.public_view(job) if job else None
+
+    async def watch(self, job_id: str) -> AsyncIterator[Dict]:
+        """
+        Yield the public view of a job each time it changes, until it finishes.
+
+        Polls the collection so updates made by workers in other processes are
+        seen too.
+        """
+        last_update = None
+        while True:
+            job = await self.get(job_id)
+            if job is None:
+                return
+            if job['updated_at'] != last_update:
+                last_update = job['updated_at']
+                yield job
+            if job['status'] in FINISHED:
+                return
+            await asyncio.sleep(self.poll_interval)
+
+    @staticmethod
+    def public_view(job: Dict) -> Dict:
+        """Strip lease bookkeeping from a job document."""
+        return {field: job.get(field) for field in PUBLIC_FIELDS}
+
+    def start(self):
+        """Start the worker tasks."""
+        for n in range(self.workers):
+            worker_id = f"{self.worker_prefix}-{n}"
+            self._tasks.append(asyncio.create_task(self._work(worker_id), name=f"job-worker-{n}"))
+        logger.info(f"Started {self.workers} job workers")
+
+    async def stop(self):
+        """
+        Stop the workers and hand their running jobs back to the queue.
+
+        Interrupted jobs are requeued without consuming an attempt, so another
+        process can pick them up right away instead of waiting out the lease.
+        """
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _claim(self, worker_id: str) -> Optional[Dict]:
+        """
+        Atomically lease the oldest runnable job, including jobs whose lease expired.
+
+        Returns:
+            The job as it was before the claim (so an expired lease shows as
+            ``running``), or None if nothing is runnable
+        """
+        now = _now()
+        return await self.collection.find_one_and_update(
+            {'$or': [
+                {'status': QUEUED, 'run_at': {'$lte': now}},
+                {'status': RUNNING, 'lease_expires_at': {'$lt': now}}
+            ]},
+            {
+                '$set': {
+                    'status': RUNNING,
+                    'worker_id': worker_id,
+                    'lease_expires_at': now + timedelta(seconds=self.lease_seconds),
+                    'started_at': now,
+                    'updated_at': now
+                },
+                '$inc': {'attempts': 1}
+            },
+            sort=[('run_at', 1)],
+            projection={'_id': 0},
+            return_document=ReturnDocument.BEFORE
+        )
+
+    async def _work(self, worker_id: str):
+        """Worker loop: claim, run, repeat; sleep until woken or the poll interval when idle."""
+        while True:
+            try:
+                job = await self._claim(worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Error claiming job: {e}")
+                job = None
+
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._run(job, worker_id)
+
+    async def _run(self, job: Dict, worker_id: str):
+        """Run one claimed job under a renewed lease and record its outcome."""
+        job_id = job['job_id']
+        job['attempts'] += 1
+        self.metrics['claimed'] += 1
+        if job['status'] == RUNNING:
+            # The previous worker stopped renewing its lease: it crashed or its machine died
+            self.metrics['reclaimed'] += 1
+            logger.warning(f"Reclaimed job {job_id} after an expired lease")
+
+        if job['attempts'] > self.max_attempts:
+            await self._finish(job_id, worker_id, FAILED, error={
+                'status_code': 500, 'detail': 'Job was interrupted too many times'
+            })
+            return
+
+        self._running[job_id] = worker_id
+        context = JobContext(self, job_id, worker_id)
+        run = asyncio.create_task(self.handler(job['payload'], context))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, worker_id, run))
+        try:
+            result = await run
+        except asyncio.CancelledError:
+            if heartbeat.done():
+                logger.warning(f"Abandoned job {job_id}: lease lost to another worker")
+                return
+            # The worker is being stopped
+            await self._release(job_id, worker_id)
+            raise
+        except Exception as e:
+            await self._record_failure(job, worker_id, e)
+            return
+        finally:
+            heartbeat.cancel()
+            if not run.done():
+                run.cancel()
+            self._running.pop(job_id, None)
+
+        await self._finish(job_id, worker_id, SUCCEEDED, result=result)
+
+    async def _release(self, job_id: str, worker_id: str):
+        """Requeue an interrupted job without counting the attempt."""
+        try:
+            await self.collection.update_one(
+                {'job_id': job_id, 'worker_id': worker_id, 'status': RUNNING},
+                {
+                    '$set': {'status': QUEUED, 'run_at': _now(), 'lease_expires_at': None,
+                             'worker_id': None, 'updated_at': _now()},
+                    '$inc': {'attempts': -1}
+                }
+            )
+            logger.info(f"Released job {job_id} back to the queue")
+        except Exception as e:
+            logger.error(f"Error releasing job {job_id}: {e}")
+
+    async def _heartbeat(self, job_id: str, worker_id: str, run: asyncio.Task):
+        """Renew the lease until cancelled; cancel the run if the lease was taken over."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                result = await self.collection.update_one(
+                    {'job_id': job_id, 'worker_id': worker_id, 'status': RUNNING},
+                    {'$set': {'lease_expires_at': _now() + timedelta(seconds=self.lease_seconds)}}
+                )
+            except Exception as e:
+                logger.error(f"Error renewing lease for job {job_id}: {e}")
+                continue
+            if result.matched_count == 0:
+                self.metrics['lost_leases'] += 1
+                run.cancel()
+                return
+
+    async def _record_failure(self, job: Dict, worker_id: str, exc: Exception):
+        """Schedule a retry with backoff, or mark the job failed."""
+        job_id = job['job_id']
+        if isinstance(exc, JobError):
+            error = {'status_code': exc.status_code, 'detail': exc.detail}
+            retryable = exc.retryable
+        else:
+            error = {'status_code': 500, 'detail': 'An unexpected error occurred during analysis'}
+            retryable = True
+
+        if not retryable or job['attempts'] >= self.max_attempts:
+            logger.error(f"Job {job_id} failed after {job['attempts']} attempts: {exc}")
+            await self._finish(job_id, worker_id, FAILED, error=error)
+            return
+
+        delay = self.retry_backoff * 2 ** (job['attempts'] - 1)
+        logger.warning(f"Job {job_id} attempt {job['attempts']} failed, retrying in {delay:.1f}s: {exc}")
+        self.metrics['retried'] += 1
+        try:
+            await self.collection.update_one(
+                {'job_id': job_id, 'worker_id': worker_id},
+                {'$set': {
+                    'status': QUEUED,
+                    'run_at': _now() + timedelta(seconds=delay),
+                    'lease_expires_at': None,
+                    'worker_id': None,
+                    'error': error,
+                    'updated_at': _now()
+                }}
+            )
+        except Exception as e:
+            logger.error(f"Error requeueing job {job_id}: {e}")
+
+    async def _finish(self, job_id: str, worker_id: str, status: str, result: Any = None, error: Optional[Dict] = None):
+        """Record the final outcome, unless another worker took the job over meanwhile."""
+        now = _now()
+        try:
+            await self.collection.update_one(
+                {'job_id': job_id, 'worker_id': worker_id},
+                {'$set': {
+                    'status': status,
+                    'result': result,
+                    'error': error,
+                    'lease_expires_at': None,
+                    'updated_at': now,
+                    'finished_at': now
+                }}
+            )
+        except Exception as e:
+            logger.error(f"Error recording outcome of job {job_id}: {e}")
+            return
+        self.metrics[status] += 1
+        logger.info(f"Job {job_id} {status}")
+
+    def stats(self) -> Dict:
+        """Worker count, jobs running in this process and outcome counters."""
+        return {'workers': len(self._tasks), 'running': len(self._running), **self.metrics}
+
+
+class JobContext:
+    """Handle given to a job handler for reporting progress."""
+
+    def __init__(self, queue: JobQueue, job_id: str, worker_id: str):
+        self.queue = queue
+        self.job_id = job_id
+        self.worker_id = worker_id
+
+    async def progress(self, progress: Dict):
+        """
+        Publish the handler's progress, e.g. the pipeline stage it reached.
+
+        Args:
+            progress: Small JSON-compatible dictionary shown to clients
+        """
+        try:
+            await self.queue.collection.update_one(
+                {'job_id': self.job_id, 'worker_id': self.worker_id},
+                {'$set': {'progress': progress, 'updated_at': _now()}}
+            )
+        except Exception as e:
+            logger.error(f"Error reporting progress for job {self.job_id}: {e}")
@@ -0,0 +1,109 @@
+"""
+Persistent Match Cache - Stores compact match-v5 records in MongoDB
+"""
+import logging
+from typing import Dict, List
+from pymongo import ASCENDING, IndexModel
+from pymongo.errors import DuplicateKeyError
+
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Match-level fields kept from match-v5 ``info``
+MATCH_INFO_FIELDS = ('gameDuration', 'gameStartTimestamp')
+
+# Participant fields read by RiotAPI.get_player_stats
+PARTICIPANT_FIELDS = (
+    'puuid',
+    'championName',
+    'win',
+    'kills',
+    'deaths',
+    'assists',
+    'totalMinionsKilled',
+    'neutralMinionsKilled',
+    'visionScore',
+    'totalDamageDealtToChampions',
+    'totalDamageTaken',
+    'goldEarned',
+    'wardsPlaced',
+    'wardsKilled',
+    'firstBloodKill',
+    'doubleKills',
+    'tripleKills'
+)
+
+
+def compact_match(match_id: str, match_data: Dict) -> Dict:
+    """
+    Reduce a full match-v5 payload to the fields the analysis reads.
+
+    The result keeps the ``info.participants`` shape of match-v5 so it can be
+    used anywhere the full payload was, for all 10 participants.
+
+    Args:
+        match_id: Match identifier
+        match_data: Full match-v5 response
+
+    Returns:
+        Compact match dictionary
+    """
+    info = match_data['info']
+    compact_info = {field: info[field] for field in MATCH_INFO_FIELDS if field in info}
+    compact_info['participants'] = [
+        {field: participant[field] for field in PARTICIPANT_FIELDS if field in participant}
+        for participant in info['participants']
+    ]
+    return {'match_id': match_id, 'info': compact_info}
+
+
+class MatchCache:
+    """
+    Read-through cache of finished matches keyed by match_id.
+
+    Match-v5 payloads never change once a game is over, so entries are written
+    once and never expire.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def indexes(self) -> List[IndexModel]:
+        """Unique match_id index used by every lookup."""
+        return [IndexModel([('match_id', ASCENDING)], unique=True)]
+
+    async def get_many(self, match_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Look up several matches in one query.
+
+        Args:
+            match_ids: Match identifiers to look up
+
+        Returns:
+            Dictionary of match_id to compact match for the ones that are cached
+        """
+        matches = {}
+        try:
+            with metrics.upstream('mongo', 'matches.find'):
+                cursor = self.collection.find({'match_id': {'$in': match_ids}}, {'_id': 0})
+                async for match in cursor:
+                    matches[match['match_id']] = match
+        except Exception as e:
+            logger.error(f"Error reading match cache: {e}")
+        return matches
+
+    async def put(self, match: Dict):
+        """Store a compact match; an existing entry is left untouched."""
+        try:
+            with metrics.upstream('mongo', 'matches.upsert'):
+                await self.collection.update_one(
+                    {'match_id': match['match_id']},
+                    {'$setOnInsert': match},
+                    upsert=True
+                )
+        except DuplicateKeyError:
+            # Another request cached the same match first
+            pass
+        except Exception as e:
+            logger.error(f"Error caching match {match['match_id']}: {e}")
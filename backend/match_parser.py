@@ -0,0 +1,93 @@
+"""
+Streaming Match-v5 Parser - Builds compact match records without decoding the full payload
+"""
+from typing import AsyncIterator, Dict
+
+import ijson
+
+from match_cache import MATCH_INFO_FIELDS, PARTICIPANT_FIELDS
+
+_INFO_FIELDS = frozenset(MATCH_INFO_FIELDS)
+_PARTICIPANT_FIELDS = frozenset(PARTICIPANT_FIELDS)
+
+# Container depth of the info map and of each info.participants item
+_INFO_DEPTH = 2
+_PARTICIPANT_DEPTH = 4
+
+
+class MatchStreamParser:
+    """
+    Incremental parser producing the same record as match_cache.compact_match.
+
+    Feed the response body chunk by chunk; only ``gameDuration``,
+    ``gameStartTimestamp`` and the participant fields the analysis reads are
+    ever materialized, so memory stays proportional to the compact record
+    rather than to the multi-hundred-field match-v5 document.
+
+    The body is read as ijson's basic events (no prefixes) and the position is
+    tracked with a depth counter and the keys of the enclosing containers:
+    building a dotted prefix for every event cost more CPU than decoding the
+    whole body with ``json.loads``.
+    """
+
+    def __init__(self, match_id: str):
+        self.match_id = match_id
+        self.info: Dict = {}
+        self.participants = []
+        self._events = ijson.sendable_list()
+        self._parser = ijson.basic_parse_coro(self._events, use_float=True)
+        # Key under which the container at each depth was opened: info is _path[1]
+        self._path = []
+        self._depth = 0
+        self._key = None
+
+    def feed(self, chunk: bytes):
+        """Parse the next chunk of the response body."""
+        self._parser.send(chunk)
+        self._consume()
+
+    def _consume(self):
+        path, depth, key = self._path, self._depth, self._key
+        for event, value in self._events:
+            if event == 'map_key':
+                key = value
+            elif event == 'start_map' or event == 'start_array':
+                if depth < len(path):
+                    path[depth] = key
+                else:
+                    path.append(key)
+                depth += 1
+                if depth == _PARTICIPANT_DEPTH and event == 'start_map' and path[2] == 'participants' and path[1] == 'info':
+                    self.participants.append({})
+            elif event == 'end_map' or event == 'end_array':
+                depth -= 1
+            elif depth == _PARTICIPANT_DEPTH:
+                if key in _PARTICIPANT_FIELDS and path[2] == 'participants' and path[1] == 'info':
+                    self.participants[-1][key] = value
+            elif depth == _INFO_DEPTH:
+                if key in _INFO_FIELDS and path[1] == 'info':
+                    self.info[key] = value
+        self._depth, self._key = depth, key
+        del self._events[:]
+
+    def close(self) -> Dict:
+        """
+        Finish parsing and return the compact match.
+
+        Raises:
+            ijson.JSONError: If the body was truncated or malformed
+            KeyError: If the payload has no ``info.gameDuration``
+        """
+        self._parser.close()
+        self._consume()
+        if 'gameDuration' not in self.info:
+            raise KeyError('info.gameDuration')
+        return {'match_id': self.match_id, 'info': {**self.info, 'participants': self.participants}}
+
+
+async def parse_match_stream(match_id: str, chunks: AsyncIterator[bytes]) -> Dict:
+    """Parse a match-v5 body as it streams in, e.g. from ``httpx.Response.aiter_bytes()``."""
+    parser = MatchStreamParser(match_id)
+    async for chunk in chunks:
+        parser.feed(chunk)
+    return parser.close()
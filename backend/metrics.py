@@ -0,0 +1,111 @@
+"""
+Metrics - Prometheus histograms and counters, plus per-request Server-Timing
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+# Analyses take seconds to tens of seconds; upstream calls milliseconds to seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    'runic_stage_seconds', 'Analysis pipeline stage latency', ['stage'], buckets=LATENCY_BUCKETS
+)
+UPSTREAM_SECONDS = Histogram(
+    'runic_upstream_seconds', 'Upstream call latency (Riot: time to response headers)',
+    ['service', 'endpoint'], buckets=LATENCY_BUCKETS
+)
+RATE_LIMITED = Counter(
+    'runic_riot_rate_limited_total', 'Riot 429 responses', ['endpoint', 'limit_type']
+)
+FALLBACKS = Counter(
+    'runic_narrative_fallbacks_total', 'Canned narratives served instead of a Bedrock one'
+)
+DEGRADED = Counter(
+    'runic_degraded_total', 'Analyses answered with a partial or fallback stage to meet their deadline', ['stage']
+)
+CACHE_REQUESTS = Counter(
+    'runic_cache_requests_total', 'Cache lookups by outcome', ['cache', 'result']
+)
+
+# (name, seconds) entries for the Server-Timing header of the current request
+_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar('server_timings', default=None)
+
+
+def _record(name: str, seconds: float):
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((name, seconds))
+
+
+@contextmanager
+def stage(name: str):
+    """Time one pipeline stage into STAGE_SECONDS and the request's Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        STAGE_SECONDS.labels(name).observe(seconds)
+        _record(name, seconds)
+
+
+@contextmanager
+def upstream(service: str, endpoint: str):
+    """Time one upstream call into UPSTREAM_SECONDS and the request's Server-Timing."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        UPSTREAM_SECONDS.labels(service, endpoint).observe(seconds)
+        _record(f"{service}-{endpoint}", seconds)
+
+
+def cache_result(cache: str, hits: int, misses: int = 0):
+    """Count lookups against a cache."""
+    if hits:
+        CACHE_REQUESTS.labels(cache, 'hit').inc(hits)
+    if misses:
+        CACHE_REQUESTS.labels(cache, 'miss').inc(misses)
+
+
+def start_request_timings() -> List[Tuple[str, float]]:
+    """
+    Begin collecting Server-Timing entries for the current request.
+
+    Tasks created afterwards share the list, so concurrent match downloads
+    are included; a request that joins another's in-flight analysis only
+    sees its own stages.
+    """
+    timings = []
+    _timings.set(timings)
+    return timings
+
+
+def server_timing_header(timings: List[Tuple[str, float]]) -> str:
+    """
+    Format timings as a Server-Timing header value.
+
+    Repeated entries (e.g. one per match download) are summed and their
+    count goes into ``desc``; their durations overlap, so the sum can exceed
+    the request's wall time.
+    """
+    totals: Dict[str, List[float]] = {}
+    for name, seconds in timings:
+        totals.setdefault(name, []).append(seconds)
+    entries = []
+    for name, durations in totals.items():
+        entry = f"{name};dur={sum(durations) * 1000:.1f}"
+        if len(durations) > 1:
+            entry += f';desc="{len(durations)} calls"'
+        entries.append(entry)
+    return ', '.join(entries)
+
+
+def render() -> Tuple[bytes, str]:
+    """Current metrics in the Prometheus text format, with its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
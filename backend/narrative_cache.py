@@ -0,0 +1,208 @@
+"""
+Narrative Cache - Reuses Bedrock narratives across players with the same resonance
+"""
+import os
+import re
+import json
+import random
+import hashlib
+import logging
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+
+from cache import TTLCache, MISSING
+import metrics
+
+logger = logging.getLogger(__name__)
+
+# Fingerprint bucket sizes: players within the same win-rate / KDA bucket share narratives
+NARRATIVE_WIN_RATE_BUCKET = float(os.environ.get('NARRATIVE_WIN_RATE_BUCKET', '5'))
+NARRATIVE_KDA_BUCKET = float(os.environ.get('NARRATIVE_KDA_BUCKET', '1'))
+
+# Reuse policy: generate fresh narratives until a fingerprint has this many variants,
+# then reuse one at random, still generating a fresh one with NARRATIVE_REFRESH_RATE probability
+NARRATIVE_CACHE_VARIANTS = int(os.environ.get('NARRATIVE_CACHE_VARIANTS', '3'))
+NARRATIVE_REFRESH_RATE = float(os.environ.get('NARRATIVE_REFRESH_RATE', '0.1'))
+
+# Fingerprints kept in memory, and days an unused fingerprint stays in Mongo
+NARRATIVE_CACHE_SIZE = int(os.environ.get('NARRATIVE_CACHE_SIZE', '2000'))
+NARRATIVE_CACHE_RETENTION_DAYS = int(os.environ.get('NARRATIVE_CACHE_RETENTION_DAYS', '30'))
+
+# Stands in for the summoner's name in stored narratives
+SUMMONER_PLACEHOLDER = '{{summoner}}'
+
+
+def resonance_fingerprint(traits: List[Dict], spirit_champion: Dict, stats: Dict) -> str:
+    """
+    Canonical key for the inputs that shape a narrative.
+
+    Args:
+        traits: List of personality traits with scores
+        spirit_champion: Primary spirit champion resonance data
+        stats: Player statistics
+
+    Returns:
+        Hex digest identifying the resonance
+    """
+    top_traits = sorted(traits, key=lambda x: x['score'], reverse=True)[:3]
+    inputs = [
+        spirit_champion['champion'],
+        spirit_champion['slots_filled'],
+        [t['name'] for t in top_traits],
+        int(stats.get('win_rate', 0) // NARRATIVE_WIN_RATE_BUCKET),
+        int(stats.get('kda', 0) // NARRATIVE_KDA_BUCKET)
+    ]
+    return hashlib.sha256(json.dumps(inputs).encode()).hexdigest()
+
+
+def _name_pattern(summoner_name: str) -> re.Pattern:
+    """Matches the full Riot ID or its game name as a whole word, in any case."""
+    names = [summoner_name]
+    game_name = summoner_name.split('#', 1)[0]
+    if game_name and game_name != summoner_name:
+        names.append(game_name)
+    alternatives = '|'.join(re.escape(name) for name in names)
+    return re.compile(rf'(?<!\w)(?:{alternatives})(?!\w)', re.IGNORECASE)
+
+
+class NarrativeCache:
+    """
+    Cache of narratives keyed by resonance fingerprint.
+
+    Each fingerprint keeps up to ``max_variants`` narratives with the
+    summoner's name replaced by a placeholder, so they can be handed to any
+    player with the same resonance. Entries live in an in-memory LRU in front
+    of a Mongo collection whose unused entries expire after the retention period.
+    """
+
+    def __init__(
+        self,
+        collection,
+        max_variants: int = NARRATIVE_CACHE_VARIANTS,
+        refresh_rate: float = NARRATIVE_REFRESH_RATE,
+        maxsize: int = NARRATIVE_CACHE_SIZE
+    ):
+        self.collection = collection
+        self.max_variants = max(1, max_variants)
+        self.refresh_rate = refresh_rate
+        self.memory = TTLCache(maxsize)
+
+    def indexes(self) -> List[IndexModel]:
+        """Unique fingerprint index, and expiry of fingerprints unused for the retention period."""
+        return [
+            IndexModel([('fingerprint', ASCENDING)], unique=True),
+            IndexModel([('last_used', ASCENDING)], expireAfterSeconds=NARRATIVE_CACHE_RETENTION_DAYS * 86400)
+        ]
+
+    async def _variants(self, fingerprint: str) -> List[str]:
+        variants = self.memory.get(fingerprint)
+        if variants is MISSING:
+            try:
+                with metrics.upstream('mongo', 'narratives.find'):
+                    doc = await self.collection.find_one({'fingerprint': fingerprint}, {'_id': 0, 'variants': 1})
+            except Exception as e:
+                logger.error(f"Error reading narrative cache: {e}")
+                return []
+            variants = doc['variants'] if doc else []
+            self.memory.set(fingerprint, variants)
+        return variants
+
+    async def lookup(self, summoner_name: str, traits: List[Dict], spirit_champion: Dict, stats: Dict) -> Optional[str]:
+        """
+        Find a narrative to reuse for this resonance.
+
+        Returns None when there is none yet, or when the reuse policy asks for a
+        fresh variant.
+
+        Args:
+            summoner_name: Player's summoner name
+            traits: List of personality traits with scores
+            spirit_champion: Primary spirit champion resonance data
+            stats: Player statistics
+
+        Returns:
+            Narrative personalized for ``summoner_name``, or None
+        """
+        fingerprint = resonance_fingerprint(traits, spirit_champion, stats)
+        variants = await self._variants(fingerprint)
+
+        if len(variants) < self.max_variants or random.random() < self.refresh_rate:
+            metrics.cache_result('narratives', hits=0, misses=1)
+            return None
+        metrics.cache_result('narratives', hits=1)
+
+        try:
+            await self.collection.update_one(
+                {'fingerprint': fingerprint},
+                {'$set': {'last_used': datetime.now(timezone.utc)}, '$inc': {'hits': 1}}
+            )
+        except Exception as e:
+            logger.error(f"Error updating narrative cache: {e}")
+
+        logger.info(f"Reusing cached narrative for {summoner_name}")
+        return random.choice(variants).replace(SUMMONER_PLACEHOLDER, summoner_name)
+
+    async def store(self, summoner_name: str, traits: List[Dict], spirit_champion: Dict, stats: Dict, narrative: str):
+        """
+        Add a freshly generated narrative as a variant, evicting the oldest beyond ``max_variants``.
+
+        Args:
+            summoner_name: Player the narrative was written for
+            traits: List of personality traits with scores
+            spirit_champion: Primary spirit champion resonance data
+            stats: Player statistics
+            narrative: Narrative text generated by Bedrock
+        """
+        fingerprint = resonance_fingerprint(traits, spirit_champion, stats)
+        template = _name_pattern(summoner_name).sub(SUMMONER_PLACEHOLDER, narrative)
+
+        variants = (await self._variants(fingerprint) + [template])[-self.max_variants:]
+        self.memory.set(fingerprint, variants)
+
+        try:
+            await self.collection.update_one(
+                {'fingerprint': fingerprint},
+                {
+                    '$push': {'variants': {'$each': [template], '$slice': -self.max_variants}},
+                    '$set': {'last_used': datetime.now(timezone.utc), 'champion': spirit_champion['champion']}
+                },
+                upsert=True
+            )
+        except Exception as e:
+            logger.error(f"Error writing narrative cache: {e}")
+
+    async def get_or_generate(
+        self,
+        summoner_name: str,
+        traits: List[Dict],
+        spirit_champion: Dict,
+        stats: Dict,
+        generate: Callable[[], Awaitable[str]]
+    ) -> str:
+        """
+        Reuse a cached narrative or generate and cache a new one.
+
+        Args:
+            summoner_name: Player's summoner name
+            traits: List of personality traits with scores
+            spirit_champion: Primary spirit champion resonance data
+            stats: Player statistics
+            generate: Coroutine function producing a new narrative; it should raise
+                rather than return a fallback so failures are never cached
+
+        Returns:
+            Narrative personalized for ``summoner_name``
+        """
+        narrative = await self.lookup(summoner_name, traits, spirit_champion, stats)
+        if narrative is not None:
+            return narrative
+
+        narrative = await generate()
+        await self.store(summoner_name, traits, spirit_champion, stats, narrative)
+        return narrative
+
+    def stats(self) -> Dict:
+        """In-memory hit/miss counters."""
+        return self.memory.stats()
@@ -1,12 +1,43 @@
 """
 Personality Trait Calculation Engine - Maps gameplay to lore-based traits
 """
+import heapq
 import logging
-from typing import Dict, List
+from typing import Dict, List, Sequence, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+def _build_champion_index(trait_champions: Dict[str, List[str]]) -> Tuple[Dict[str, int], Dict[str, int], Dict[str, Dict[int, int]]]:
+    """
+    Compile trait -> champions mappings into an inverted index.
+    
+    Args:
+        trait_champions: Champion list for each trait, in trait order
+        
+    Returns:
+        Tuple of (trait name -> bit, champion -> bitmask of its traits,
+        champion -> {trait bit: position in that trait's champion list})
+    """
+    trait_bits = {}
+    champion_masks = {}
+    champion_positions = {}
+    for bit, (trait_name, champions) in enumerate(trait_champions.items()):
+        trait_bits[trait_name] = bit
+        for position, champion in enumerate(champions):
+            champion_masks[champion] = champion_masks.get(champion, 0) | (1 << bit)
+            champion_positions.setdefault(champion, {})[bit] = position
+    return trait_bits, champion_masks, champion_positions
+
+
+def _iter_bits(mask: int):
+    """Yield the set bit indices of ``mask`` in ascending order."""
+    while mask:
+        lowest = mask & -mask
+        yield lowest.bit_length() - 1
+        mask ^= lowest
+
+
 class PersonalityEngine:
     """
     Calculates 10 lore-based personality traits from League of Legends gameplay data.
@@ -41,6 +72,34 @@ class PersonalityEngine:
         "The Healer": ["Soraka", "Shen", "Janna", "Lulu", "Nami", "Yuumi", "Sona"]
     }
     
+    # Trait order used by calculate_traits and the columns of calculate_traits_batch
+    TRAIT_NAMES = tuple(TRAIT_CHAMPIONS)
+    
+    # Inverted index compiled once at class load: trait bits, each champion's trait
+    # bitmask, and each champion's position in every trait list (for tie-breaking)
+    TRAIT_BITS, CHAMPION_TRAIT_MASKS, CHAMPION_TRAIT_POSITIONS = _build_champion_index(TRAIT_CHAMPIONS)
+    
+    # Stats read by the trait calculations, in stats_matrix column order
+    BATCH_STATS_COLUMNS = (
+        'total_games',
+        'kills',
+        'assists',
+        'first_bloods',
+        'solo_kills',
+        'multikills',
+        'avg_kills',
+        'avg_deaths',
+        'avg_assists',
+        'avg_cs',
+        'avg_gold',
+        'avg_vision_score',
+        'avg_wards_placed',
+        'avg_damage_taken',
+        'win_rate',
+        'kda',
+        'champion_pool_size'
+    )
+    
     def calculate_traits(self, stats: Dict) -> List[Dict]:
         """
         Calculate all 10 personality traits from player statistics.
@@ -165,6 +224,103 @@ class PersonalityEngine:
         
         return traits
     
+    def stats_matrix(self, stats_list: Sequence[Dict]):
+        """
+        Build the columnar input for calculate_traits_batch.
+        
+        Args:
+            stats_list: Aggregated player statistics, one dict per player
+            
+        Returns:
+            float64 NumPy array of shape (players, len(BATCH_STATS_COLUMNS));
+            missing stats are NaN so the batch path applies the same defaults
+        """
+        # NumPy is only needed for bulk jobs, so keep it off the request path's imports
+        import numpy as np
+        
+        return np.array(
+            [[stats.get(column, np.nan) for column in self.BATCH_STATS_COLUMNS] for stats in stats_list],
+            dtype=np.float64
+        ).reshape(len(stats_list), len(self.BATCH_STATS_COLUMNS))
+    
+    def calculate_traits_batch(self, stats_matrix):
+        """
+        Score all 10 traits for many players at once with array operations.
+        
+        Produces exactly the scores of the _calculate_* methods, including
+        their defaults for missing stats and _normalize_score's clamping and
+        round-half-to-even rounding.
+        
+        Args:
+            stats_matrix: Array of shape (players, len(BATCH_STATS_COLUMNS)), see stats_matrix
+            
+        Returns:
+            int64 array of shape (players, 10) with columns in TRAIT_NAMES order
+        """
+        import numpy as np
+        
+        stats_matrix = np.asarray(stats_matrix, dtype=np.float64)
+        column_index = {name: i for i, name in enumerate(self.BATCH_STATS_COLUMNS)}
+        
+        def col(name: str, default: float):
+            # Equivalent of stats.get(name, default)
+            values = stats_matrix[:, column_index[name]]
+            return np.where(np.isnan(values), default, values)
+        
+        total_games = np.maximum(col('total_games', 1), 1)
+        avg_kills_floor = np.maximum(col('avg_kills', 1), 1)
+        avg_assists = col('avg_assists', 0)
+        kills_plus_assists = col('kills', 0) + col('assists', 0)
+        
+        # The Protector
+        assist_score = 5 + (avg_assists / avg_kills_floor - 1.0) * 1.5
+        tank_score = 5 + (col('avg_damage_taken', 0) / 1000 - 15) / 5
+        protector = (assist_score * 0.7) + (tank_score * 0.3)
+        
+        # The Tactician
+        vision_score = 5 + (col('avg_vision_score', 0) - 25) / 7
+        ward_score = 5 + (col('avg_wards_placed', 0) - 8) / 3
+        tactician = (vision_score * 0.6) + (ward_score * 0.4)
+        
+        # The Disciplined
+        cs_score = 5 + (col('avg_cs', 0) - 150) / 20
+        gold_score = 5 + (col('avg_gold', 0) - 9000) / 800
+        disciplined = (cs_score * 0.7) + (gold_score * 0.3)
+        
+        # The Fearless
+        fearless = (kills_plus_assists / total_games / 2) + (col('first_bloods', 0) / total_games) * 10
+        
+        # The Resilient
+        low_death_score = 10 - (col('avg_deaths', 5) * 0.8)
+        resilient = (low_death_score * 0.6) + (col('win_rate', 50) / 10 * 0.4)
+        
+        # The Wanderer
+        solo_kill_rate = (col('solo_kills', 0) / total_games) * 5
+        kill_focus = col('avg_kills', 0) / np.maximum(col('avg_assists', 1), 1)
+        wanderer = solo_kill_rate + (kill_focus * 2)
+        
+        # The Adaptive
+        champion_diversity = col('champion_pool_size', 1)
+        adaptive = np.where(champion_diversity <= 1, 1, 1 + (champion_diversity - 1) * 1.3)
+        
+        # The Enlightened
+        kda_score = 5 + ((col('kda', 2) - 2.0) * 2)
+        wr_score = 5 + ((col('win_rate', 50) - 50) / 5)
+        enlightened = (kda_score * 0.6) + (wr_score * 0.4)
+        
+        # The Relentless
+        kill_participation = kills_plus_assists / np.maximum(col('total_games', 1) * 15, 1) * 10
+        relentless = kill_participation + (col('multikills', 0) / total_games) * 5
+        
+        # The Healer
+        healer = (avg_assists / avg_kills_floor * 3) + (avg_assists / 2 / 3)
+        
+        scores = np.stack([
+            protector, tactician, disciplined, fearless, resilient,
+            wanderer, adaptive, enlightened, relentless, healer
+        ], axis=1)
+        return np.rint(np.clip(scores, 1, 10)).astype(np.int64)
+    
     def _normalize_score(self, value: float, min_val: float = 1, max_val: float = 10) -> int:
         """Normalize a score to 1-10 range."""
         normalized = max(min_val, min(max_val, value))
@@ -301,6 +457,32 @@ class PersonalityEngine:
         score = (assist_focus * 3) + (team_orientation / 3)
         return self._normalize_score(score)
     
+    # Candidate champions per strong-trait bitmask, filled on first use (at most 2^10 entries)
+    _STRONG_MASK_CANDIDATES: Dict[int, List[Tuple[str, int, int, Tuple[int, int]]]] = {}
+    
+    def _strong_mask_candidates(self, strong_mask: int) -> List[Tuple[str, int, int, Tuple[int, int]]]:
+        """
+        Champions sharing at least one trait with ``strong_mask``.
+        
+        Returns:
+            List of (champion, matched trait mask, slots filled, tie-break order).
+            Slots are the popcount of the overlap; the order key ranks champions
+            by where they first appear in the strong traits' lists, so that ties
+            resolve exactly as a stable sort over the trait lists would.
+        """
+        candidates = self._STRONG_MASK_CANDIDATES.get(strong_mask)
+        if candidates is None:
+            candidates = []
+            for champion, champion_mask in self.CHAMPION_TRAIT_MASKS.items():
+                matched = champion_mask & strong_mask
+                if not matched:
+                    continue
+                first_bit = (matched & -matched).bit_length() - 1
+                order = (-first_bit, -self.CHAMPION_TRAIT_POSITIONS[champion][first_bit])
+                candidates.append((champion, matched, matched.bit_count(), order))
+            self._STRONG_MASK_CANDIDATES[strong_mask] = candidates
+        return candidates
+    
     def determine_spirit_champion(self, traits: List[Dict], stats: Dict) -> Dict:
         """
         Determine the player's spirit champion based on traits and play patterns.
@@ -313,73 +495,57 @@ class PersonalityEngine:
         Returns:
             Dictionary with spirit champion info and runner-ups
         """
-        # Count how many traits match each champion
-        champion_scores = {}
-        
+        # Bitmask of strong traits (score >= 7); bits follow TRAIT_NAMES order, the
+        # order calculate_traits returns them in
+        strong_mask = 0
+        strong_traits = {}
         for trait in traits:
-            # Only count traits with score >= 7 (strong traits)
             if trait['score'] >= 7:
-                for champion in trait['champions']:
-                    if champion not in champion_scores:
-                        champion_scores[champion] = {
-                            'slots_filled': 0,
-                            'traits': [],
-                            'trait_details': [],
-                            'total_score': 0
-                        }
-                    champion_scores[champion]['slots_filled'] += 1
-                    champion_scores[champion]['traits'].append(trait['name'])
-                    champion_scores[champion]['trait_details'].append({
-                        'name': trait['name'],
-                        'score': trait['score'],
-                        'lore': trait['lore']
-                    })
-                    champion_scores[champion]['total_score'] += trait['score']
-        
-        # Apply play-rate multiplier and track games played
+                bit = self.TRAIT_BITS[trait['name']]
+                strong_mask |= 1 << bit
+                strong_traits[bit] = trait
+        
         champions_played = stats.get('champions_played', {})
         total_games = stats.get('total_games', 1)
         
-        for champion in champion_scores:
-            games_played = champions_played.get(champion, 0)
-            play_rate = (games_played / total_games) * 100
-            
-            champion_scores[champion]['games_played'] = games_played
-            champion_scores[champion]['play_rate'] = play_rate
+        # Score every champion sharing a strong trait
+        candidates = []
+        mask_scores = {}
+        for champion, matched, slots_filled, order in self._strong_mask_candidates(strong_mask):
+            # Champions often share the same overlap, so sum each distinct one once
+            if matched not in mask_scores:
+                mask_scores[matched] = sum(strong_traits[bit]['score'] for bit in _iter_bits(matched))
+            total_score = mask_scores[matched]
             
+            games_played = champions_played.get(champion, 0)
             if games_played > 0:
                 # Significant bonus for actually playing the champion
                 # Scale: 1 game = +5, 5 games = +25, 10 games = +50
-                play_bonus_points = min(50, games_played * 5)
-                champion_scores[champion]['total_score'] += play_bonus_points
-                
-                if play_rate >= 25:
-                    champion_scores[champion]['play_bonus'] = 'High'
-                elif play_rate >= 15:
-                    champion_scores[champion]['play_bonus'] = 'Medium'
-                elif play_rate >= 5:
-                    champion_scores[champion]['play_bonus'] = 'Low'
-                else:
-                    champion_scores[champion]['play_bonus'] = 'Played'
-            else:
-                champion_scores[champion]['play_bonus'] = 'None'
-        
-        # Sort all champions by slots filled, then total score, then games played
-        sorted_champions = sorted(
-            champion_scores.items(), 
-            key=lambda x: (
-                x[1]['slots_filled'],           # Primary: Most slots filled
-                x[1]['total_score'],            # Secondary: Highest trait scores
-                x[1].get('games_played', 0)     # Tertiary: Most games played (tie-breaker)
-            ), 
-            reverse=True
-        )
-        
-        # Get top 3 champions
+                total_score += min(50, games_played * 5)
+            
+            candidates.append(((slots_filled, total_score, games_played, order), champion, matched))
+        
+        # Top 3 by slots filled, then total score, then games played (tie-breaker)
+        best = heapq.nlargest(3, candidates, key=lambda c: c[0])
+        
         top_champions = []
-        for i, (champ, data) in enumerate(sorted_champions[:3]):
+        for i, ((slots_filled, total_score, games_played, _), champ, matched) in enumerate(best):
+            matching = [strong_traits[bit] for bit in _iter_bits(matched)]
+            play_rate = (games_played / total_games) * 100
+            
+            if games_played == 0:
+                play_bonus = 'None'
+            elif play_rate >= 25:
+                play_bonus = 'High'
+            elif play_rate >= 15:
+                play_bonus = 'Medium'
+            elif play_rate >= 5:
+                play_bonus = 'Low'
+            else:
+                play_bonus = 'Played'
+            
             # Calculate resonance with play-time weighting
-            base_resonance = (data['total_score'] / 50) * 100  # Changed denominator to allow >100%
+            base_resonance = (total_score / 50) * 100  # Changed denominator to allow >100%
             
             # Cap at 100% but allow play time to push higher scores
             resonance = min(100, base_resonance)
@@ -387,13 +553,16 @@ class PersonalityEngine:
             top_champions.append({
                 'rank': i + 1,
                 'champion': champ,
-                'slots_filled': data['slots_filled'],
-                'matching_traits': data['traits'],
-                'trait_details': data['trait_details'],
+                'slots_filled': slots_filled,
+                'matching_traits': [trait['name'] for trait in matching],
+                'trait_details': [
+                    {'name': trait['name'], 'score': trait['score'], 'lore': trait['lore']}
+                    for trait in matching
+                ],
                 'resonance_strength': resonance,
-                'play_bonus': data.get('play_bonus', 'None'),
-                'games_played': data.get('games_played', 0),
-                'play_rate': data.get('play_rate', 0)
+                'play_bonus': play_bonus,
+                'games_played': games_played,
+                'play_rate': play_rate
             })
         
         # Ensure we have at least 1 champion
@@ -0,0 +1,78 @@
+"""
+Per-Player Rolling Aggregates - Lets re-analyses fold in only the games played since last time
+"""
+import logging
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+from pymongo import ASCENDING, IndexModel
+
+import metrics
+from stats_accumulator import StatsAccumulator
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerAggregateStore:
+    """
+    Stores each player's raw stat totals and the window of matches behind them.
+
+    One document per (puuid, region) holds the totals (a serialized
+    StatsAccumulator; older documents hold the same totals as a dictionary),
+    the per-match entries currently in the window (so games that fall out of
+    the window can be subtracted again) and the start time of the newest game.
+    """
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def indexes(self) -> List[IndexModel]:
+        """Unique (puuid, region) index."""
+        return [IndexModel([('puuid', ASCENDING), ('region', ASCENDING)], unique=True)]
+
+    async def get(self, puuid: str, region: str) -> Optional[Dict]:
+        """
+        Load the stored aggregate state for a player.
+
+        Args:
+            puuid: Player's unique identifier
+            region: Region code
+
+        Returns:
+            State document, or None if the player has not been analyzed before
+        """
+        try:
+            with metrics.upstream('mongo', 'player_aggregates.find'):
+                return await self.collection.find_one({'puuid': puuid, 'region': region}, {'_id': 0})
+        except Exception as e:
+            logger.error(f"Error loading aggregate state: {e}")
+            return None
+
+    async def save(self, puuid: str, region: str, match_count: int, totals: StatsAccumulator, window: List[Dict]):
+        """
+        Replace the stored aggregate state for a player.
+
+        Args:
+            puuid: Player's unique identifier
+            region: Region code
+            match_count: Window size the state was built for
+            totals: Raw stat totals over the window
+            window: Per-match entries in the window, newest first
+        """
+        try:
+            with metrics.upstream('mongo', 'player_aggregates.replace'):
+                await self.collection.replace_one(
+                    {'puuid': puuid, 'region': region},
+                    {
+                        'puuid': puuid,
+                        'region': region,
+                        'match_count': match_count,
+                        'newest_game_start': window[0]['game_start'] if window else 0,
+                        'totals': totals.to_bytes(),
+                        'window': window,
+                        'updated_at': datetime.now(timezone.utc)
+                    },
+                    upsert=True
+                )
+        except Exception as e:
+            logger.error(f"Error saving aggregate state: {e}")
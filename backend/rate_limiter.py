@@ -0,0 +1,260 @@
+"""
+Riot API Rate-Limit Scheduler - Keeps every request within the key's app and method limits
+"""
+import os
+import time
+import asyncio
+import logging
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Limits assumed for a host until Riot tells us otherwise (development key defaults)
+DEFAULT_APP_RATE_LIMIT = os.environ.get('RIOT_APP_RATE_LIMIT', '20:1,100:120')
+
+# Back-off used when a 429 arrives without a Retry-After header
+DEFAULT_RETRY_AFTER = 1.0
+
+
+def parse_rate_limit_header(value: Optional[str]) -> List[Tuple[int, int]]:
+    """
+    Parse a Riot rate-limit header such as ``20:1,100:120``.
+
+    Args:
+        value: Header value of comma-separated ``amount:seconds`` pairs
+
+    Returns:
+        List of (amount, seconds) tuples; empty if the header is missing or malformed
+    """
+    pairs = []
+    if not value:
+        return pairs
+    for part in value.split(','):
+        try:
+            amount, seconds = part.strip().split(':')
+            pairs.append((int(amount), int(seconds)))
+        except ValueError:
+            logger.warning(f"Ignoring malformed rate-limit entry: {part!r}")
+    return pairs
+
+
+class RateLimitWindow:
+    """Fixed window of ``limit`` requests per ``seconds``, mirroring how Riot counts."""
+
+    def __init__(self, limit: int, seconds: int):
+        self.limit = limit
+        self.seconds = seconds
+        self.count = 0
+        self.reset_at = 0.0
+
+    def delay(self, now: float) -> float:
+        """Seconds to wait before one more request fits in this window."""
+        if now >= self.reset_at or self.count < self.limit:
+            return 0.0
+        return self.reset_at - now
+
+    def consume(self, now: float):
+        """Record one request sent at ``now``."""
+        if now >= self.reset_at:
+            self.count = 0
+            self.reset_at = now + self.seconds
+        self.count += 1
+
+    def observe(self, count: int, now: float):
+        """Reconcile with the count Riot reported, which may include requests from other processes."""
+        if now >= self.reset_at:
+            # Riot's window has rolled over too; the stale local count no longer applies
+            self.reset_at = now + self.seconds
+            self.count = count
+        else:
+            self.count = max(self.count, count)
+
+    def snapshot(self, now: float) -> Dict:
+        """Current usage of this window."""
+        used = self.count if now < self.reset_at else 0
+        return {
+            'limit': self.limit,
+            'window_seconds': self.seconds,
+            'used': used,
+            'remaining': max(0, self.limit - used),
+            'resets_in': round(max(0.0, self.reset_at - now), 2)
+        }
+
+
+class RateLimitBucket:
+    """All the windows that apply to one app or method scope, plus any Retry-After block."""
+
+    def __init__(self, limits: Optional[List[Tuple[int, int]]] = None):
+        self.windows: Dict[int, RateLimitWindow] = {}
+        self.blocked_until = 0.0
+        if limits:
+            self.update_limits(limits)
+
+    def update_limits(self, limits: List[Tuple[int, int]]):
+        """Adopt the limits Riot advertised, keeping counts for windows we already track."""
+        windows = {}
+        for amount, seconds in limits:
+            window = self.windows.get(seconds) or RateLimitWindow(amount, seconds)
+            window.limit = amount
+            windows[seconds] = window
+        self.windows = windows
+
+    def update_counts(self, counts: List[Tuple[int, int]], now: float):
+        """Apply the ``-Count`` header Riot sent back with a response."""
+        for count, seconds in counts:
+            window = self.windows.get(seconds)
+            if window:
+                window.observe(count, now)
+
+    def block(self, seconds: float, now: float):
+        """Hold all requests in this scope for ``seconds`` (Retry-After)."""
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def delay(self, now: float) -> float:
+        """Seconds to wait before this scope has budget for another request."""
+        delay = max(0.0, self.blocked_until - now)
+        for window in self.windows.values():
+            delay = max(delay, window.delay(now))
+        return delay
+
+    def consume(self, now: float):
+        """Record one request against every window."""
+        for window in self.windows.values():
+            window.consume(now)
+
+    def snapshot(self, now: float) -> Dict:
+        """Current budget of every window in this scope."""
+        return {
+            'windows': [window.snapshot(now) for window in self.windows.values()],
+            'blocked_for': round(max(0.0, self.blocked_until - now), 2)
+        }
+
+
+class RiotRateLimiter:
+    """
+    Central scheduler for Riot API calls shared by every request in the process.
+
+    Riot enforces an app limit per routing value (americas, europe, asia, sea) or
+    platform (na1, euw1, ...) and a method limit per endpoint on that host. Callers
+    ``acquire`` before sending, which queues them until both buckets have budget,
+    and ``update`` afterwards so limits and counts are learned from the
+    ``X-App-Rate-Limit`` / ``X-Method-Rate-Limit`` headers and 429s honor Retry-After.
+    """
+
+    def __init__(self, default_app_limit: str = DEFAULT_APP_RATE_LIMIT):
+        self.default_app_limits = parse_rate_limit_header(default_app_limit)
+        self.app_buckets: Dict[str, RateLimitBucket] = {}
+        self.method_buckets: Dict[Tuple[str, str], RateLimitBucket] = {}
+        self._locks: Dict[Tuple[str, str], asyncio.Lock] = {}
+        self._waiting: Dict[Tuple[str, str], int] = {}
+
+    def _app_bucket(self, host: str) -> RateLimitBucket:
+        if host not in self.app_buckets:
+            self.app_buckets[host] = RateLimitBucket(self.default_app_limits)
+        return self.app_buckets[host]
+
+    def _method_bucket(self, host: str, method: str) -> RateLimitBucket:
+        key = (host, method)
+        if key not in self.method_buckets:
+            self.method_buckets[key] = RateLimitBucket()
+        return self.method_buckets[key]
+
+    async def acquire(self, host: str, method: str):
+        """
+        Wait until a request to ``method`` on ``host`` fits within every known limit.
+
+        Requests for the same host and method are served in arrival order.
+
+        Args:
+            host: Routing value or platform the request is sent to
+            method: Endpoint name the method limit is tracked under
+        """
+        key = (host, method)
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiting[key] = self._waiting.get(key, 0) + 1
+        try:
+            async with lock:
+                app_bucket = self._app_bucket(host)
+                method_bucket = self._method_bucket(host, method)
+                while True:
+                    now = time.monotonic()
+                    delay = max(app_bucket.delay(now), method_bucket.delay(now))
+                    if delay <= 0:
+                        app_bucket.consume(now)
+                        method_bucket.consume(now)
+                        return
+                    await asyncio.sleep(delay)
+        finally:
+            self._waiting[key] -= 1
+
+    def update(self, host: str, method: str, status_code: int, headers) -> Optional[float]:
+        """
+        Learn limits and counts from a Riot response.
+
+        Args:
+            host: Routing value or platform the request was sent to
+            method: Endpoint name the method limit is tracked under
+            status_code: HTTP status of the response
+            headers: Response headers
+
+        Returns:
+            Seconds to back off if the response was a 429, otherwise None
+        """
+        now = time.monotonic()
+        app_bucket = self._app_bucket(host)
+        method_bucket = self._method_bucket(host, method)
+
+        app_limits = parse_rate_limit_header(headers.get('X-App-Rate-Limit'))
+        if app_limits:
+            app_bucket.update_limits(app_limits)
+        app_bucket.update_counts(parse_rate_limit_header(headers.get('X-App-Rate-Limit-Count')), now)
+
+        method_limits = parse_rate_limit_header(headers.get('X-Method-Rate-Limit'))
+        if method_limits:
+            method_bucket.update_limits(method_limits)
+        method_bucket.update_counts(parse_rate_limit_header(headers.get('X-Method-Rate-Limit-Count')), now)
+
+        if status_code != 429:
+            return None
+
+        try:
+            retry_after = float(headers.get('Retry-After', DEFAULT_RETRY_AFTER))
+        except ValueError:
+            retry_after = DEFAULT_RETRY_AFTER
+
+        # Application-level 429s affect everything on the host; method and
+        # service-level ones only the endpoint that was rejected
+        limit_type = headers.get('X-Rate-Limit-Type', 'service')
+        if limit_type == 'application':
+            app_bucket.block(retry_after, now)
+        else:
+            method_bucket.block(retry_after, now)
+
+        logger.warning(f"Riot {limit_type} rate limit hit on {host} ({method}), backing off {retry_after:.1f}s")
+        return retry_after
+
+    def queue_depth(self, host: Optional[str] = None) -> int:
+        """Number of requests currently waiting for budget, optionally for one host."""
+        return sum(
+            count for (queued_host, _), count in self._waiting.items()
+            if host is None or queued_host == host
+        )
+
+    def snapshot(self) -> Dict:
+        """Current budget and queue depth for every host seen so far."""
+        now = time.monotonic()
+        hosts = {}
+        for host, bucket in self.app_buckets.items():
+            hosts[host] = {
+                'queued': self.queue_depth(host),
+                'app': bucket.snapshot(now),
+                'methods': {
+                    method: {
+                        'queued': self._waiting.get((method_host, method), 0),
+                        **method_bucket.snapshot(now)
+                    }
+                    for (method_host, method), method_bucket in self.method_buckets.items()
+                    if method_host == host
+                }
+            }
+        return hosts
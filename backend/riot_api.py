@@ -2,23 +2,147 @@
 Riot Games API Integration for League of Legends Data
 """
 import os
-import requests
+import asyncio
+import httpx
 import logging
-from typing import Dict, List, Optional
-from dotenv import load_dotenv
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from rate_limiter import RiotRateLimiter
+from host_pools import HostPools
+from match_parser import parse_match_stream
+from cache import TTLCache, MISSING
+from stats_accumulator import StatsAccumulator
+from deadline import DeadlineExceeded
+import deadline
+import metrics
 
 logger = logging.getLogger(__name__)
-load_dotenv()
 
 RIOT_API_KEY = os.environ.get('RIOT_API_KEY')
 
+# Maximum number of match-detail requests in flight per analysis
+RIOT_MATCH_CONCURRENCY = int(os.environ.get('RIOT_MATCH_CONCURRENCY', '10'))
+
+# How many times a rate-limited (429) request is re-queued before giving up
+RIOT_MAX_RETRIES = int(os.environ.get('RIOT_MAX_RETRIES', '3'))
+
+# Account and summoner lookup caching (sizes in entries, lifetimes in seconds)
+RIOT_LOOKUP_CACHE_SIZE = int(os.environ.get('RIOT_LOOKUP_CACHE_SIZE', '10000'))
+RIOT_ACCOUNT_CACHE_TTL = float(os.environ.get('RIOT_ACCOUNT_CACHE_TTL', '3600'))
+RIOT_ACCOUNT_NOT_FOUND_TTL = float(os.environ.get('RIOT_ACCOUNT_NOT_FOUND_TTL', '300'))
+RIOT_SUMMONER_CACHE_TTL = float(os.environ.get('RIOT_SUMMONER_CACHE_TTL', '600'))
+
+# Keep-alive connection pool per Riot host (connections, idle connections kept, idle seconds)
+RIOT_POOL_MAX_CONNECTIONS = int(os.environ.get('RIOT_POOL_MAX_CONNECTIONS', '50'))
+RIOT_POOL_MAX_KEEPALIVE = int(os.environ.get('RIOT_POOL_MAX_KEEPALIVE', '20'))
+RIOT_POOL_KEEPALIVE_EXPIRY = float(os.environ.get('RIOT_POOL_KEEPALIVE_EXPIRY', '30'))
+
+# Multiplex requests over HTTP/2 (needs the h2 package)
+RIOT_HTTP2 = os.environ.get('RIOT_HTTP2', '0') == '1'
+
+# Hosts connected to at startup so the first analysis skips the handshakes
+RIOT_WARM_HOSTS = [h.strip() for h in os.environ.get('RIOT_WARM_HOSTS', 'americas,na1').split(',') if h.strip()]
+
+# Riot returns at most this many match IDs per request
+MATCH_ID_PAGE_SIZE = 100
+
+# Longest history kept match by match for incremental re-analysis; longer ones are streamed
+RIOT_WINDOW_MAX_MATCHES = int(os.environ.get('RIOT_WINDOW_MAX_MATCHES', '100'))
+
+# Matches between progress reports
+PROGRESS_EVERY = 10
+
+# Receives {'matches_fetched', 'matches_requested'} while matches are folded in
+ProgressCallback = Callable[[Dict], Awaitable[None]]
+
+
+class MatchBatch:
+    """
+    Match downloads shared by the analyses of one batch request.
+    
+    Teammates appear in each other's match histories, so players analyzed
+    together share a memo of match_id to download task: each match is fetched
+    from Riot once, and all downloads of the batch draw from one concurrency
+    budget instead of one per player.
+    """
+    
+    def __init__(self, concurrency: int = RIOT_MATCH_CONCURRENCY):
+        self.semaphore = asyncio.Semaphore(max(1, concurrency))
+        self.tasks: Dict[str, asyncio.Task] = {}
+        # Analyses currently awaiting each download
+        self.users: Dict[str, int] = {}
+        self.cancelled = False
+        self.shared = 0
+    
+    async def fetch(self, match_id: str, download: Callable[[], Awaitable[Optional[Dict]]]) -> Optional[Dict]:
+        """
+        Await the batch's download of ``match_id``, starting it if nobody has yet.
+        
+        Args:
+            match_id: Match identifier
+            download: Zero-argument coroutine function fetching the match
+            
+        Returns:
+            The compact match, or None if it could not be fetched
+        """
+        task = self.tasks.get(match_id)
+        if task is None or task.cancelled():
+            task = asyncio.create_task(download())
+            self.tasks[match_id] = task
+        else:
+            self.shared += 1
+        self.users[match_id] = self.users.get(match_id, 0) + 1
+        try:
+            # Other players of the batch may still need the download
+            return await asyncio.shield(task)
+        finally:
+            self.users[match_id] -= 1
+            if self.cancelled and not self.users[match_id]:
+                task.cancel()
+    
+    def cancel(self):
+        """
+        Cancel downloads nobody is awaiting, e.g. once the batch request is abandoned.
+        
+        Analyses that outlive the batch (because other requests joined them)
+        keep their downloads; each is cancelled when its last user stops waiting.
+        """
+        self.cancelled = True
+        for match_id, task in self.tasks.items():
+            if not self.users.get(match_id):
+                task.cancel()
+    
+    def stats(self) -> Dict:
+        """Number of distinct matches downloaded and how many downloads were shared."""
+        return {'matches_downloaded': len(self.tasks), 'matches_shared': self.shared}
+
 
 class RiotAPI:
     """Handles all Riot API interactions for summoner and match data."""
     
-    def __init__(self):
+    def __init__(self, match_concurrency: int = RIOT_MATCH_CONCURRENCY):
         self.api_key = RIOT_API_KEY
         self.headers = {"X-Riot-Token": self.api_key}
+        self.match_concurrency = max(1, match_concurrency)
+        self.window_max_matches = RIOT_WINDOW_MAX_MATCHES
+        # Keep-alive connections per routing/platform host, opened on first use
+        self.pools = HostPools(
+            self.headers,
+            max_connections=RIOT_POOL_MAX_CONNECTIONS,
+            max_keepalive=RIOT_POOL_MAX_KEEPALIVE,
+            keepalive_expiry=RIOT_POOL_KEEPALIVE_EXPIRY,
+            http2=RIOT_HTTP2
+        )
+        self.rate_limiter = RiotRateLimiter()
+        self.max_retries = RIOT_MAX_RETRIES
+        
+        # Riot ID -> account and PUUID -> summoner lookups barely change
+        self.account_cache = TTLCache(RIOT_LOOKUP_CACHE_SIZE, RIOT_ACCOUNT_CACHE_TTL)
+        self.summoner_cache = TTLCache(RIOT_LOOKUP_CACHE_SIZE, RIOT_SUMMONER_CACHE_TTL)
+        
+        # Optional MatchCache and PlayerAggregateStore, attached once the database is available
+        self.match_cache = None
+        self.aggregate_store = None
         
         # Regional routing values
         self.region_to_platform = {
@@ -49,7 +173,77 @@ class RiotAPI:
             'oce': 'sea'
         }
     
-    def get_account_by_riot_id(self, game_name: str, tag_line: str, region: str = 'na') -> Optional[Dict]:
+    async def prewarm(self, hosts: List[str] = RIOT_WARM_HOSTS):
+        """
+        Open keep-alive connections to ``hosts`` so the first analysis skips the handshakes.
+        
+        The clients are built off the event loop; the warm-up requests are
+        ``GET /`` on each host, outside the rate limiter.
+        """
+        await asyncio.to_thread(lambda: [self.pools.client(host) for host in hosts])
+        await self.pools.warm({host: f"https://{host}.api.riotgames.com/" for host in hosts})
+    
+    async def close(self):
+        """Close the connection pools."""
+        await self.pools.aclose()
+    
+    async def _get(
+        self,
+        host: str,
+        method: str,
+        path: str,
+        params: Optional[Dict] = None,
+        stream: bool = False
+    ) -> httpx.Response:
+        """
+        Send a GET request through the shared rate-limit scheduler.
+        
+        Rate-limited responses are re-queued after their Retry-After instead of
+        being dropped, up to ``max_retries`` times. Queueing and retries count
+        against the current request deadline.
+        
+        Args:
+            host: Routing value or platform (americas, na1, ...)
+            method: Endpoint name the method rate limit is tracked under
+            path: Request path on the host
+            params: Optional query parameters
+            stream: Return before reading the body; the caller must ``aclose()`` the response
+            
+        Returns:
+            Successful response
+            
+        Raises:
+            httpx.HTTPStatusError: If Riot returns an error status
+            DeadlineExceeded: If the request's time for the Riot fetch runs out
+        """
+        return await deadline.bounded('riot_fetch', self._request(host, method, path, params, stream))
+    
+    async def _request(
+        self,
+        host: str,
+        method: str,
+        path: str,
+        params: Optional[Dict],
+        stream: bool
+    ) -> httpx.Response:
+        url = f"https://{host}.api.riotgames.com{path}"
+        
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire(host, method)
+            with metrics.upstream('riot', method):
+                response = await self.pools.send(host, url, params, stream=stream)
+            self.rate_limiter.update(host, method, response.status_code, response.headers)
+            if response.is_success:
+                return response
+            
+            await response.aclose()
+            if response.status_code == 429:
+                metrics.RATE_LIMITED.labels(method, response.headers.get('X-Rate-Limit-Type', 'service')).inc()
+                if attempt < self.max_retries:
+                    continue
+            response.raise_for_status()
+    
+    async def get_account_by_riot_id(self, game_name: str, tag_line: str, region: str = 'na') -> Optional[Dict]:
         """
         Get account information using Riot ID (GameName#TagLine).
         
@@ -59,20 +253,28 @@ class RiotAPI:
             region: Region code (na, euw, kr, etc.)
             
         Returns:
-            Dictionary with account data including puuid
+            Dictionary with account data including puuid, or None if not found
         """
         routing = self.region_to_routing.get(region.lower(), 'americas')
-        url = f"https://{routing}.api.riotgames.com/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        path = f"/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
+        
+        # Riot IDs are case-insensitive; unknown IDs are cached too (as None)
+        cache_key = (routing, game_name.lower(), tag_line.lower())
+        cached = self.account_cache.get(cache_key)
+        metrics.cache_result('riot_accounts', hits=cached is not MISSING, misses=cached is MISSING)
+        if cached is not MISSING:
+            return cached
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            response = await self._get(routing, 'account', path)
             data = response.json()
             logger.info(f"Successfully fetched account data for {game_name}#{tag_line}")
+            self.account_cache.set(cache_key, data)
             return data
-        except requests.exceptions.HTTPError as e:
+        except httpx.HTTPStatusError as e:
             if e.response.status_code == 404:
                 logger.error(f"Account {game_name}#{tag_line} not found in region {region}")
+                self.account_cache.set(cache_key, None, ttl=RIOT_ACCOUNT_NOT_FOUND_TTL)
                 return None
             logger.error(f"HTTP error fetching account: {e}")
             raise
@@ -80,7 +282,7 @@ class RiotAPI:
             logger.error(f"Error fetching account {game_name}#{tag_line}: {e}")
             raise
     
-    def get_summoner_by_puuid(self, puuid: str, region: str = 'na') -> Optional[Dict]:
+    async def get_summoner_by_puuid(self, puuid: str, region: str = 'na') -> Optional[Dict]:
         """
         Get summoner information by PUUID.
         
@@ -92,19 +294,32 @@ class RiotAPI:
             Dictionary with summoner data including summonerId, level, etc.
         """
         platform = self.region_to_platform.get(region.lower(), 'na1')
-        url = f"https://{platform}.api.riotgames.com/lol/summoner/v4/summoners/by-puuid/{puuid}"
+        path = f"/lol/summoner/v4/summoners/by-puuid/{puuid}"
+        
+        cache_key = (platform, puuid)
+        cached = self.summoner_cache.get(cache_key)
+        metrics.cache_result('riot_summoners', hits=cached is not MISSING, misses=cached is MISSING)
+        if cached is not MISSING:
+            return cached
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
+            response = await self._get(platform, 'summoner', path)
             data = response.json()
             logger.info(f"Successfully fetched summoner data by PUUID")
+            self.summoner_cache.set(cache_key, data)
             return data
         except Exception as e:
             logger.error(f"Error fetching summoner by PUUID: {e}")
             raise
     
-    def get_match_ids(self, puuid: str, region: str = 'na', count: int = 20) -> List[str]:
+    async def get_match_ids(
+        self,
+        puuid: str,
+        region: str = 'na',
+        count: int = 20,
+        start_time: Optional[int] = None,
+        start: int = 0
+    ) -> List[str]:
         """
         Get list of match IDs for a player.
         
@@ -112,17 +327,22 @@ class RiotAPI:
             puuid: Player's unique identifier
             region: Region code
             count: Number of matches to retrieve (max 100)
+            start_time: Only return matches started at or after this epoch time (seconds)
+            start: Index in the history (newest first) of the first match to return
             
         Returns:
-            List of match IDs
+            List of match IDs, newest first
         """
         routing = self.region_to_routing.get(region.lower(), 'americas')
-        url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids"
-        params = {"count": min(count, 100)}
+        path = f"/lol/match/v5/matches/by-puuid/{puuid}/ids"
+        params = {"count": min(count, MATCH_ID_PAGE_SIZE)}
+        if start:
+            params["start"] = start
+        if start_time is not None:
+            params["startTime"] = start_time
         
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=10)
-            response.raise_for_status()
+            response = await self._get(routing, 'match-ids', path, params)
             match_ids = response.json()
             logger.info(f"Retrieved {len(match_ids)} match IDs for puuid")
             return match_ids
@@ -130,138 +350,334 @@ class RiotAPI:
             logger.error(f"Error fetching match IDs: {e}")
             raise
     
-    def get_match_details(self, match_id: str, region: str = 'na') -> Optional[Dict]:
+    async def iter_match_id_pages(
+        self,
+        puuid: str,
+        region: str,
+        count: int,
+        start_time: Optional[int] = None
+    ) -> AsyncIterator[List[str]]:
         """
-        Get detailed match information.
+        Page through a player's match history, newest first.
         
         Args:
-            match_id: Match identifier
+            puuid: Player's unique identifier
             region: Region code
+            count: Total number of match IDs wanted
+            start_time: Only return matches started at or after this epoch time (seconds)
             
-        Returns:
-            Dictionary with complete match data
+        Yields:
+            Lists of up to MATCH_ID_PAGE_SIZE match IDs, until ``count`` IDs or the end of the history
+        """
+        start = 0
+        while start < count:
+            page_size = min(MATCH_ID_PAGE_SIZE, count - start)
+            page = await self.get_match_ids(puuid, region, page_size, start_time=start_time, start=start)
+            if page:
+                yield page
+            if len(page) < page_size:
+                return
+            start += len(page)
+    
+    async def _download_match_summary(self, match_id: str, region: str) -> Optional[Dict]:
+        """
+        Fetch a match from Riot, compact it and store it in the match cache.
+        
+        The body is parsed as it streams in and only the fields of the compact
+        record are kept, so the full match-v5 document is never held in memory.
         """
         routing = self.region_to_routing.get(region.lower(), 'americas')
-        url = f"https://{routing}.api.riotgames.com/lol/match/v5/matches/{match_id}"
+        path = f"/lol/match/v5/matches/{match_id}"
+        
+        async def download() -> Dict:
+            response = await self._get(routing, 'match', path, stream=True)
+            try:
+                return await parse_match_stream(match_id, response.aiter_bytes())
+            finally:
+                await response.aclose()
         
         try:
-            response = requests.get(url, headers=self.headers, timeout=10)
-            response.raise_for_status()
-            data = response.json()
-            return data
+            # The body streams in after _get returns, so the deadline covers the whole download
+            match = await deadline.bounded('riot_fetch', download())
+        except DeadlineExceeded:
+            return None
         except Exception as e:
             logger.error(f"Error fetching match {match_id}: {e}")
             return None
+        
+        if self.match_cache:
+            await self.match_cache.put(match)
+        return match
     
-    def get_player_stats(self, game_name: str, tag_line: str, region: str = 'na', match_count: int = 20) -> Dict:
+    async def _fetch_matches(self, match_ids: List[str], region: str, batch: Optional[MatchBatch] = None):
+        """
+        Fetch match summaries concurrently, yielding each one as it arrives.
+        
+        Cached matches are read in a single query and yielded first. At most
+        ``match_concurrency`` Riot requests are in flight at once so a single
+        analysis cannot monopolize the connection pool.
+        
+        Args:
+            match_ids: Match identifiers to fetch
+            region: Region code
+            batch: Downloads shared with other analyses of the same batch, if any
+            
+        Yields:
+            Compact match dictionaries (or None for matches that failed), in completion order
+        """
+        cached = await self.match_cache.get_many(match_ids) if self.match_cache else {}
+        metrics.cache_result('matches', hits=len(cached), misses=len(match_ids) - len(cached))
+        if cached:
+            logger.info(f"Match cache hit for {len(cached)}/{len(match_ids)} matches")
+        for match in cached.values():
+            yield match
+        
+        semaphore = batch.semaphore if batch else asyncio.Semaphore(self.match_concurrency)
+        
+        async def download(match_id: str) -> Optional[Dict]:
+            async with semaphore:
+                return await self._download_match_summary(match_id, region)
+        
+        async def fetch(match_id: str) -> Optional[Dict]:
+            if not batch:
+                return await download(match_id)
+            return await batch.fetch(match_id, lambda: download(match_id))
+        
+        tasks = [asyncio.create_task(fetch(match_id)) for match_id in match_ids if match_id not in cached]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                yield await next_done
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _load_aggregate_state(self, puuid: str, region: str, match_count: int) -> Optional[Dict]:
+        """Stored aggregate state for a player, if it can be extended to ``match_count`` games."""
+        if not self.aggregate_store:
+            return None
+        state = await self.aggregate_store.get(puuid, region)
+        if not state or state['match_count'] < match_count or not state['newest_game_start']:
+            return None
+        return state
+    
+    def _window_entry(self, match_data: Optional[Dict], puuid: str) -> Optional[Dict]:
+        """
+        Extract the player's part of a match as a window entry.
+        
+        Args:
+            match_data: Compact match dictionary (or None if the fetch failed)
+            puuid: Player's unique identifier
+            
+        Returns:
+            Dictionary with match_id, game_start, game_duration and participant,
+            or None if the player is not in the match
+        """
+        if not match_data:
+            return None
+        
+        # Find player in participants
+        participant = None
+        for p in match_data['info']['participants']:
+            if p['puuid'] == puuid:
+                participant = p
+                break
+        
+        if not participant:
+            return None
+        
+        return {
+            'match_id': match_data['match_id'],
+            'game_start': match_data['info'].get('gameStartTimestamp', 0),
+            'game_duration': match_data['info']['gameDuration'],
+            'participant': participant
+        }
+    
+    async def _report_progress(self, progress: Optional[ProgressCallback], fetched: int, requested: int, force: bool = False):
+        """Report progress every PROGRESS_EVERY matches, and whenever ``force`` is set."""
+        if progress and (force or fetched % PROGRESS_EVERY == 0):
+            await progress({'matches_fetched': fetched, 'matches_requested': requested})
+    
+    async def _window_totals(
+        self,
+        puuid: str,
+        region: str,
+        match_count: int,
+        player: str,
+        batch: Optional[MatchBatch] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> StatsAccumulator:
+        """
+        Totals over the newest ``match_count`` games, kept as a per-match window.
+        
+        The window is stored with the totals, so a re-analysis only asks Riot
+        for games newer than it, merges their totals into the stored ones and
+        subtracts the games that fall out.
+        """
+        # Re-analyses only ask Riot for games newer than the stored window
+        state = await self._load_aggregate_state(puuid, region, match_count)
+        start_time = state['newest_game_start'] // 1000 if state else None
+        match_ids = []
+        try:
+            async for page in self.iter_match_id_pages(puuid, region, match_count, start_time):
+                match_ids.extend(page)
+        except DeadlineExceeded:
+            # A stored window is still an answer, just without the newest games
+            if not state and not match_ids:
+                raise
+        
+        if state:
+            known_ids = {entry['match_id'] for entry in state['window']}
+            match_ids = [match_id for match_id in match_ids if match_id not in known_ids]
+            totals = StatsAccumulator.load(state['totals'])
+            window = state['window']
+            logger.info(f"Incremental analysis for {player}: {len(match_ids)} new matches")
+        else:
+            if not match_ids:
+                raise ValueError("No matches found")
+            totals = StatsAccumulator()
+            window = []
+        
+        # Aggregate stats from matches
+        await self._report_progress(progress, 0, len(match_ids), force=True)
+        new_totals = StatsAccumulator()
+        new_entries = []
+        fetched = 0
+        async for match_data in self._fetch_matches(match_ids, region, batch):
+            fetched += 1
+            await self._report_progress(progress, fetched, len(match_ids), force=fetched == len(match_ids))
+            entry = self._window_entry(match_data, puuid)
+            if not entry:
+                continue
+            new_totals.add(entry)
+            new_entries.append(entry)
+        totals.merge(new_totals)
+        
+        skipped = len(match_ids) - len(new_entries)
+        cut_short = deadline.degraded('riot_fetch')
+        if skipped and not cut_short:
+            logger.warning(f"{skipped} of {len(match_ids)} matches could not be used for {player}")
+        
+        # Keep the newest match_count games and subtract the ones that left the window
+        window = sorted(new_entries + window, key=lambda entry: entry['game_start'], reverse=True)
+        for entry in window[match_count:]:
+            totals.remove(entry)
+        window = window[:match_count]
+        
+        # A state with gaps, cut short by the deadline or without start times cannot be extended safely
+        if self.aggregate_store and not skipped and not cut_short and all(entry['game_start'] for entry in window):
+            await self.aggregate_store.save(puuid, region, match_count, totals, window)
+        return totals
+    
+    async def _stream_totals(
+        self,
+        puuid: str,
+        region: str,
+        match_count: int,
+        player: str,
+        progress: Optional[ProgressCallback] = None
+    ) -> StatsAccumulator:
+        """
+        Totals over the newest ``match_count`` games, folded in one page of match IDs at a time.
+        
+        Only one page of matches is fetched or held at once, and each match is
+        discarded as soon as it is folded in, so memory stays flat however long
+        the history is. No window is kept, so these analyses are always fetched
+        in full (match summaries still come from the match cache).
+        """
+        totals = StatsAccumulator()
+        seen = set()
+        requested = 0
+        fetched = 0
+        try:
+            async for page in self.iter_match_id_pages(puuid, region, match_count):
+                # A game finished while paging shifts the history by one; skip IDs already seen
+                page = [match_id for match_id in page if match_id not in seen]
+                seen.update(page)
+                requested += len(page)
+                await self._report_progress(progress, fetched, requested, force=True)
+                async for match_data in self._fetch_matches(page, region):
+                    fetched += 1
+                    await self._report_progress(progress, fetched, requested)
+                    entry = self._window_entry(match_data, puuid)
+                    if entry:
+                        totals.add(entry)
+                # Later pages would only be refused
+                if deadline.degraded('riot_fetch'):
+                    break
+        except DeadlineExceeded:
+            if not requested:
+                raise
+        
+        if not requested:
+            raise ValueError("No matches found")
+        if fetched % PROGRESS_EVERY:
+            await self._report_progress(progress, fetched, requested, force=True)
+        skipped = requested - totals.total_games
+        if skipped and not deadline.degraded('riot_fetch'):
+            logger.warning(f"{skipped} of {requested} matches could not be used for {player}")
+        logger.info(f"Streamed {requested} matches for {player}")
+        return totals
+    
+    async def get_player_stats(
+        self,
+        game_name: str,
+        tag_line: str,
+        region: str = 'na',
+        match_count: int = 20,
+        batch: Optional[MatchBatch] = None,
+        progress: Optional[ProgressCallback] = None
+    ) -> Dict:
         """
         Get aggregated player statistics from recent matches.
         
+        Histories up to ``window_max_matches`` games keep a per-match window
+        so re-analyses only fetch new games; longer ones are streamed page by
+        page in constant memory.
+        
+        Under a request deadline, matches not downloaded in time are left
+        out and the stats cover the games that were (``total_games`` says
+        how many).
+        
         Args:
             game_name: Player's game name (before #)
             tag_line: Player's tag line (after #)
             region: Region code
             match_count: Number of recent matches to analyze
+            batch: Match downloads shared with the other players of a batch analysis
+            progress: Awaited with the number of matches fetched so far, starting
+                once the match IDs are known
             
         Returns:
             Dictionary with aggregated statistics
+            
+        Raises:
+            ValueError: If the account, summoner or matches do not exist
+            DeadlineExceeded: If the deadline leaves no games to analyze
         """
         # Get account info using Riot ID
-        account = self.get_account_by_riot_id(game_name, tag_line, region)
+        account = await self.get_account_by_riot_id(game_name, tag_line, region)
         if not account:
             raise ValueError(f"Account {game_name}#{tag_line} not found")
         
         puuid = account['puuid']
         
         # Get summoner info for level
-        summoner = self.get_summoner_by_puuid(puuid, region)
+        summoner = await self.get_summoner_by_puuid(puuid, region)
         if not summoner:
             raise ValueError(f"Summoner data not found for {game_name}#{tag_line}")
         
-        # Get match IDs
-        match_ids = self.get_match_ids(puuid, region, match_count)
-        if not match_ids:
-            raise ValueError("No matches found")
+        player = f"{game_name}#{tag_line}"
+        if match_count > self.window_max_matches:
+            totals = await self._stream_totals(puuid, region, match_count, player, progress)
+        else:
+            totals = await self._window_totals(puuid, region, match_count, player, batch, progress)
         
-        # Aggregate stats from matches
-        stats = {
-            'total_games': 0,
-            'wins': 0,
-            'kills': 0,
-            'deaths': 0,
-            'assists': 0,
-            'total_cs': 0,
-            'vision_score': 0,
-            'damage_dealt': 0,
-            'damage_taken': 0,
-            'gold_earned': 0,
-            'wards_placed': 0,
-            'wards_killed': 0,
-            'total_game_duration': 0,
-            'champions_played': {},
-            'first_bloods': 0,
-            'solo_kills': 0,
-            'multikills': 0
-        }
+        if deadline.degraded('riot_fetch'):
+            if not totals.total_games:
+                raise DeadlineExceeded('riot_fetch')
+            logger.warning(f"Deadline reached for {player}: analyzing the {totals.total_games} games fetched so far")
         
-        for match_id in match_ids:
-            match_data = self.get_match_details(match_id, region)
-            if not match_data:
-                continue
-            
-            # Find player in participants
-            participant = None
-            for p in match_data['info']['participants']:
-                if p['puuid'] == puuid:
-                    participant = p
-                    break
-            
-            if not participant:
-                continue
-            
-            # Aggregate stats
-            stats['total_games'] += 1
-            stats['wins'] += 1 if participant['win'] else 0
-            stats['kills'] += participant['kills']
-            stats['deaths'] += participant['deaths']
-            stats['assists'] += participant['assists']
-            stats['total_cs'] += participant['totalMinionsKilled'] + participant.get('neutralMinionsKilled', 0)
-            stats['vision_score'] += participant.get('visionScore', 0)
-            stats['damage_dealt'] += participant['totalDamageDealtToChampions']
-            stats['damage_taken'] += participant['totalDamageTaken']
-            stats['gold_earned'] += participant['goldEarned']
-            stats['wards_placed'] += participant.get('wardsPlaced', 0)
-            stats['wards_killed'] += participant.get('wardsKilled', 0)
-            stats['total_game_duration'] += match_data['info']['gameDuration']
-            stats['first_bloods'] += 1 if participant.get('firstBloodKill', False) else 0
-            
-            # Track champion diversity
-            champion = participant['championName']
-            stats['champions_played'][champion] = stats['champions_played'].get(champion, 0) + 1
-            
-            # Solo kills (kills without assists from team in small timeframe - approximated)
-            if participant['kills'] > participant['assists']:
-                stats['solo_kills'] += 1
-            
-            # Multikills
-            if participant.get('doubleKills', 0) > 0 or participant.get('tripleKills', 0) > 0:
-                stats['multikills'] += 1
-        
-        # Calculate averages
-        if stats['total_games'] > 0:
-            stats['avg_kills'] = round(stats['kills'] / stats['total_games'], 2)
-            stats['avg_deaths'] = round(stats['deaths'] / stats['total_games'], 2)
-            stats['avg_assists'] = round(stats['assists'] / stats['total_games'], 2)
-            stats['avg_cs'] = round(stats['total_cs'] / stats['total_games'], 1)
-            stats['avg_vision_score'] = round(stats['vision_score'] / stats['total_games'], 1)
-            stats['avg_damage_dealt'] = round(stats['damage_dealt'] / stats['total_games'], 0)
-            stats['avg_damage_taken'] = round(stats['damage_taken'] / stats['total_games'], 0)
-            stats['avg_gold'] = round(stats['gold_earned'] / stats['total_games'], 0)
-            stats['avg_wards_placed'] = round(stats['wards_placed'] / stats['total_games'], 1)
-            stats['avg_game_duration'] = round(stats['total_game_duration'] / stats['total_games'] / 60, 1)  # in minutes
-            stats['win_rate'] = round((stats['wins'] / stats['total_games']) * 100, 1)
-            stats['kda'] = round((stats['kills'] + stats['assists']) / max(stats['deaths'], 1), 2)
-            stats['champion_pool_size'] = len(stats['champions_played'])
+        stats = totals.finalize()
         
         stats['summoner_name'] = f"{game_name}#{tag_line}"
         stats['game_name'] = game_name
@@ -0,0 +1,56 @@
+"""
+Rebuild the /api/stats/global counters from every stored analysis.
+
+Reads db.analyses once, recomputes the counters the way each stored
+analysis would have incremented them, and replaces the counter documents.
+Use it to start the counters on an existing database, to repair them after
+failed increments, or to drop analyses removed by ANALYSIS_RETENTION_DAYS.
+Analyses stored while it runs may be miscounted; run it again if that matters.
+
+Usage (from backend/):
+    python -m scripts.rebuild_global_stats             # rebuild
+    python -m scripts.rebuild_global_stats --dry-run   # compare with the current counters
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+from pathlib import Path
+from typing import List
+
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+
+load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+
+from global_stats import GlobalStats, summarize
+
+
+async def rebuild(dry_run: bool) -> int:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    try:
+        db = client[os.environ['DB_NAME']]
+        stats = GlobalStats(db.global_stats)
+        current = summarize(await stats.totals())
+        rebuilt = summarize(await stats.rebuild(db.analyses, dry_run=dry_run))
+    finally:
+        client.close()
+
+    print(f"analyses: {current['analyses']} counted, {rebuilt['analyses']} stored")
+    if dry_run:
+        changed = [key for key in rebuilt if rebuilt[key] != current[key]]
+        print(f"fields that would change: {', '.join(changed) or 'none'}")
+    print(json.dumps(rebuilt, indent=2))
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dry-run', action='store_true', help='compute the counters without writing them')
+    args = parser.parse_args(argv)
+    return asyncio.run(rebuild(args.dry_run))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""
+Re-score stored analyses with the current PersonalityEngine, without calling Riot or Bedrock.
+
+Streams db.analyses in _id order, rebuilds each player's stats from the
+raw totals stored with the analysis (``raw_stats``), re-runs
+calculate_traits and determine_spirit_champion in a process pool, and
+writes back only the analyses whose traits or spirit champion changed,
+one unordered bulk_write per batch. Analyses stored before raw stats were
+kept are skipped.
+
+- The global stats counters are adjusted by the difference between the
+  old and the new scores, so /api/stats/global stays consistent.
+- Stored narratives are kept, even when they name a spirit champion the
+  analysis no longer has. With --replace-narratives those are replaced by
+  the canned fallback narrative and 'narrative' is added to ``degraded``;
+  Bedrock narratives cannot be regenerated offline, so this is opt-in.
+- GET /api/analysis/{id} responses are cached in servers, browsers and
+  CDNs for ANALYSIS_CACHE_MAX_AGE and then revalidated by ETag, so
+  rescored analyses are served within that time.
+- After each written batch the last _id is saved to --checkpoint, and
+  --resume continues from there. Re-processing a batch is harmless:
+  analyses that were already rewritten compare equal and are skipped.
+- --dry-run writes nothing and prints what would change.
+
+Usage (from backend/):
+    python -m scripts.rescore_analyses --dry-run --show 20
+    python -m scripts.rescore_analyses --workers 8 --batch-size 2000
+    python -m scripts.rescore_analyses --resume
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+from dotenv import load_dotenv
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+
+load_dotenv(Path(__file__).resolve().parent.parent / '.env')
+
+from global_stats import GlobalStats, add_increments, analysis_increments
+from personality_engine import PersonalityEngine
+from stats_accumulator import StatsAccumulator
+
+# Fields read from each stored analysis
+PROJECTION = {
+    '_id': 1,
+    'analysis_id': 1,
+    'summoner_name': 1,
+    'raw_stats': 1,
+    'traits': 1,
+    'spirit_champion': 1,
+    'degraded': 1
+}
+
+# Per-process state, set up once by _init_worker
+_engine: Optional[PersonalityEngine] = None
+_narrator = None
+
+
+def _init_worker(replace_narratives: bool):
+    global _engine, _narrator
+    _engine = PersonalityEngine()
+    if replace_narratives:
+        from bedrock_ai import BedrockAI
+        _narrator = BedrockAI()
+
+
+def rescore_batch(analyses: List[Dict]) -> Dict:
+    """
+    Re-score a batch of stored analyses (runs in a worker process).
+
+    Args:
+        analyses: Stored analyses with the PROJECTION fields
+
+    Returns:
+        Last _id of the batch, the ``$set`` updates for changed analyses,
+        the global stats increments they imply, and a short diff per change
+    """
+    updates = []
+    increments: Dict[str, int] = {}
+    changes = []
+    for analysis in analyses:
+        stats = StatsAccumulator.from_bytes(analysis['raw_stats']).finalize()
+        traits = _engine.calculate_traits(stats)
+        spirit_champion = _engine.determine_spirit_champion(traits, stats)
+        if traits == analysis['traits'] and spirit_champion == analysis['spirit_champion']:
+            continue
+
+        update = {'traits': traits, 'spirit_champion': spirit_champion}
+        old_champion = analysis['spirit_champion']['primary']['champion']
+        new_champion = spirit_champion['primary']['champion']
+        if new_champion != old_champion and _narrator is not None:
+            update['narrative'] = _narrator.fallback_narrative(
+                analysis['summoner_name'], traits, spirit_champion['primary']
+            )
+            degraded = analysis.get('degraded') or []
+            if 'narrative' not in degraded:
+                update['degraded'] = degraded + ['narrative']
+        updates.append((analysis['_id'], update))
+
+        add_increments(increments, analysis_increments(analysis), sign=-1)
+        add_increments(increments, analysis_increments({**analysis, **update}))
+
+        old_scores = {trait['name']: trait['score'] for trait in analysis['traits']}
+        changes.append({
+            'analysis_id': analysis.get('analysis_id'),
+            'champion': [old_champion, new_champion] if new_champion != old_champion else None,
+            'traits': {
+                trait['name']: [old_scores.get(trait['name']), trait['score']]
+                for trait in traits if old_scores.get(trait['name']) != trait['score']
+            }
+        })
+    return {
+        'last_id': analyses[-1]['_id'],
+        'scanned': len(analyses),
+        'updates': updates,
+        'increments': increments,
+        'changes': changes
+    }
+
+
+class RescoreReport:
+    """Running totals of what changed, printed as progress and as the final diff."""
+
+    def __init__(self, show: int):
+        self.show = show
+        self.started = time.perf_counter()
+        self.scanned = 0
+        self.changed = 0
+        self.champion_changes: Counter = Counter()
+        self.trait_changes: Counter = Counter()
+        self.trait_deltas: Counter = Counter()
+        self.samples: List[Dict] = []
+
+    def add(self, result: Dict):
+        self.scanned += result['scanned']
+        self.changed += len(result['updates'])
+        for change in result['changes']:
+            if change['champion']:
+                self.champion_changes[tuple(change['champion'])] += 1
+            for name, (old, new) in change['traits'].items():
+                self.trait_changes[name] += 1
+                self.trait_deltas[name] += new - (old or 0)
+            if len(self.samples) < self.show:
+                self.samples.append(change)
+
+    def progress(self) -> str:
+        seconds = time.perf_counter() - self.started
+        return f"{self.scanned} scanned, {self.changed} changed, {self.scanned / max(seconds, 1e-9):.0f}/s"
+
+    def print_summary(self, dry_run: bool):
+        verb = 'would change' if dry_run else 'changed'
+        print(f"{self.scanned} analyses scanned in {time.perf_counter() - self.started:.1f}s; {self.changed} {verb}")
+        if self.trait_changes:
+            print("trait scores (analyses changed, mean change):")
+            for name, count in self.trait_changes.most_common():
+                print(f"  {name}: {count}, {self.trait_deltas[name] / count:+.2f}")
+        if self.champion_changes:
+            print(f"spirit champions ({sum(self.champion_changes.values())} changed):")
+            for (old, new), count in self.champion_changes.most_common(20):
+                print(f"  {old} -> {new}: {count}")
+        for change in self.samples:
+            print(json.dumps(change))
+
+
+def _load_checkpoint(path: str) -> Optional[ObjectId]:
+    try:
+        with open(path) as f:
+            return ObjectId(json.load(f)['last_id'])
+    except FileNotFoundError:
+        return None
+
+
+def _save_checkpoint(path: str, last_id: ObjectId, report: RescoreReport):
+    with open(path, 'w') as f:
+        json.dump({'last_id': str(last_id), 'scanned': report.scanned, 'changed': report.changed}, f)
+
+
+async def rescore(args) -> int:
+    client = AsyncIOMotorClient(os.environ['MONGO_URL'])
+    db = client[os.environ['DB_NAME']]
+    global_stats = GlobalStats(db.global_stats)
+    report = RescoreReport(args.show)
+
+    query = {'raw_stats': {'$exists': True}}
+    if args.resume:
+        last_id = _load_checkpoint(args.checkpoint)
+        if last_id is not None:
+            query['_id'] = {'$gt': last_id}
+            print(f"Resuming after {last_id}")
+    cursor = db.analyses.find(query, PROJECTION, batch_size=args.batch_size).sort('_id', 1)
+    if args.limit:
+        cursor = cursor.limit(args.limit)
+
+    async def finish(pending: asyncio.Future):
+        result = await pending
+        if result['updates'] and not args.dry_run:
+            now = datetime.now(timezone.utc)
+            await db.analyses.bulk_write(
+                [UpdateOne({'_id': _id}, {'$set': {**update, 'rescored_at': now}}) for _id, update in result['updates']],
+                ordered=False
+            )
+            await global_stats.increment(result['increments'])
+        report.add(result)
+        if not args.dry_run:
+            _save_checkpoint(args.checkpoint, result['last_id'], report)
+
+    loop = asyncio.get_running_loop()
+    workers = max(1, args.workers)
+    pending = deque()
+    batches = 0
+    try:
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(args.replace_narratives,)) as pool:
+            batch = []
+            async for analysis in cursor:
+                batch.append(analysis)
+                if len(batch) < args.batch_size:
+                    continue
+                pending.append(loop.run_in_executor(pool, rescore_batch, batch))
+                batch = []
+                # Batches are written in cursor order, so the checkpoint never skips one
+                if len(pending) >= workers * 2:
+                    await finish(pending.popleft())
+                    batches += 1
+                    if batches % args.progress_every == 0:
+                        print(report.progress(), flush=True)
+            if batch:
+                pending.append(loop.run_in_executor(pool, rescore_batch, batch))
+            while pending:
+                await finish(pending.popleft())
+    finally:
+        client.close()
+
+    report.print_summary(args.dry_run)
+    return 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--dry-run', action='store_true', help='print what would change without writing')
+    parser.add_argument('--show', type=int, default=0, help='print the first N changed analyses')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1, help='scoring processes')
+    parser.add_argument('--batch-size', type=int, default=1000, help='analyses per cursor batch, task and bulk_write')
+    parser.add_argument('--limit', type=int, default=0, help='stop after N analyses (0 = all)')
+    parser.add_argument('--checkpoint', default='rescore.checkpoint', help='file holding the last written _id')
+    parser.add_argument('--resume', action='store_true', help='continue after the _id in --checkpoint')
+    parser.add_argument('--replace-narratives', action='store_true',
+                        help='replace narratives with the canned one when the spirit champion changes')
+    parser.add_argument('--progress-every', type=int, default=50, help='batches between progress lines')
+    args = parser.parse_args(argv)
+    return asyncio.run(rescore(args))
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,34 +1,115 @@
 from contextlib import asynccontextmanager
-from fastapi import FastAPI, APIRouter, HTTPException, status
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, APIRouter, Depends, HTTPException, Request, Response, status
+from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
 import os
+import json
+import asyncio
+import hashlib
+import hmac
 import logging
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 import uuid
 from datetime import datetime, timezone
 
-from riot_api import RiotAPI
+ROOT_DIR = Path(__file__).parent
+# Loaded once, before the service modules below read their settings
+load_dotenv(ROOT_DIR / '.env')
+
+from riot_api import RiotAPI, MatchBatch, ProgressCallback
 from personality_engine import PersonalityEngine
 from bedrock_ai import BedrockAI
+from match_cache import MatchCache
+from player_aggregates import PlayerAggregateStore
+from singleflight import SingleFlight
+from narrative_cache import NarrativeCache
+from global_stats import GlobalStats
+from stats_accumulator import StatsAccumulator
+from job_queue import JobQueue, JobContext, JobError
+from indexes import analysis_indexes, sync_indexes, index_report, log_index_report
+from cache import TTLCache, MISSING
+from deadline import Deadline, DeadlineExceeded
+import deadline
+import metrics
+
+
+# MongoDB connection, opened in lifespan (a mongodb+srv URL means a blocking DNS lookup)
+mongo_url = os.environ['MONGO_URL']
+client: Optional[AsyncIOMotorClient] = None
+db = None
 
+# Build the Riot and Bedrock clients and open Riot connections in the background at startup
+SERVICE_PREWARM = os.environ.get('SERVICE_PREWARM', '1') == '1'
 
-ROOT_DIR = Path(__file__).parent
-load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
-mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
+def _attach_database(database):
+    """Point the stores at ``database``."""
+    global db
+    db = database
+    riot_api.match_cache = MatchCache(database.matches)
+    riot_api.aggregate_store = PlayerAggregateStore(database.player_aggregates)
+    narrative_cache.collection = database.narratives
+    global_stats.collection = database.global_stats
+    job_queue.collection = database.jobs
+
+
+def _declared_indexes() -> Dict:
+    """Every index the app relies on, by collection."""
+    return {
+        db.analyses: analysis_indexes(),
+        riot_api.match_cache.collection: riot_api.match_cache.indexes(),
+        riot_api.aggregate_store.collection: riot_api.aggregate_store.indexes(),
+        narrative_cache.collection: narrative_cache.indexes(),
+        job_queue.collection: job_queue.indexes()
+    }
+
+
+# Result of the startup index audit, shown in /api/diagnostics
+index_status: Dict[str, Dict] = {}
+
+
+async def _check_indexes():
+    """Create missing indexes and log the index audit."""
+    try:
+        declared = _declared_indexes()
+        await sync_indexes(declared)
+        index_status.update(await index_report(declared))
+        log_index_report(index_status)
+    except Exception as e:
+        logger.error(f"Error checking indexes: {e}")
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    """
+    Open the database and start serving; everything else happens in the background.
+    
+    Index checks and (with SERVICE_PREWARM) client construction run
+    concurrently after startup, so a cold machine answers its first request
+    as soon as the Mongo client exists.
+    """
+    global client
+    if db is None:
+        client = await asyncio.to_thread(AsyncIOMotorClient, mongo_url)
+        _attach_database(client[os.environ['DB_NAME']])
+    
+    background = [asyncio.create_task(_check_indexes())]
+    if SERVICE_PREWARM:
+        background += [asyncio.create_task(riot_api.prewarm()), asyncio.create_task(bedrock_ai.prewarm())]
+    job_queue.start()
     yield
-    client.close()
+    for task in background:
+        task.cancel()
+    await job_queue.stop()
+    await riot_api.close()
+    bedrock_ai.close()
+    if client is not None:
+        client.close()
 
 
 # Create the main app without a prefix
@@ -47,6 +128,48 @@ riot_api = RiotAPI()
 personality_engine = PersonalityEngine()
 bedrock_ai = BedrockAI()
 
+# Reuses narratives across players with the same resonance (collection attached in lifespan)
+narrative_cache = NarrativeCache(None)
+
+# Community-wide counters behind /api/stats/global, updated as each analysis is stored
+global_stats = GlobalStats(None)
+
+# Coalesces concurrent analyses of the same player
+analysis_flights = SingleFlight()
+
+# Background analyses for clients that cannot hold a connection open for the whole pipeline
+job_queue = JobQueue(None, lambda payload, job: _run_analysis_job(payload, job))
+
+# Serialized GET /api/analysis/{id} responses. scripts/rescore_analyses rewrites stored analyses, so
+# entries and client copies only live ANALYSIS_CACHE_MAX_AGE seconds before being checked again
+ANALYSIS_RESPONSE_CACHE_SIZE = int(os.environ.get('ANALYSIS_RESPONSE_CACHE_SIZE', '1000'))
+ANALYSIS_CACHE_MAX_AGE = int(os.environ.get('ANALYSIS_CACHE_MAX_AGE', '300'))
+analysis_responses = TTLCache(ANALYSIS_RESPONSE_CACHE_SIZE, ttl=ANALYSIS_CACHE_MAX_AGE)
+analysis_reads = SingleFlight()
+
+# Most Riot IDs accepted by one batch analysis
+ANALYZE_BATCH_MAX_PLAYERS = int(os.environ.get('ANALYZE_BATCH_MAX_PLAYERS', '20'))
+
+# Most matches one job or streamed analysis may read; histories past RIOT_WINDOW_MAX_MATCHES are
+# streamed. /api/analyze, which has a deadline, stays at RIOT_WINDOW_MAX_MATCHES
+ANALYSIS_MAX_MATCHES = int(os.environ.get('ANALYSIS_MAX_MATCHES', '1000'))
+
+# Time budget of one /api/analyze request in seconds (0 = none). The Riot fetch leaves
+# ANALYSIS_NARRATIVE_RESERVE_SECONDS for the narrative, which leaves ANALYSIS_STORE_RESERVE_SECONDS for storing
+ANALYSIS_DEADLINE_SECONDS = float(os.environ.get('ANALYSIS_DEADLINE_SECONDS', '20'))
+ANALYSIS_NARRATIVE_RESERVE_SECONDS = float(os.environ.get('ANALYSIS_NARRATIVE_RESERVE_SECONDS', '6'))
+ANALYSIS_STORE_RESERVE_SECONDS = float(os.environ.get('ANALYSIS_STORE_RESERVE_SECONDS', '1'))
+
+# A Bedrock call is not started with less time than this left; the fallback narrative is used instead.
+# Defaults to a third of the narrative reserve and never exceeds it
+ANALYSIS_NARRATIVE_MIN_SECONDS = min(
+    float(os.environ.get('ANALYSIS_NARRATIVE_MIN_SECONDS', ANALYSIS_NARRATIVE_RESERVE_SECONDS / 3)),
+    ANALYSIS_NARRATIVE_RESERVE_SECONDS
+)
+
+# Bearer token required by /metrics and /api/diagnostics; unset disables both
+OPS_TOKEN = os.environ.get('OPS_TOKEN', '')
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -60,7 +183,21 @@ class AnalysisRequest(BaseModel):
     """Request model for personality analysis."""
     riot_id: str = Field(..., description="Riot ID in format GameName#TagLine")
     region: str = Field(default="na", description="Region code (na, euw, kr, etc.)")
-    match_count: int = Field(default=20, ge=5, le=50, description="Number of recent matches to analyze")
+    match_count: int = Field(
+        default=20, ge=5, le=ANALYSIS_MAX_MATCHES, description="Number of recent matches to analyze"
+    )
+
+
+class BatchAnalysisRequest(BaseModel):
+    """Request model for analyzing several players at once."""
+    riot_ids: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=ANALYZE_BATCH_MAX_PLAYERS,
+        description="Riot IDs in format GameName#TagLine"
+    )
+    region: str = Field(default="na", description="Region code shared by all players")
+    match_count: int = Field(default=20, ge=5, le=50, description="Number of recent matches to analyze per player")
 
 
 class TraitData(BaseModel):
@@ -113,6 +250,14 @@ class AnalysisResponse(BaseModel):
     champions_played: Dict[str, int]
     analysis_id: str
     timestamp: datetime
+    degraded: List[str] = Field(
+        default_factory=list,
+        description="Stages answered with partial data or a fallback (riot_fetch, narrative)"
+    )
+
+
+# Fields read back by GET /api/analysis/{id}; bookkeeping stored alongside stays in the database
+ANALYSIS_PROJECTION = {'_id': 0, **{field: 1 for field in AnalysisResponse.model_fields}}
 
 
 class StatusCheck(BaseModel):
@@ -122,6 +267,24 @@ class StatusCheck(BaseModel):
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
 
+def require_ops_token(request: Request):
+    """
+    Allow operational endpoints only with ``Authorization: Bearer <OPS_TOKEN>``.
+    
+    They expose upstream latencies, rate-limit budgets and cache sizes, so
+    without a configured token they answer 404 like any unknown path.
+    """
+    if not OPS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.strip().encode(), OPS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid or missing token",
+            headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
 # API Routes
 @api_router.get("/")
 async def root():
@@ -144,90 +307,204 @@ async def analyze_summoner(request: AnalysisRequest):
     3. Determines spirit champion resonance
     4. Generates AI narrative using AWS Bedrock
     5. Stores results in database
+    
+    Concurrent /api/analyze requests for the same Riot ID, region and match
+    count share a single run of the pipeline.
+    
+    The pipeline runs within ANALYSIS_DEADLINE_SECONDS: matches not downloaded
+    in time are left out (``games_analyzed`` counts the ones used), a late
+    narrative is replaced by the fallback one, and ``degraded`` lists the
+    stages that were cut short. Deeper histories than RIOT_WINDOW_MAX_MATCHES
+    cannot be read within it and are refused with a pointer to /api/jobs.
+    """
+    if ANALYSIS_DEADLINE_SECONDS and request.match_count > riot_api.window_max_matches:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=(
+                f"match_count above {riot_api.window_max_matches} is only available through "
+                f"POST /api/jobs or POST /api/analyze/stream"
+            )
+        )
+    
+    key = _flight_key(request, ANALYSIS_DEADLINE_SECONDS)
+    return await analysis_flights.do(key, lambda: _run_analysis(request, budget=ANALYSIS_DEADLINE_SECONDS))
+
+
+def _flight_key(request: AnalysisRequest, budget: Optional[float] = None) -> Tuple:
     """
+    Key of the shared analysis run for ``request``.
+    
+    The deadline is created by the run itself, so only callers with the same
+    budget may share one: a deadlined request must not wait on an unbounded
+    job, and a job must not store a result cut short by someone else's deadline.
+    """
+    return (request.riot_id.strip().lower(), request.region.lower(), request.match_count, budget or None)
+
+
+async def _fetch_stats(
+    request: AnalysisRequest,
+    batch: Optional[MatchBatch] = None,
+    progress: Optional[ProgressCallback] = None
+) -> Dict:
+    """Validate the Riot ID and fetch aggregated stats, mapping failures to HTTP errors."""
+    # Parse Riot ID (GameName#TagLine)
+    if '#' not in request.riot_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid Riot ID format. Use GameName#TagLine (e.g., Player#NA1)"
+        )
+    
+    game_name, tag_line = request.riot_id.split('#', 1)
+    
+    try:
+        return await riot_api.get_player_stats(
+            game_name=game_name,
+            tag_line=tag_line,
+            region=request.region,
+            match_count=request.match_count,
+            batch=batch,
+            progress=progress
+        )
+    except ValueError as e:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Account not found: {str(e)}"
+        )
+    except DeadlineExceeded:
+        logger.error(f"Riot API did not answer within the deadline for {request.riot_id}")
+        raise HTTPException(
+            status_code=status.HTTP_504_GATEWAY_TIMEOUT,
+            detail="Riot API did not respond in time. Please try again later."
+        )
+    except Exception as e:
+        logger.error(f"Riot API error: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Unable to fetch data from Riot API. Please try again later."
+        )
+
+
+async def _generate_narrative(stats: Dict, traits: List[Dict], spirit_champion: Dict) -> str:
+    """
+    Narrative from the narrative cache or Bedrock, within the time the deadline leaves.
+    
+    Falls back to the canned narrative (and marks the narrative stage
+    degraded) on failure, or when too little time is left to call Bedrock.
+    """
+    async def generate():
+        timeout = deadline.remaining('narrative')
+        if timeout is not None and timeout < ANALYSIS_NARRATIVE_MIN_SECONDS:
+            raise DeadlineExceeded('narrative')
+        return await bedrock_ai.agenerate_runic_narrative(
+            summoner_name=stats['summoner_name'],
+            traits=traits,
+            spirit_champion=spirit_champion['primary'],
+            stats=stats,
+            raise_errors=True,
+            timeout=None if timeout is None else min(timeout, bedrock_ai.timeout)
+        )
+    
+    try:
+        return await deadline.bounded('narrative', narrative_cache.get_or_generate(
+            stats['summoner_name'], traits, spirit_champion['primary'], stats, generate
+        ))
+    except DeadlineExceeded:
+        logger.warning(f"No time left for a Bedrock narrative for {stats['summoner_name']}; using the fallback")
+    except Exception as e:
+        logger.error(f"Bedrock AI error: {e}")
+    deadline.degrade('narrative')
+    return bedrock_ai.fallback_narrative(stats['summoner_name'], traits, spirit_champion['primary'])
+
+
+def _build_response(
+    request: AnalysisRequest,
+    stats: Dict,
+    traits: List[Dict],
+    spirit_champion: Dict,
+    narrative: str,
+    degraded: Optional[List[str]] = None
+) -> AnalysisResponse:
+    """Assemble the analysis response with a fresh id and timestamp."""
+    return AnalysisResponse(
+        summoner_name=stats['summoner_name'],
+        region=request.region,
+        summoner_level=stats['summoner_level'],
+        games_analyzed=stats['total_games'],
+        win_rate=stats['win_rate'],
+        kda=stats['kda'],
+        traits=[TraitData(**trait) for trait in traits],
+        spirit_champion=SpiritChampion(**spirit_champion),
+        narrative=narrative,
+        champions_played=stats.get('champions_played', {}),
+        analysis_id=str(uuid.uuid4()),
+        timestamp=datetime.now(timezone.utc),
+        degraded=list(degraded or [])
+    )
+
+
+async def _store_analysis(response: AnalysisResponse, stats: Dict):
+    """Persist an analysis and count it in the global stats; failures are logged and do not fail the request."""
+    try:
+        doc = response.model_dump()
+        doc['timestamp'] = doc['timestamp'].isoformat()
+        # BSON date for the optional retention index (timestamp stays a string for clients)
+        doc['created_at'] = response.timestamp
+        # Raw totals behind the traits, so scripts/rescore_analyses can re-score without Riot
+        doc['raw_stats'] = StatsAccumulator.from_dict(stats).to_bytes()
+        with metrics.upstream('mongo', 'analyses.insert'):
+            await db.analyses.insert_one(doc)
+        logger.info(f"Saved analysis {response.analysis_id} to database")
+    except Exception as e:
+        logger.error(f"Database error: {e}")
+        return
+    # Only stored analyses are counted, so a rebuild from db.analyses gives the same counters
+    await global_stats.record(doc)
+
+
+async def _run_analysis(
+    request: AnalysisRequest,
+    batch: Optional[MatchBatch] = None,
+    progress: Optional[ProgressCallback] = None,
+    budget: Optional[float] = None
+) -> AnalysisResponse:
+    """
+    Run the full analysis pipeline for one request, reporting match download progress to ``progress``.
+    
+    With a ``budget`` (seconds), every stage shares that deadline and the
+    response lists the stages that were cut short to meet it.
+    """
+    request_deadline = Deadline(budget, reserves={
+        'riot_fetch': ANALYSIS_NARRATIVE_RESERVE_SECONDS + ANALYSIS_STORE_RESERVE_SECONDS,
+        'narrative': ANALYSIS_STORE_RESERVE_SECONDS
+    })
+    token = deadline.start(request_deadline)
     try:
         logger.info(f"Starting analysis for {request.riot_id} in {request.region}")
         
-        # Parse Riot ID (GameName#TagLine)
-        if '#' not in request.riot_id:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid Riot ID format. Use GameName#TagLine (e.g., Player#NA1)"
-            )
-        
-        game_name, tag_line = request.riot_id.split('#', 1)
-        
         # Step 1: Fetch player stats from Riot API
-        try:
-            stats = riot_api.get_player_stats(
-                game_name=game_name,
-                tag_line=tag_line,
-                region=request.region,
-                match_count=request.match_count
-            )
-        except ValueError as e:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail=f"Account not found: {str(e)}"
-            )
-        except Exception as e:
-            logger.error(f"Riot API error: {e}")
-            raise HTTPException(
-                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                detail="Unable to fetch data from Riot API. Please try again later."
-            )
+        with metrics.stage('riot_fetch'):
+            stats = await _fetch_stats(request, batch, progress)
         
         # Step 2: Calculate personality traits
-        traits = personality_engine.calculate_traits(stats)
+        with metrics.stage('traits'):
+            traits = personality_engine.calculate_traits(stats)
         logger.info(f"Calculated {len(traits)} traits for {stats['summoner_name']}")
         
         # Step 3: Determine spirit champion
-        spirit_champion = personality_engine.determine_spirit_champion(traits, stats)
+        with metrics.stage('spirit_champion'):
+            spirit_champion = personality_engine.determine_spirit_champion(traits, stats)
         logger.info(f"Spirit champion: {spirit_champion['primary']['champion']} ({spirit_champion['primary']['resonance_strength']:.0f}% resonance)")
         
-        # Step 4: Generate AI narrative
-        try:
-            narrative = bedrock_ai.generate_runic_narrative(
-                summoner_name=stats['summoner_name'],
-                traits=traits,
-                spirit_champion=spirit_champion['primary'],
-                stats=stats
-            )
-        except Exception as e:
-            logger.error(f"Bedrock AI error: {e}")
-            # Use fallback narrative
-            narrative = f"""The Runes shimmer with recognition, {stats['summoner_name']}. 
-            Your spirit resonates with {spirit_champion['primary']['champion']}, a champion of legend. 
-            Through {stats['total_games']} battles, you have forged your path with determination and skill."""
+        # Step 4: Generate AI narrative (or reuse one for the same resonance)
+        with metrics.stage('narrative'):
+            narrative = await _generate_narrative(stats, traits, spirit_champion)
         
         # Step 5: Create response
-        analysis_id = str(uuid.uuid4())
-        timestamp = datetime.now(timezone.utc)
-        
-        response = AnalysisResponse(
-            summoner_name=stats['summoner_name'],
-            region=request.region,
-            summoner_level=stats['summoner_level'],
-            games_analyzed=stats['total_games'],
-            win_rate=stats['win_rate'],
-            kda=stats['kda'],
-            traits=[TraitData(**trait) for trait in traits],
-            spirit_champion=SpiritChampion(**spirit_champion),
-            narrative=narrative,
-            champions_played=stats.get('champions_played', {}),
-            analysis_id=analysis_id,
-            timestamp=timestamp
-        )
+        response = _build_response(request, stats, traits, spirit_champion, narrative, request_deadline.degraded)
         
-        # Step 6: Store in database
-        try:
-            doc = response.model_dump()
-            doc['timestamp'] = doc['timestamp'].isoformat()
-            await db.analyses.insert_one(doc)
-            logger.info(f"Saved analysis {analysis_id} to database")
-        except Exception as e:
-            logger.error(f"Database error: {e}")
-            # Continue even if DB save fails
+        # Step 6: Store in database (continues even if the save fails)
+        with metrics.stage('store'):
+            await _store_analysis(response, stats)
         
         logger.info(f"Analysis complete for {stats['summoner_name']}")
         return response
@@ -240,34 +517,354 @@ async def analyze_summoner(request: AnalysisRequest):
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="An unexpected error occurred during analysis"
         )
+    finally:
+        deadline.reset(token)
 
 
-@api_router.get("/analysis/{analysis_id}")
-async def get_analysis(analysis_id: str):
-    """Retrieve a previously completed analysis by ID."""
+async def _run_analysis_job(payload: Dict, job: JobContext) -> Dict:
+    """Job queue handler: run the analysis pipeline for a queued AnalysisRequest."""
+    request = AnalysisRequest(**payload)
+    key = _flight_key(request)
     try:
-        analysis = await db.analyses.find_one({"analysis_id": analysis_id}, {"_id": 0})
-        
-        if not analysis:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Analysis not found"
-            )
-        
-        # Convert ISO timestamp back to datetime
-        if isinstance(analysis['timestamp'], str):
-            analysis['timestamp'] = datetime.fromisoformat(analysis['timestamp'])
-        
-        return analysis
-        
-    except HTTPException:
+        # Only the job that starts the analysis reports progress; coalesced ones just wait
+        response = await analysis_flights.do(key, lambda: _run_analysis(request, progress=job.progress))
+    except HTTPException as e:
+        # Bad Riot IDs and unknown accounts fail the same way on every attempt
+        raise JobError(e.detail, e.status_code, retryable=e.status_code >= 500)
+    return jsonable_encoder(response)
+
+
+def _sse_event(event: str, data) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@api_router.post("/analyze/stream")
+async def analyze_summoner_stream(request: AnalysisRequest):
+    """
+    Analyze a summoner, streaming each result as soon as it is ready.
+    
+    Riot ID and Riot API errors are returned as normal HTTP errors. Once the
+    match IDs are known, the response is a Server-Sent Events stream of:
+    - ``progress``: ``{matches_fetched, matches_requested}`` while matches download
+    - ``stats``: win rate, KDA, games analyzed and champions played
+    - ``traits``: the 10 personality traits
+    - ``spirit_champion``: primary champion and runner-ups
+    - ``narrative``: narrative text chunks as Bedrock produces them
+      (``replace: true`` means discard earlier chunks)
+    - ``complete``: the stored AnalysisResponse
+    - ``error``: if the analysis fails after streaming started
+    """
+    logger.info(f"Starting streamed analysis for {request.riot_id} in {request.region}")
+    progress_events: asyncio.Queue = asyncio.Queue()
+    started = asyncio.Event()
+    
+    async def report(progress: Dict):
+        started.set()
+        progress_events.put_nowait(progress)
+    
+    async def fetch_stats() -> Dict:
+        with metrics.stage('riot_fetch'):
+            return await _fetch_stats(request, progress=report)
+    
+    # Errors before the first progress report (bad Riot ID, unknown account)
+    # are returned as HTTP errors; the stream starts once matches are downloading
+    fetch = asyncio.create_task(fetch_stats())
+    fetch.add_done_callback(lambda _: progress_events.put_nowait(None))
+    waiter = asyncio.create_task(started.wait())
+    try:
+        await asyncio.wait({fetch, waiter}, return_when=asyncio.FIRST_COMPLETED)
+    except BaseException:
+        fetch.cancel()
         raise
+    finally:
+        waiter.cancel()
+    if fetch.done():
+        fetch.result()
+    
+    async def event_stream():
+        try:
+            while (progress := await progress_events.get()) is not None:
+                yield _sse_event("progress", progress)
+            stats = fetch.result()
+            
+            yield _sse_event("stats", {
+                "summoner_name": stats['summoner_name'],
+                "region": request.region,
+                "summoner_level": stats['summoner_level'],
+                "games_analyzed": stats['total_games'],
+                "win_rate": stats['win_rate'],
+                "kda": stats['kda'],
+                "champions_played": stats.get('champions_played', {})
+            })
+            
+            with metrics.stage('traits'):
+                traits = personality_engine.calculate_traits(stats)
+            yield _sse_event("traits", traits)
+            
+            with metrics.stage('spirit_champion'):
+                spirit_champion = personality_engine.determine_spirit_champion(traits, stats)
+            yield _sse_event("spirit_champion", spirit_champion)
+            
+            degraded = []
+            narrative = await narrative_cache.lookup(
+                stats['summoner_name'], traits, spirit_champion['primary'], stats
+            )
+            if narrative is not None:
+                yield _sse_event("narrative", {"text": narrative})
+            else:
+                chunks = []
+                try:
+                    async for chunk in bedrock_ai.astream_runic_narrative(
+                        summoner_name=stats['summoner_name'],
+                        traits=traits,
+                        spirit_champion=spirit_champion['primary'],
+                        stats=stats
+                    ):
+                        chunks.append(chunk)
+                        yield _sse_event("narrative", {"text": chunk})
+                    narrative = ''.join(chunks)
+                    await narrative_cache.store(
+                        stats['summoner_name'], traits, spirit_champion['primary'], stats, narrative
+                    )
+                except Exception as e:
+                    logger.error(f"Bedrock AI streaming error: {e}")
+                    narrative = bedrock_ai.fallback_narrative(stats['summoner_name'], traits, spirit_champion['primary'])
+                    degraded.append('narrative')
+                    yield _sse_event("narrative", {"text": narrative, "replace": True})
+            
+            response = _build_response(request, stats, traits, spirit_champion, narrative, degraded)
+            with metrics.stage('store'):
+                await _store_analysis(response, stats)
+            yield _sse_event("complete", response)
+            logger.info(f"Streamed analysis complete for {stats['summoner_name']}")
+            
+        except HTTPException as e:
+            yield _sse_event("error", {"detail": e.detail})
+        except Exception as e:
+            logger.error(f"Unexpected error during streamed analysis: {e}")
+            yield _sse_event("error", {"detail": "An unexpected error occurred during analysis"})
+        finally:
+            fetch.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@api_router.post("/analyze/batch")
+async def analyze_batch(request: BatchAnalysisRequest):
+    """
+    Analyze several players, streaming each analysis as soon as it completes.
+    
+    Players are analyzed concurrently. Matches shared by several players
+    (teammates, opponents) are fetched from Riot once, all match downloads
+    share one concurrency budget, and narratives go through the same Bedrock
+    concurrency limit as single analyses. Duplicate Riot IDs are analyzed once.
+    
+    The response is a Server-Sent Events stream of:
+    - ``analysis``: ``{riot_id, analysis}`` with the stored AnalysisResponse
+    - ``player_error``: ``{riot_id, status_code, detail}`` for a player that failed
+    - ``complete``: counts of analyzed and failed players, matches downloaded
+      from Riot and downloads shared between players
+    """
+    riot_ids = []
+    seen = set()
+    for riot_id in request.riot_ids:
+        riot_id = riot_id.strip()
+        if riot_id.lower() not in seen:
+            seen.add(riot_id.lower())
+            riot_ids.append(riot_id)
+    logger.info(f"Starting batch analysis of {len(riot_ids)} players in {request.region}")
+    batch = MatchBatch(riot_api.match_concurrency)
+    
+    async def analyze(riot_id: str):
+        player_request = AnalysisRequest(riot_id=riot_id, region=request.region, match_count=request.match_count)
+        key = _flight_key(player_request)
+        try:
+            return riot_id, await analysis_flights.do(key, lambda: _run_analysis(player_request, batch)), None
+        except HTTPException as e:
+            return riot_id, None, e
+    
+    async def event_stream():
+        tasks = [asyncio.create_task(analyze(riot_id)) for riot_id in riot_ids]
+        analyzed = failed = 0
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                riot_id, response, error = await next_done
+                if error is None:
+                    analyzed += 1
+                    yield _sse_event("analysis", {"riot_id": riot_id, "analysis": response})
+                else:
+                    failed += 1
+                    yield _sse_event("player_error", {
+                        "riot_id": riot_id,
+                        "status_code": error.status_code,
+                        "detail": error.detail
+                    })
+            
+            match_stats = batch.stats()
+            logger.info(
+                f"Batch analysis complete: {analyzed} analyzed, {failed} failed, "
+                f"{match_stats['matches_shared']} shared match downloads"
+            )
+            yield _sse_event("complete", {"analyzed": analyzed, "failed": failed, **match_stats})
+        finally:
+            for task in tasks:
+                task.cancel()
+            batch.cancel()
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@api_router.post("/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def create_analysis_job(request: AnalysisRequest):
+    """
+    Queue an analysis and return immediately with a job id.
+    
+    Poll ``GET /api/jobs/{job_id}`` or subscribe to ``GET /api/jobs/{job_id}/events``
+    for its status; the finished job carries the AnalysisResponse as ``result``.
+    """
+    if '#' not in request.riot_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid Riot ID format. Use GameName#TagLine (e.g., Player#NA1)"
+        )
+    
+    try:
+        job = await job_queue.enqueue(request.model_dump())
+    except Exception as e:
+        logger.error(f"Error queueing analysis job: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Unable to queue the analysis. Please try again later."
+        )
+    
+    return JSONResponse(
+        status_code=status.HTTP_202_ACCEPTED,
+        content=jsonable_encoder(job),
+        headers={"Location": f"/api/jobs/{job['job_id']}"}
+    )
+
+
+@api_router.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """Status of a queued analysis: queued, running, succeeded (with ``result``) or failed (with ``error``)."""
+    try:
+        job = await job_queue.get(job_id)
+    except Exception as e:
+        logger.error(f"Error retrieving job: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving job"
+        )
+    
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    return job
+
+
+@api_router.get("/jobs/{job_id}/events")
+async def stream_analysis_job(job_id: str):
+    """
+    Follow a queued analysis as Server-Sent Events.
+    
+    Sends a ``status`` event with the job each time it changes, ending with
+    ``complete`` (job with ``result``) or ``failed`` (job with ``error``).
+    """
+    # 404 before the stream starts
+    await get_analysis_job(job_id)
+    
+    async def event_stream():
+        try:
+            async for job in job_queue.watch(job_id):
+                if job['status'] == 'succeeded':
+                    yield _sse_event("complete", job)
+                elif job['status'] == 'failed':
+                    yield _sse_event("failed", job)
+                else:
+                    yield _sse_event("status", job)
+        except Exception as e:
+            logger.error(f"Error following job {job_id}: {e}")
+            yield _sse_event("error", {"detail": "Error retrieving job"})
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@api_router.get("/analysis/{analysis_id}")
+async def get_analysis(analysis_id: str, request: Request):
+    """
+    Retrieve a previously completed analysis by ID.
+    
+    The serialized response is kept in an in-process LRU and sent with a
+    strong ETag and a short ``max-age``: browsers and CDNs serve repeat
+    share-link hits, then revalidate, and a matching ``If-None-Match`` gets a
+    304 without a body. Analyses are not immutable (a rescore rewrites their
+    traits), so a changed analysis reaches clients within ANALYSIS_CACHE_MAX_AGE.
+    """
+    cached = analysis_responses.get(analysis_id)
+    metrics.cache_result('analysis_responses', hits=cached is not MISSING, misses=cached is MISSING)
+    if cached is MISSING:
+        cached = await analysis_reads.do(analysis_id, lambda: _load_analysis_body(analysis_id))
+    body, etag = cached
+    
+    headers = {
+        "ETag": etag,
+        "Cache-Control": f"public, max-age={ANALYSIS_CACHE_MAX_AGE}"
+    }
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+async def _load_analysis_body(analysis_id: str):
+    """Read an analysis from the database and cache its serialized body and ETag."""
+    try:
+        with metrics.upstream('mongo', 'analyses.find'):
+            analysis = await db.analyses.find_one({"analysis_id": analysis_id}, ANALYSIS_PROJECTION)
     except Exception as e:
         logger.error(f"Error retrieving analysis: {e}")
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error retrieving analysis"
         )
+    
+    if not analysis:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Analysis not found"
+        )
+    
+    # Same encoding as JSONResponse; timestamp is already stored as an ISO string
+    body = json.dumps(
+        jsonable_encoder(analysis), ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+    etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+    analysis_responses.set(analysis_id, (body, etag))
+    return body, etag
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header matches ``etag`` (weak comparison, as RFC 9110 asks for GET)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in if_none_match.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
 
 
 @api_router.get("/champions")
@@ -278,6 +875,47 @@ async def get_champions_reference():
     }
 
 
+@api_router.get("/stats/global")
+async def get_global_stats():
+    """
+    Community statistics over every stored analysis.
+    
+    Served from counter documents that each stored analysis increments, so
+    the cost does not depend on how many analyses exist.
+    """
+    try:
+        summary = await global_stats.summary()
+    except Exception as e:
+        logger.error(f"Error retrieving global stats: {e}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Error retrieving global statistics"
+        )
+    return JSONResponse(
+        content=summary,
+        headers={"Cache-Control": f"public, max-age={int(global_stats.cache_seconds)}"}
+    )
+
+
+@api_router.get("/diagnostics", dependencies=[Depends(require_ops_token)])
+async def diagnostics():
+    """Runtime state of the upstream schedulers and caches, for tuning against our limits."""
+    return {
+        "riot_rate_limits": riot_api.rate_limiter.snapshot(),
+        "riot_connections": riot_api.pools.stats(),
+        "caches": {
+            "riot_accounts": riot_api.account_cache.stats(),
+            "riot_summoners": riot_api.summoner_cache.stats(),
+            "narratives": narrative_cache.stats(),
+            "analysis_responses": analysis_responses.stats()
+        },
+        "bedrock": bedrock_ai.stats(),
+        "analysis_flights": analysis_flights.stats(),
+        "jobs": job_queue.stats(),
+        "indexes": index_status
+    }
+
+
 @api_router.get("/health")
 async def health_check():
     """Comprehensive health check for all services."""
@@ -306,7 +944,7 @@ async def health_check():
     
     # Check Bedrock
     try:
-        if bedrock_ai.client and bedrock_ai.model_id:
+        if bedrock_ai.configured:
             health_status["bedrock_ai"] = "configured"
         else:
             health_status["bedrock_ai"] = "not configured"
@@ -319,6 +957,29 @@ async def health_check():
 # Include the router in the main app
 app.include_router(api_router)
 
+
+@app.get("/metrics", include_in_schema=False, dependencies=[Depends(require_ops_token)])
+async def prometheus_metrics():
+    """Stage, upstream, rate-limit, fallback and cache metrics in the Prometheus text format."""
+    body, content_type = metrics.render()
+    return Response(content=body, media_type=content_type)
+
+
+@app.middleware("http")
+async def server_timing(request: Request, call_next):
+    """
+    Report the request's pipeline stages and upstream calls in a Server-Timing header.
+    
+    Streaming responses send their headers before the body is produced, so
+    only the work done before the first event is included.
+    """
+    timings = metrics.start_request_timings()
+    response = await call_next(request)
+    if timings:
+        response.headers["Server-Timing"] = metrics.server_timing_header(timings)
+    return response
+
+
 _cors_origins = [o.strip() for o in os.environ.get('CORS_ORIGINS', 'http://localhost:3000').split(',') if o.strip()]
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,82 @@
+"""
+Single-Flight Request Coalescing - Shares one in-flight call among concurrent callers
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """One in-flight call and the number of callers awaiting it."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+        self.abandoned = False
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls that share a key into a single execution.
+
+    The first caller for a key (the leader) starts the work in its own task;
+    callers arriving while it runs (followers) await the same task. The result
+    or exception is delivered to every caller. A caller that is cancelled stops
+    waiting without affecting the others, and the work itself is only cancelled
+    once nobody is waiting for it anymore.
+    """
+
+    def __init__(self):
+        self._flights: Dict[Hashable, _Flight] = {}
+        self.leaders = 0
+        self.followers = 0
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run ``fn`` for ``key``, or join the run already in flight.
+
+        Args:
+            key: Identifies calls that can share a result
+            fn: Zero-argument coroutine function doing the work
+
+        Returns:
+            The result of the shared call
+
+        Raises:
+            Whatever exception the shared call raised
+        """
+        flight = self._flights.get(key)
+        # A flight cancelled by its last waiter stays registered until its task finishes
+        if flight is None or flight.abandoned or flight.task.cancelled():
+            flight = _Flight(asyncio.create_task(fn()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _: self._forget(key, flight))
+            self.leaders += 1
+        else:
+            self.followers += 1
+            logger.info(f"Joining in-flight call for {key}")
+
+        flight.waiters += 1
+        try:
+            return await asyncio.shield(flight.task)
+        except asyncio.CancelledError:
+            if flight.waiters == 1 and not flight.task.done():
+                flight.abandoned = True
+                flight.task.cancel()
+            raise
+        finally:
+            flight.waiters -= 1
+
+    def _forget(self, key: Hashable, flight: _Flight):
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+
+    def stats(self) -> Dict:
+        """Number of calls in flight and how many callers were coalesced."""
+        return {
+            'in_flight': len(self._flights),
+            'leaders': self.leaders,
+            'followers': self.followers
+        }
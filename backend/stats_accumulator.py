@@ -0,0 +1,206 @@
+"""
+Stats Accumulator - Mergeable raw stat totals behind a player analysis
+"""
+import struct
+from typing import Dict, Optional, Union
+
+# Raw counters, in serialization order; append new ones at the end and bump _VERSION
+COUNTERS = (
+    'total_games',
+    'wins',
+    'kills',
+    'deaths',
+    'assists',
+    'total_cs',
+    'vision_score',
+    'damage_dealt',
+    'damage_taken',
+    'gold_earned',
+    'wards_placed',
+    'wards_killed',
+    'total_game_duration',
+    'first_bloods',
+    'solo_kills',
+    'multikills'
+)
+
+_VERSION = 1
+_HEADER = struct.Struct(f'<B{len(COUNTERS)}qH')
+_CHAMPION = struct.Struct('<Bi')
+
+
+class StatsAccumulator:
+    """
+    Raw stat totals over a set of matches, plus games per champion.
+
+    Adding matches and merging accumulators are plain sums, so totals built
+    from disjoint sets of matches (pages, shards, a stored window and the
+    games played since) merge into exactly the totals of their union, in
+    any order. Averages are only computed by ``finalize``.
+    """
+
+    __slots__ = COUNTERS + ('champions_played',)
+
+    def __init__(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.champions_played: Dict[str, int] = {}
+
+    def add(self, entry: Dict, sign: int = 1):
+        """
+        Fold one match into the totals, or take it out again with ``sign=-1``.
+
+        Args:
+            entry: Window entry (match_id, game_start, game_duration, participant)
+            sign: 1 to add the match, -1 to subtract it
+        """
+        participant = entry['participant']
+
+        self.total_games += sign
+        self.wins += sign if participant['win'] else 0
+        self.kills += sign * participant['kills']
+        self.deaths += sign * participant['deaths']
+        self.assists += sign * participant['assists']
+        self.total_cs += sign * (participant['totalMinionsKilled'] + participant.get('neutralMinionsKilled', 0))
+        self.vision_score += sign * participant.get('visionScore', 0)
+        self.damage_dealt += sign * participant['totalDamageDealtToChampions']
+        self.damage_taken += sign * participant['totalDamageTaken']
+        self.gold_earned += sign * participant['goldEarned']
+        self.wards_placed += sign * participant.get('wardsPlaced', 0)
+        self.wards_killed += sign * participant.get('wardsKilled', 0)
+        self.total_game_duration += sign * entry['game_duration']
+        self.first_bloods += sign if participant.get('firstBloodKill', False) else 0
+
+        # Track champion diversity
+        self._add_champion(participant['championName'], sign)
+
+        # Solo kills (kills without assists from team in small timeframe - approximated)
+        if participant['kills'] > participant['assists']:
+            self.solo_kills += sign
+
+        # Multikills
+        if participant.get('doubleKills', 0) > 0 or participant.get('tripleKills', 0) > 0:
+            self.multikills += sign
+
+    def remove(self, entry: Dict):
+        """Take a match that was added before out of the totals."""
+        self.add(entry, sign=-1)
+
+    def merge(self, other: 'StatsAccumulator') -> 'StatsAccumulator':
+        """
+        Add another accumulator's totals into this one.
+
+        Args:
+            other: Totals over matches not already counted here
+
+        Returns:
+            This accumulator, for chaining
+        """
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        for champion, games in other.champions_played.items():
+            self._add_champion(champion, games)
+        return self
+
+    def _add_champion(self, champion: str, games: int):
+        games += self.champions_played.get(champion, 0)
+        if games > 0:
+            self.champions_played[champion] = games
+        else:
+            self.champions_played.pop(champion, None)
+
+    def finalize(self) -> Dict:
+        """
+        Build the stats dictionary, with per-game averages, from the raw totals.
+
+        Returns:
+            Raw totals, ``champions_played`` and, when there are games, the
+            averages, win rate, KDA and champion pool size read by
+            PersonalityEngine, the narrative prompt and AnalysisResponse
+        """
+        stats = self.to_dict()
+        games = self.total_games
+
+        # Calculate averages
+        if games > 0:
+            stats['avg_kills'] = round(self.kills / games, 2)
+            stats['avg_deaths'] = round(self.deaths / games, 2)
+            stats['avg_assists'] = round(self.assists / games, 2)
+            stats['avg_cs'] = round(self.total_cs / games, 1)
+            stats['avg_vision_score'] = round(self.vision_score / games, 1)
+            stats['avg_damage_dealt'] = round(self.damage_dealt / games, 0)
+            stats['avg_damage_taken'] = round(self.damage_taken / games, 0)
+            stats['avg_gold'] = round(self.gold_earned / games, 0)
+            stats['avg_wards_placed'] = round(self.wards_placed / games, 1)
+            stats['avg_game_duration'] = round(self.total_game_duration / games / 60, 1)  # in minutes
+            stats['win_rate'] = round((self.wins / games) * 100, 1)
+            stats['kda'] = round((self.kills + self.assists) / max(self.deaths, 1), 2)
+            stats['champion_pool_size'] = len(self.champions_played)
+
+        return stats
+
+    def to_dict(self) -> Dict:
+        """Raw totals as a plain dictionary (the pre-accumulator ``totals`` layout)."""
+        totals = {name: getattr(self, name) for name in COUNTERS}
+        totals['champions_played'] = dict(self.champions_played)
+        return totals
+
+    @classmethod
+    def from_dict(cls, totals: Dict) -> 'StatsAccumulator':
+        """Accumulator from a ``to_dict`` dictionary; missing counters start at 0."""
+        accumulator = cls()
+        for name in COUNTERS:
+            setattr(accumulator, name, totals.get(name, 0))
+        accumulator.champions_played = dict(totals.get('champions_played', {}))
+        return accumulator
+
+    def to_bytes(self) -> bytes:
+        """
+        Compact binary form: a version byte, the counters as little-endian
+        int64, then each champion as a length-prefixed UTF-8 name and an int32
+        game count (about 130 bytes plus 10 per champion).
+        """
+        parts = [_HEADER.pack(_VERSION, *(getattr(self, name) for name in COUNTERS), len(self.champions_played))]
+        for champion, games in self.champions_played.items():
+            name = champion.encode('utf-8')
+            parts.append(_CHAMPION.pack(len(name), games) + name)
+        return b''.join(parts)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'StatsAccumulator':
+        """
+        Accumulator from ``to_bytes`` output.
+
+        Raises:
+            ValueError: If the data was written by an unknown version
+        """
+        if not data or data[0] != _VERSION:
+            raise ValueError(f"Unsupported stats accumulator version {data[0] if data else None}")
+        values = _HEADER.unpack_from(data)
+        accumulator = cls()
+        for name, value in zip(COUNTERS, values[1:-1]):
+            setattr(accumulator, name, value)
+        offset = _HEADER.size
+        for _ in range(values[-1]):
+            length, games = _CHAMPION.unpack_from(data, offset)
+            offset += _CHAMPION.size
+            accumulator.champions_played[bytes(data[offset:offset + length]).decode('utf-8')] = games
+            offset += length
+        return accumulator
+
+    @classmethod
+    def load(cls, stored: Optional[Union[bytes, Dict]]) -> 'StatsAccumulator':
+        """Accumulator from stored totals, in either the binary or the dictionary form."""
+        if stored is None:
+            return cls()
+        if isinstance(stored, dict):
+            return cls.from_dict(stored)
+        return cls.from_bytes(bytes(stored))
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, StatsAccumulator):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self) -> str:
+        return f"StatsAccumulator(games={self.total_games}, champions={len(self.champions_played)})"
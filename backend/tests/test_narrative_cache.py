@@ -0,0 +1,40 @@
+import asyncio
+
+from narrative_cache import NarrativeCache, SUMMONER_PLACEHOLDER
+
+TRAITS = [{'name': name, 'score': score} for name, score in [('Aggression', 9), ('Teamwork', 7), ('Vision', 4)]]
+SPIRIT_CHAMPION = {'champion': 'Darius', 'slots_filled': ['Aggression']}
+STATS = {'win_rate': 55.0, 'kda': 3.1}
+
+
+class FakeCollection:
+    """Just enough of a Motor collection for NarrativeCache."""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one(self, query, projection=None):
+        return self.docs.get(query['fingerprint'])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = self.docs.setdefault(query['fingerprint'], {'variants': []})
+        if '$push' in update:
+            doc['variants'] = (doc['variants'] + update['$push']['variants']['$each'])[-1:]
+
+
+def test_store_replaces_the_name_in_any_case():
+    cache = NarrativeCache(FakeCollection(), max_variants=1, refresh_rate=0.0)
+
+    async def run():
+        await cache.store(
+            'Faker#KR1', TRAITS, SPIRIT_CHAMPION, STATS,
+            'FAKER marches to war. Faker never yields, and faker#kr1 is feared.'
+        )
+        return await cache.lookup('Chovy#KR2', TRAITS, SPIRIT_CHAMPION, STATS)
+
+    narrative = asyncio.run(run())
+
+    template = next(iter(cache.collection.docs.values()))['variants'][0]
+    assert template.count(SUMMONER_PLACEHOLDER) == 3
+    assert 'faker' not in template.lower()
+    assert narrative == 'Chovy#KR2 marches to war. Chovy#KR2 never yields, and Chovy#KR2 is feared.'